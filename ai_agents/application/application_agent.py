@@ -1,10 +1,28 @@
 from ai_agents import Agent, function_tool
+from ai_agents.application.field_extractor import ApplicationSlots
+from utils.locations import normalize_location
+from utils.application_store import get_application_store
 from datetime import datetime
+
 @function_tool
 def apply_for_real_estate_financing(full_name:str, cpf_number:str, date_of_birth:str, monthly_income:float, marital_status:str, person_type:str, property_value:float, state:str, city:str):
     """
     Applies for real estate financing based on the provided parameters.
     """
+    # Official UF and municipality name (accents, abbreviations and small typos are fixed)
+    location = normalize_location(state, city)
+    if not location["found"]:
+        return {
+            "success": False,
+            "message": ("Não encontrei essa cidade, mas há uma parecida. Pergunte ao usuário se é a sugerida."
+                        if location["match"] == "fuzzy" else
+                        "Não encontrei essa cidade. Confirme a cidade e o estado com o usuário."),
+            "match": location["match"],
+            "distance": location["distance"],
+            "suggestions": location["suggestions"],
+        }
+    state, city = location["state"], location["city"]
+    
     # Log the simulation parameters (for debugging or record-keeping)
     print(f"Gerando aplicação de financiamento para:")
     print(f"- Nome: {full_name}")
@@ -19,18 +37,32 @@ def apply_for_real_estate_financing(full_name:str, cpf_number:str, date_of_birth
     # Get current date for submission date
     submission_date = datetime.now().strftime("%d/%m/%Y")
     
+    # Queued for the store's background writer; a retry for the same CPF and
+    # property gets the code of the first submission
+    confirmation_code, created = get_application_store().submit({
+        "full_name": full_name,
+        "cpf_number": cpf_number,
+        "date_of_birth": date_of_birth,
+        "monthly_income": monthly_income,
+        "marital_status": marital_status,
+        "person_type": person_type,
+        "property_value": property_value,
+        "state": state,
+        "city": city,
+        "submission_date": submission_date,
+    })
+    
     return {
         "success": True,
-        "message": "Sua aplicação de financiamento imobiliário foi recebida com sucesso!",
-        "confirmation_code": f"FIN-{cpf_number[-4:]}",
+        "message": ("Sua aplicação de financiamento imobiliário foi recebida com sucesso!" if created else
+                    "Você já tinha uma aplicação para este imóvel; ela continua válida com o mesmo código."),
+        "confirmation_code": confirmation_code,
         "bank": "CAIXA Econômica Federal",
         "submission_date": submission_date,
         "estimated_response_time": "5 dias úteis"
     }
 
-application_agent = Agent(
-    name="Application Agent",
-    instructions="""
+APPLICATION_INSTRUCTIONS = """
 You are an application agent for real estate financing. Your role is to collect necessary user information to apply for financing on their behalf.
 
 Collect all required information before proceeding with the application. If any information is missing, ask specific questions to obtain it.
@@ -48,7 +80,7 @@ Collect all required information before proceeding with the application. If any
 
 # Steps
 
-1. **Collect Information**: Verify that you have all required information. If any detail is missing, ask the user to provide it.
+1. **Collect Information**: Verify that you have all required information. If any detail is missing, ask the user to provide it, asking for every missing detail in the same message.
 2. **Apply for Financing**: Use the collected data to apply for financing.
 3. **Deliver Confirmation**: Once the application is processed, send a confirmation to the user.
 4. **Forward Result**: Forward the result of the `apply_for_real_estate_financing` function to the user.
@@ -79,7 +111,24 @@ Once all information is gathered, use the function `apply_for_real_estate_financ
 - city: Cidade onde o imóvel está localizado
 
 The function will return an object with application confirmation details.
-""",
+
+The function fixes the spelling of the state and city itself (accents, state name or code, a single typo). If it answers that the city was not found, show the returned suggestions and ask which one is right; when it found a similar city (match "fuzzy"), ask the user whether that is the city before applying, since it may be a different one.
+"""
+
+def application_instructions(context, agent):
+    """
+    Instructions plus the fields already extracted from the conversation, when the run has them
+
+    The run context is the conversation's ApplicationSlots (see
+    field_extractor.py), so the model only asks for what is missing or invalid.
+    """
+    if isinstance(context.context, ApplicationSlots):
+        return APPLICATION_INSTRUCTIONS + "\n" + context.context.to_prompt()
+    return APPLICATION_INSTRUCTIONS
+
+application_agent = Agent(
+    name="Application Agent",
+    instructions=application_instructions,
     tools=[apply_for_real_estate_financing]
 )
 
@@ -0,0 +1,492 @@
+import re
+from datetime import date
+
+from utils.text import fold_text
+from utils.locations import UF_NAMES, normalize_location
+
+# Deterministic extraction of the application fields from the user's messages.
+#
+# Runs before application_agent on every message: recognized values are checked
+# locally (CPF/CNPJ check digits, real dates, positive amounts...) and kept in
+# an ApplicationSlots state that is handed to the agent, so the model only has
+# to ask for what is still missing or invalid.
+
+# Parameters of apply_for_real_estate_financing, in the order they are asked
+FIELDS = [
+    "full_name",
+    "cpf_number",
+    "date_of_birth",
+    "monthly_income",
+    "marital_status",
+    "person_type",
+    "property_value",
+    "state",
+    "city",
+]
+
+# How each field is named to the user
+FIELD_LABELS = {
+    "full_name": "nome completo",
+    "cpf_number": "CPF (ou CNPJ)",
+    "date_of_birth": "data de nascimento",
+    "monthly_income": "renda mensal",
+    "marital_status": "estado civil",
+    "person_type": "tipo de pessoa (física ou jurídica)",
+    "property_value": "valor do imóvel",
+    "state": "estado do imóvel",
+    "city": "cidade do imóvel",
+}
+
+# Folded words that show a reply is asking for a field
+FIELD_KEYWORDS = {
+    "full_name": ["nome"],
+    "cpf_number": ["cpf", "cnpj"],
+    "date_of_birth": ["nascimento", "nasceu"],
+    "monthly_income": ["renda", "salario", "ganha", "faturamento"],
+    "marital_status": ["estado civil"],
+    "person_type": ["fisica", "juridica", "tipo de pessoa"],
+    "property_value": ["valor", "custa", "preco"],
+    "state": ["estado", "uf"],
+    "city": ["cidade", "municipio"],
+}
+
+# Folded state name -> UF, longest names first so "mato grosso do sul" wins over "mato grosso"
+UF_BY_NAME = dict(sorted(((fold_text(name), uf) for uf, name in UF_NAMES.items()), key=lambda item: -len(item[0])))
+
+# Folded marital status vocabulary -> value passed to the tool
+MARITAL_STATUS = {
+    "solteiro": "solteiro", "solteira": "solteiro",
+    "casado": "casado", "casada": "casado",
+    "divorciado": "divorciado", "divorciada": "divorciado",
+    "separado": "separado", "separada": "separado",
+    "viuvo": "viúvo", "viuva": "viúvo",
+    "uniao estavel": "união estável",
+}
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6, "julho": 7,
+    "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Folded words before (or right after) an amount that say which field it is
+INCOME_CUES = ["renda", "ganho", "ganha", "salario", "faturamento", "fatura", "recebo", "por mes", "mensal"]
+PROPERTY_CUES = ["imovel", "custa", "valor", "apartamento", "casa", "terreno", "sala", "preco", "avaliado", "financiar"]
+BIRTH_CUES = ["nasci", "nascido", "nascida", "nascimento"]
+
+# A capitalized name, allowing lowercase particles ("Maria da Silva")
+NAME = r"[A-ZÀ-Ý][\wÀ-ÿ'’]*(?:\s+(?:(?:d[aeo]s?|e)\s+)?[A-ZÀ-Ý][\wÀ-ÿ'’]*)*"
+
+CPF_PATTERN = re.compile(r"(?<![\d./-])\d{3}\.\d{3}\.\d{3}-?\d{2}(?![\d./-])")
+CNPJ_PATTERN = re.compile(r"(?<![\d./-])\d{2}\.\d{3}\.\d{3}/\d{4}-?\d{2}(?![\d./-])")
+DOCUMENT_CUE_PATTERN = re.compile(r"\b(cpf|cnpj)\b\D{0,12}?(\d[\d.\-/ ]*\d|\d)", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"(?<![\d/])(\d{1,2})[/.-](\d{1,2})[/.-](\d{4}|\d{2})(?![\d/])")
+LONG_DATE_PATTERN = re.compile(r"\b(\d{1,2}) de ([a-z]+) de (\d{4})\b")
+AMOUNT_PATTERN = re.compile(
+    r"(?P<currency>R\$\s*)?(?P<sign>-\s*)?(?P<number>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:,\d+)?)"
+    r"(?:\s*(?P<unit>mil\b|milh[aã]o\b|milh[oõ]es\b|mi\b|k\b))?",
+    re.IGNORECASE,
+)
+UFS = "|".join(UF_NAMES)
+# A UF code only counts in a location context ("em SP", "estado: MG", "Curitiba/PR"),
+# not as any uppercase two-letter word ("SE EU FINANCIAR")
+UF_PATTERN = re.compile(r"(?:\b(?i:estado|uf|em|no|na|de|do|da)\b\s*:?\s*|[,/-]\s*)(" + UFS + r")\b")
+UF_ANSWER_PATTERN = re.compile(r"\s*(" + UFS + r")\s*[.!]?\s*")
+# "Belo Horizonte, MG" after a location cue ("moro em", "sou de", "imóvel no"), or
+# opening the message; a cue-less match in the middle of a sentence would take
+# the words before the city ("Sou de Porto Alegre") as part of its name
+LOCATION_CUE = r"\b(?i:em|de|do|da|no|na|para|cidade(?: de)?|munic[ií]pio(?: de)?)\s+"
+CITY_UF_PATTERN = re.compile(LOCATION_CUE + r"(" + NAME + r")\s*(?:,|-|/)\s*(" + UFS + r")\b")
+LEADING_CITY_UF_PATTERN = re.compile(r"^\s*(" + NAME + r")\s*(?:,|-|/)\s*(" + UFS + r")\b")
+# "não sou casado", "nunca fui casada": the status is denied, not given
+NEGATION = r"\b(?:nao|nunca|nem)\s+(?:\w+\s+){0,2}"
+CITY_CUE_PATTERN = re.compile(r"(?i:cidade (?:de|é|e)|munic[ií]pio de)\s+(" + NAME + ")")
+NAME_CUE_PATTERN = re.compile(
+    r"(?i:meu nome (?:é|e)|me chamo|nome completo (?:é|e)|se chama|raz[aã]o social (?:é|e))\s+(" + NAME + ")"
+)
+
+def cpf_is_valid(digits):
+    """Check the two verification digits of an 11-digit CPF"""
+    if len(digits) != 11 or len(set(digits)) == 1:
+        return False
+    for length in (9, 10):
+        total = sum(int(digit) * weight for digit, weight in zip(digits[:length], range(length + 1, 1, -1)))
+        if (total * 10) % 11 % 10 != int(digits[length]):
+            return False
+    return True
+
+def cnpj_is_valid(digits):
+    """Check the two verification digits of a 14-digit CNPJ"""
+    if len(digits) != 14 or len(set(digits)) == 1:
+        return False
+    weights = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    for length in (12, 13):
+        total = sum(int(digit) * weight for digit, weight in zip(digits[:length], weights[13 - length:]))
+        remainder = total % 11
+        if (0 if remainder < 2 else 11 - remainder) != int(digits[length]):
+            return False
+    return True
+
+def format_document(digits):
+    """Format 11 digits as a CPF (000.000.000-00) and 14 as a CNPJ (00.000.000/0000-00)"""
+    if len(digits) == 11:
+        return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+    return f"{digits[:2]}.{digits[2:5]}.{digits[5:8]}/{digits[8:12]}-{digits[12:]}"
+
+def parse_amount(number, unit=None):
+    """
+    Value of a Brazilian-formatted number ("450.000,00", "1,2", "8000")
+
+    Args:
+        number (str): The digits, with "." thousands separators and "," decimals
+        unit (str): "mil", "milhão"/"milhões"/"mi" or "k", if the amount had one
+
+    Returns:
+        float: The amount in reais
+    """
+    value = float(number.replace(".", "").replace(",", "."))
+    unit = fold_text(unit or "")
+    if unit in ("mil", "k"):
+        value *= 1000
+    elif unit in ("milhao", "milhoes", "mi"):
+        value *= 1000000
+    return value
+
+def validate_birth_date(day, month, year, today=None):
+    """
+    Build a date of birth and check it is an adult's
+
+    Returns:
+        tuple: (date string dd/mm/yyyy, None) or (None, reason it is invalid)
+    """
+    today = today or date.today()
+    if year < 100:
+        year += 1900 if year > today.year % 100 else 2000
+    try:
+        born = date(year, month, day)
+    except ValueError:
+        return None, "data inexistente"
+    if born > today:
+        return None, "data no futuro"
+    age = today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+    if age < 18:
+        return None, "o titular precisa ter pelo menos 18 anos"
+    if age > 120:
+        return None, "data de nascimento improvável"
+    return born.strftime("%d/%m/%Y"), None
+
+def nearest_cue(before, after):
+    """
+    Field an amount refers to, from the cue words closest to it
+
+    Args:
+        before (str): Folded text right before the amount
+        after (str): Folded text right after it
+
+    Returns:
+        str: "monthly_income", "property_value" or None
+    """
+    best, distance = None, None
+    for field, cues in (("monthly_income", INCOME_CUES), ("property_value", PROPERTY_CUES)):
+        for cue in cues:
+            position = before.rfind(cue)
+            if position >= 0 and (distance is None or len(before) - position < distance):
+                best, distance = field, len(before) - position
+            position = after.find(cue)
+            # Words after the amount ("R$ 6.500 por mês") only count when close
+            if 0 <= position <= 3 and (distance is None or position + 20 < distance):
+                best, distance = field, position + 20
+    return best
+
+def fields_asked(reply):
+    """
+    Fields a reply asks the user for, by keyword
+
+    Args:
+        reply (str): The agent's message
+
+    Returns:
+        list: Field names, in FIELDS order
+    """
+    folded = fold_text(reply or "")
+    # "estado civil" also contains "estado"
+    without_marital = folded.replace("estado civil", "")
+    asked = []
+    for field in FIELDS:
+        text = without_marital if field == "state" else folded
+        if any(re.search(r"\b" + keyword + r"\b", text) for keyword in FIELD_KEYWORDS[field]):
+            asked.append(field)
+    return asked
+
+def last_reply(history):
+    """Text of the last assistant message in a list of input items, or None"""
+    for item in reversed(history or []):
+        if item.get("role") != "assistant":
+            continue
+        content = item.get("content")
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return None
+
+def extract_fields(message, asked=(), today=None):
+    """
+    Recognize and validate application fields in one user message
+
+    Values with a cue ("CPF 123...", "renda de R$ 8.000", "nascido em...") or
+    an unambiguous form (a formatted CPF, a date, "São Paulo, SP") are always
+    taken. Bare answers ("R$ 12.500", "Florianópolis") are only assigned to a
+    field the previous reply asked for.
+
+    Args:
+        message (str): The user's message
+        asked (list): Fields the agent's previous reply asked for
+        today (date): Reference date for the age check (defaults to today)
+
+    Returns:
+        tuple: (values, invalid) dicts keyed by field name; invalid maps to
+            (what the user sent, reason)
+    """
+    values, invalid = {}, {}
+    text = message.strip()
+    folded = fold_text(text)
+    # Parts already recognized are blanked out so their digits and words are not read twice
+    remaining = text
+
+    def consume(match_text):
+        nonlocal remaining
+        remaining = remaining.replace(match_text, " " * len(match_text), 1)
+
+    # CPF / CNPJ
+    for match in CNPJ_PATTERN.finditer(text):
+        digits = re.sub(r"\D", "", match.group())
+        if cnpj_is_valid(digits):
+            values["cpf_number"] = format_document(digits)
+            values["person_type"] = "jurídica"
+        else:
+            invalid["cpf_number"] = (match.group(), "os dígitos verificadores do CNPJ não conferem")
+        consume(match.group())
+    for match in CPF_PATTERN.finditer(remaining):
+        digits = re.sub(r"\D", "", match.group())
+        if cpf_is_valid(digits):
+            values["cpf_number"] = format_document(digits)
+        else:
+            invalid["cpf_number"] = (match.group(), "os dígitos verificadores do CPF não conferem")
+        consume(match.group())
+
+    # Date of birth
+    birth = None
+    for match in DATE_PATTERN.finditer(remaining):
+        birth = (int(match.group(1)), int(match.group(2)), int(match.group(3))), match.group()
+        consume(match.group())
+        break
+    if birth is None:
+        match = LONG_DATE_PATTERN.search(fold_text(remaining))
+        if match and match.group(2) in MONTHS:
+            birth = (int(match.group(1)), MONTHS[match.group(2)], int(match.group(3))), match.group()
+            consume(match.group(1))
+            consume(match.group(3))
+    if birth is not None:
+        born, reason = validate_birth_date(*birth[0], today=today)
+        if born:
+            values["date_of_birth"] = born
+        else:
+            invalid["date_of_birth"] = (birth[1], reason)
+    elif any(re.search(r"\b" + cue + r"\b", folded) for cue in BIRTH_CUES):
+        # "nasci ontem": a birth date the user meant to give but that isn't one
+        phrase = re.search(r"\bnasc[^,.;!?]*", text, re.IGNORECASE)
+        invalid["date_of_birth"] = (phrase.group().strip() if phrase else text,
+                                    "data não reconhecida, informe no formato dd/mm/aaaa")
+
+    # Unformatted or incomplete numbers after "CPF"/"CNPJ" (read after the dates, whose digits are blanked out by then)
+    for match in DOCUMENT_CUE_PATTERN.finditer(remaining):
+        raw = match.group(2).strip()
+        digits = re.sub(r"\D", "", raw)
+        kind = match.group(1).upper()
+        expected, is_valid = (11, cpf_is_valid) if kind == "CPF" else (14, cnpj_is_valid)
+        if len(digits) != expected:
+            invalid["cpf_number"] = (raw, f"o {kind} deve ter {expected} dígitos")
+        elif is_valid(digits):
+            values["cpf_number"] = format_document(digits)
+            invalid.pop("cpf_number", None)
+        else:
+            invalid["cpf_number"] = (raw, f"os dígitos verificadores do {kind} não conferem")
+        consume(raw)
+    if "cpf_number" in values:
+        invalid.pop("cpf_number", None)
+    elif "cpf_number" in asked and "cpf_number" not in invalid and re.fullmatch(r"\d{11}|\d{14}", re.sub(r"[\s.\-/]", "", text)):
+        # A bare number answering "qual é o seu CPF?"
+        digits = re.sub(r"\D", "", text)
+        if (cpf_is_valid if len(digits) == 11 else cnpj_is_valid)(digits):
+            values["cpf_number"] = format_document(digits)
+        else:
+            invalid["cpf_number"] = (text, "os dígitos verificadores não conferem")
+        consume(text)
+
+    # Amounts
+    for match in AMOUNT_PATTERN.finditer(remaining):
+        field = nearest_cue(fold_text(remaining[max(0, match.start() - 40):match.start()]),
+                            fold_text(remaining[match.end():match.end() + 20]))
+        if not match.group("currency") and not match.group("unit"):
+            # A plain number is only an amount when it answers for one, or when it
+            # looks like one ("450.000", "8000") right after a cue ("imóvel de 450.000");
+            # "em 2020" is a year
+            bare = re.fullmatch(r"\s*\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?\s*|\s*\d{4,}(?:,\d{1,2})?\s*", remaining)
+            amount_like = re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d{4,}(?:,\d{1,2})?", match.group("number"))
+            year = re.search(r"\b(?:em|ano|anos|desde)\s*$", fold_text(remaining[max(0, match.start() - 10):match.start()]))
+            if not bare and not (field and amount_like and not year):
+                continue
+        value = parse_amount(match.group("number"), match.group("unit"))
+        if field is None:
+            candidates = [name for name in ("monthly_income", "property_value") if name in asked]
+            if len(candidates) != 1:
+                continue
+            field = candidates[0]
+        if match.group("sign") or value <= 0:
+            invalid[field] = (match.group().strip(), "o valor deve ser positivo")
+            values.pop(field, None)
+        elif field not in values:
+            values[field] = value
+            invalid.pop(field, None)
+
+    # Marital status and person type
+    for word, status in MARITAL_STATUS.items():
+        if re.search(r"\b" + word + r"\b", folded):
+            if not re.search(NEGATION + word + r"\b", folded):
+                values["marital_status"] = status
+            break
+    if re.search(r"\b(pessoa juridica|pj|cnpj)\b", folded):
+        values["person_type"] = "jurídica"
+    elif re.search(r"\b(pessoa fisica|pf)\b", folded) or ("person_type" in asked and folded == "fisica"):
+        values["person_type"] = "física"
+    elif "person_type" in asked and folded == "juridica":
+        values["person_type"] = "jurídica"
+
+    # Name
+    match = NAME_CUE_PATTERN.search(text)
+    if match:
+        values["full_name"] = match.group(1)
+
+    # City and state: "Belo Horizonte, MG" or "Belo Horizonte - MG"
+    match = CITY_UF_PATTERN.search(text) or LEADING_CITY_UF_PATTERN.search(text)
+    if match:
+        values["city"] = match.group(1)
+        values["state"] = match.group(2)
+    else:
+        match = CITY_CUE_PATTERN.search(text)
+        if match:
+            values["city"] = match.group(1)
+    if "state" not in values:
+        match = UF_PATTERN.search(text) or ("state" in asked and UF_ANSWER_PATTERN.fullmatch(text))
+        if match:
+            values["state"] = match.group(1)
+        else:
+            # A state written out after "estado", or as (most of) the answer;
+            # "São Paulo" and "Rio de Janeiro" are cities too, so other
+            # mentions in longer messages need the UF
+            bare = "state" in asked or (not asked and len(folded.split()) <= 4)
+            for name, uf in UF_BY_NAME.items():
+                if re.search(r"\bestado (?:e |de |do |da )?" + name + r"\b", folded) or (
+                        bare and re.search(r"\b" + name + r"\b", folded)):
+                    values["state"] = uf
+                    break
+
+    # A bare capitalized answer ("Carlos Eduardo Mendes", "Florianópolis")
+    if not values and not invalid and re.fullmatch(NAME, text.rstrip(".!")):
+        candidates = [name for name in ("full_name", "city") if name in asked]
+        if len(candidates) == 1 and (candidates[0] == "city" or len(text.split()) >= 2):
+            values[candidates[0]] = text.rstrip(".!")
+
+    return values, invalid
+
+class ApplicationSlots:
+    def __init__(self, values=None, invalid=None):
+        """
+        Application fields collected so far in a conversation
+
+        Args:
+            values (dict): Valid values by field name
+            invalid (dict): (value sent, reason) by field name, for values that failed validation
+        """
+        self.values = dict(values or {})
+        self.invalid = dict(invalid or {})
+
+    def update(self, message, last_reply=None, today=None):
+        """
+        Extract the fields of a new user message into the state
+
+        Args:
+            message (str): The user's message
+            last_reply (str): The agent's previous message, to read bare answers
+            today (date): Reference date for the age check
+
+        Returns:
+            list: Fields that got a valid value from this message
+        """
+        asked = [field for field in fields_asked(last_reply) if field not in self.values or field in self.invalid]
+        values, invalid = extract_fields(message, asked=asked, today=today)
+        before = dict(self.values)
+        for field, reason in invalid.items():
+            # A correction that fails validation replaces the previous value
+            self.values.pop(field, None)
+            self.invalid[field] = reason
+        for field, value in values.items():
+            self.values[field] = value
+            self.invalid.pop(field, None)
+        if "city" in self.values and ("city" in values or "state" in values):
+            self._normalize_location()
+        return [field for field in FIELDS if field in self.values and self.values[field] != before.get(field)]
+
+    def _normalize_location(self):
+        """Official name and UF of the city, the UF being filled in when only one city has that name"""
+        location = normalize_location(self.values.get("state"), self.values["city"])
+        if location["found"]:
+            self.values["city"], self.values["state"] = location["city"], location["state"]
+            self.invalid.pop("state", None)
+        elif location["match"] == "fuzzy":
+            # Possibly another city: the user confirms the suggestion
+            city = self.values.pop("city")
+            self.invalid["city"] = (city, f"cidade não encontrada; confirme se é {' ou '.join(location['suggestions'])}")
+        elif location["match"] == "not_found":
+            city = self.values.pop("city")
+            suggestions = ", ".join(location["suggestions"])
+            self.invalid["city"] = (city, "cidade não encontrada" + (f"; sugestões: {suggestions}" if suggestions else ""))
+
+    def missing(self):
+        """Fields without a valid value, in the order they are asked"""
+        return [field for field in FIELDS if field not in self.values]
+
+    @property
+    def is_complete(self):
+        return not self.missing()
+
+    def to_prompt(self):
+        """The state as a section appended to the application agent's instructions"""
+        lines = ["# Application data already collected",
+                 "Extracted automatically from the user's messages and validated locally, so they can "
+                 "still be misread. Don't ask for them from scratch: when you ask for what is missing, list "
+                 "these values back so the user can correct them, and use any correction instead."]
+        for field in FIELDS:
+            if field in self.values:
+                lines.append(f"- {field}: {self.values[field]}")
+        if len(lines) == 2:
+            lines.append("- (nothing yet)")
+        if self.invalid:
+            lines += ["", "# Invalid data", "Explain the problem to the user and ask for the value again."]
+            for field in FIELDS:
+                if field in self.invalid:
+                    value, reason = self.invalid[field]
+                    lines.append(f'- {field}: "{value}" ({reason})')
+        missing = [field for field in self.missing() if field not in self.invalid]
+        if missing:
+            lines += ["", "# Still missing",
+                      "The conversation may contain some of these in a form the extractor did not recognize; "
+                      "use them if so."]
+            lines += [f"- {field}: {FIELD_LABELS[field]}" for field in missing]
+        lines.append("")
+        if self.is_complete:
+            lines.append("Every field is filled: show the user these values and call apply_for_real_estate_financing "
+                         "once they confirm them (right away if they already confirmed this data).")
+        else:
+            lines.append("Ask for all of the invalid and missing fields above in a single message.")
+        return "\n".join(lines)
@@ -0,0 +1,93 @@
+import os
+import hashlib
+import threading
+
+from utils.text import fold_text
+from utils.lru_cache import BoundedTTLCache
+
+def normalize_question(question):
+    """Cache key of a question: accents, case and punctuation folded"""
+    return fold_text(question)
+
+def agent_fingerprint(agent):
+    """Hash of everything that shapes the agent's answers (instructions, model, settings)"""
+    source = "\n".join([agent.name, str(agent.instructions), str(agent.model), repr(agent.model_settings)])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+class AnswerCache:
+    def __init__(self, max_entries=1000, ttl_seconds=24 * 3600):
+        """
+        Exact-match cache of answers to single-turn, context-free questions
+
+        Each answer remembers the fingerprint of the agent that produced it, so
+        an entry is invalidated on lookup once the agent's instructions change.
+
+        Args:
+            max_entries (int): Maximum number of cached answers (least recently used are evicted)
+            ttl_seconds (float): Entries not used for this long are expired
+        """
+        self._cache = BoundedTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured through the ANSWER_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 1000)),
+            ttl_seconds=float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 24 * 3600)),
+        )
+
+    def get(self, question, agent):
+        """
+        Return the cached answer of agent to question, or None
+
+        Args:
+            question (str): The user's message
+            agent (Agent): The agent whose answer is wanted
+        """
+        key = normalize_question(question)
+        entry = self._cache.get(key) if key else None
+
+        if entry is not None and entry[1] != agent_fingerprint(agent):
+            # The agent changed since this answer was cached
+            self._cache.pop(key)
+            entry = None
+            with self._lock:
+                self.invalidations += 1
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry[0] if entry is not None else None
+
+    def set(self, question, agent, answer):
+        """Cache agent's answer to question"""
+        key = normalize_question(question)
+        if key and answer:
+            self._cache.set(key, (answer, agent_fingerprint(agent)))
+
+    def invalidate(self, question):
+        """Drop the cached answer to question"""
+        self._cache.pop(normalize_question(question))
+
+    def stats(self):
+        """Return hit rate, evictions and invalidations"""
+        cache_stats = self._cache.stats()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": cache_stats["entries"],
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": cache_stats["evictions"],
+                "expirations": cache_stats["expirations"],
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,309 @@
+import os
+import json
+import zlib
+import atexit
+import logging
+import threading
+
+import numpy as np
+
+from ai_agents.questions.answer_cache import agent_fingerprint
+from ai_agents.triage.intent_router import extract_features
+from utils.text import fold_text
+
+logger = logging.getLogger(__name__)
+
+# Words that change the answer while barely changing the text: negations,
+# opposites, person types, banks, days, amortization systems and units.
+# Two questions are only treated as paraphrases if they have the same ones
+# (and the same numbers), whatever their similarity.
+GUARD_WORDS = {
+    "nao", "nunca", "nem", "sem", "jamais",
+    "maximo", "minimo", "maxima", "minima", "maior", "menor", "mais", "menos", "antes", "depois",
+    "fisica", "juridica", "pf", "pj", "cnpj", "novo", "nova", "usado", "usada", "comprar", "vender",
+    "caixa", "itau", "bradesco", "santander", "brasil", "nubank", "inter", "sicoob", "sicredi",
+    "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo", "feriado", "feriados",
+    "sac", "price", "mil", "milhao", "milhoes", "mes", "meses", "ano", "anos", "dia", "dias",
+}
+
+def guard_tokens(question):
+    """Numbers and GUARD_WORDS of a question, which a reused answer must share"""
+    return frozenset(word for word in fold_text(question).split() if word.isdigit() or word in GUARD_WORDS)
+
+def embed_question(question, dim=256):
+    """
+    Hashed bag-of-features vector of a question, L2-normalized
+
+    Word stems and character trigrams are hashed into dim buckets with a sign
+    bit, so paraphrases sharing content words ("quais documentos preciso" and
+    "documentos necessarios") land close together without any embedding service.
+    Word bigrams are left out: they mostly encode phrasing ("o que e") shared
+    by unrelated questions. Numbers and guard words get features of their own,
+    weighted up, so "500 mil" and "300 mil" or "maximo" and "minimo" drift apart.
+
+    Args:
+        question (str): The question text
+        dim (int): Number of hash buckets
+
+    Returns:
+        np.ndarray: float32 vector of length dim
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in extract_features(question).items():
+        if feature.startswith("b:"):
+            continue
+        bucket = zlib.crc32(feature.encode("utf-8"))
+        vector[bucket % dim] += weight if bucket & 0x80000000 else -weight
+    for token in guard_tokens(question):
+        bucket = zlib.crc32(f"g:{token}".encode("utf-8"))
+        vector[bucket % dim] += 2.0 if bucket & 0x80000000 else -2.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+class SemanticCache:
+    def __init__(self, dim=256, capacity=10000, threshold=0.9, path=None, save_every=20):
+        """
+        Similarity cache of questions_agent answers over a preallocated NumPy matrix
+
+        Row i of the matrix holds the vector of questions[i]; a lookup is one
+        matrix-vector product over the filled rows. When full, the least recently
+        used row is overwritten. A cached answer is only reused for a question
+        with the same numbers and guard words (see GUARD_WORDS): the vectors are
+        lexical, so "prazo maximo" and "prazo minimo" are close but not paraphrases.
+
+        Args:
+            dim (int): Dimension of the hashed question vectors
+            capacity (int): Maximum number of cached answers
+            threshold (float): Minimum cosine similarity for a cached answer to be reused
+            path (str): File prefix to persist the cache to (None keeps it in memory only)
+            save_every (int): Save to path after this many insertions (and at exit)
+        """
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._questions = []
+        self._guards = []
+        self._answers = []
+        self._fingerprints = []
+        self._clock = 0
+        self._unsaved = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.guard_rejections = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if path:
+            self.load()
+
+    @classmethod
+    def from_env(cls):
+        """Create a cache configured through the SEMANTIC_CACHE_* environment variables"""
+        cache = cls(
+            dim=int(os.environ.get("SEMANTIC_CACHE_DIM", 256)),
+            capacity=int(os.environ.get("SEMANTIC_CACHE_CAPACITY", 10000)),
+            threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.9)),
+            path=os.environ.get("SEMANTIC_CACHE_PATH") or None,
+            save_every=int(os.environ.get("SEMANTIC_CACHE_SAVE_EVERY", 20)),
+        )
+        if cache.path:
+            # Keep the last insertions of a warm cache across restarts
+            atexit.register(cache.save)
+        return cache
+
+    def __len__(self):
+        return len(self._questions)
+
+    def _tick(self):
+        """Logical clock for LRU ordering"""
+        self._clock += 1
+        return self._clock
+
+    def _search(self, vector, guard=None, threshold=0.0):
+        """
+        Return (row, similarity) of the closest cached question, or (None, 0.0)
+
+        With guard, only questions at or above threshold that have the same
+        guard tokens are considered.
+        """
+        size = len(self._questions)
+        if size == 0:
+            return None, 0.0
+        similarities = self._vectors[:size] @ vector
+        if guard is None:
+            row = int(np.argmax(similarities))
+            return row, float(similarities[row])
+        candidates = np.nonzero(similarities >= threshold)[0]
+        for row in candidates[np.argsort(similarities[candidates])[::-1]]:
+            if self._guards[row] == guard:
+                return int(row), float(similarities[row])
+        return None, 0.0
+
+    def _remove(self, row):
+        """Drop a row by moving the last filled row into its place"""
+        last = len(self._questions) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._last_used[row] = self._last_used[last]
+            self._questions[row] = self._questions[last]
+            self._guards[row] = self._guards[last]
+            self._answers[row] = self._answers[last]
+            self._fingerprints[row] = self._fingerprints[last]
+        self._vectors[last] = 0
+        self._questions.pop()
+        self._guards.pop()
+        self._answers.pop()
+        self._fingerprints.pop()
+
+    def get(self, question, agent):
+        """
+        Return the answer cached for the most similar question, or None
+
+        Args:
+            question (str): The user's message
+            agent (Agent): The agent whose answer is wanted
+        """
+        vector = embed_question(question, self.dim)
+        guard = guard_tokens(question)
+        fingerprint = agent_fingerprint(agent)
+        with self._lock:
+            row, similarity = self._search(vector, guard, self.threshold)
+            if row is None:
+                # Close questions that differ in a number or guard word don't count
+                if self._search(vector)[1] >= self.threshold:
+                    self.guard_rejections += 1
+                self.misses += 1
+                return None
+            if self._fingerprints[row] != fingerprint:
+                # The agent changed since this answer was cached
+                self._remove(row)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._last_used[row] = self._tick()
+            self.hits += 1
+            return self._answers[row]
+
+    def set(self, question, agent, answer):
+        """
+        Cache agent's answer to question
+
+        A question nearly identical to a cached one replaces it instead of
+        taking a new row.
+        """
+        if not answer:
+            return
+        vector = embed_question(question, self.dim)
+        if not vector.any():
+            return
+        guard = guard_tokens(question)
+        with self._lock:
+            row, similarity = self._search(vector, guard, 0.99)
+            if row is None:
+                if len(self._questions) < self.capacity:
+                    row = len(self._questions)
+                    self._questions.append(None)
+                    self._guards.append(None)
+                    self._answers.append(None)
+                    self._fingerprints.append(None)
+                else:
+                    row = int(np.argmin(self._last_used))
+                    self.evictions += 1
+            self._vectors[row] = vector
+            self._last_used[row] = self._tick()
+            self._questions[row] = question
+            self._guards[row] = guard
+            self._answers[row] = answer
+            self._fingerprints[row] = agent_fingerprint(agent)
+            self._unsaved += 1
+            save_now = self.path and self._unsaved >= self.save_every
+        if save_now:
+            self.save()
+
+    def save(self):
+        """Write the cache (vectors, questions and answers) to <path>.npz"""
+        if not self.path:
+            return
+        with self._save_lock:
+            self._write()
+
+    def _write(self):
+        """Snapshot the entries under the lock, then write them outside it"""
+        with self._lock:
+            size = len(self._questions)
+            vectors = self._vectors[:size].copy()
+            last_used = self._last_used[:size].copy()
+            entries = {
+                "dim": self.dim,
+                "questions": list(self._questions),
+                "answers": list(self._answers),
+                "fingerprints": list(self._fingerprints),
+            }
+            self._unsaved = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Vectors and answers go in one file, swapped in with a single rename: workers
+        # saving at the same time can't pair one's vectors with another's answers.
+        # The temporary name is per process, so their writes don't mix either.
+        temporary = f"{self.path}.npz.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.savez(f, vectors=vectors, last_used=last_used, entries=np.array(json.dumps(entries, ensure_ascii=False)))
+        os.replace(temporary, f"{self.path}.npz")
+
+    def load(self):
+        """Read the cache saved at path, if any (a cache of another dimension is ignored)"""
+        try:
+            with np.load(f"{self.path}.npz") as arrays:
+                vectors = arrays["vectors"]
+                last_used = arrays["last_used"]
+                entries = json.loads(str(arrays["entries"]))
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Could not load semantic cache from {self.path}: {e}")
+            return
+
+        if entries.get("dim") != self.dim or len(entries["questions"]) != len(vectors):
+            logger.warning(f"Ignoring semantic cache at {self.path}: incompatible with dim={self.dim}")
+            return
+
+        # Keep the most recently used entries if the capacity shrank
+        keep = np.argsort(last_used)[::-1][:self.capacity]
+        with self._lock:
+            size = len(keep)
+            self._vectors[:size] = vectors[keep]
+            self._last_used[:size] = last_used[keep]
+            self._questions = [entries["questions"][i] for i in keep]
+            self._guards = [guard_tokens(question) for question in self._questions]
+            self._answers = [entries["answers"][i] for i in keep]
+            self._fingerprints = [entries["fingerprints"][i] for i in keep]
+            self._clock = int(last_used.max()) if len(last_used) else 0
+        logger.info(f"Loaded {size} semantic cache entries from {self.path}")
+
+    def stats(self):
+        """Return hit rate, evictions, invalidations and memory used by the matrix"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._questions),
+                "capacity": self.capacity,
+                "dim": self.dim,
+                "threshold": self.threshold,
+                "matrix_bytes": self._vectors.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "guard_rejections": self.guard_rejections,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,208 @@
+import numpy as np
+
+from utils.text import fold_text
+
+# Amortization systems
+SAC = "SAC"
+PRICE = "PRICE"
+SYSTEMS = (SAC, PRICE)
+
+# Longest term offered for real estate financing (35 years)
+MAX_MONTHS = 420
+
+# Reference conditions used when the user does not give their own (not a credit offer)
+DEFAULT_ANNUAL_RATE = {"fisica": 0.1149, "juridica": 0.1299}
+DEFAULT_MONTHS = 360
+DEFAULT_DOWN_PAYMENT_RATIO = 0.2
+MIP_MONTHLY_RATE = 0.00025   # Death and disability insurance, on the outstanding balance
+DFI_MONTHLY_RATE = 0.00007   # Property damage insurance, on the property value
+ADMIN_FEE = 25.0             # Monthly administration fee
+
+# One row per month of a schedule
+SCHEDULE_DTYPE = np.dtype([
+    ("month", np.int16),
+    ("installment", np.float64),    # Interest + amortization
+    ("interest", np.float64),
+    ("amortization", np.float64),
+    ("balance", np.float64),        # Outstanding balance after the payment
+    ("insurance", np.float64),      # MIP + DFI
+    ("total_payment", np.float64),  # Installment + insurance + admin fee (the CET cash flow)
+])
+
+def monthly_rate(annual_rate):
+    """Equivalent monthly rate of an effective annual rate"""
+    return (1 + annual_rate) ** (1 / 12) - 1
+
+def person_type_key(person_type):
+    """
+    "juridica" or "fisica", the key of DEFAULT_ANNUAL_RATE for a person type as the user wrote it
+
+    "Pessoa Jurídica", "PJ", "empresa com CNPJ" are companies; anything else
+    ("física", "PF", "pessoa física") is an individual.
+    """
+    words = fold_text(person_type or "").split()
+    if any(word.startswith("juridic") or word in ("pj", "cnpj", "empresa") for word in words):
+        return "juridica"
+    return "fisica"
+
+class FinancingTerms:
+    def __init__(self, property_value, annual_rate=DEFAULT_ANNUAL_RATE["fisica"], months=DEFAULT_MONTHS,
+                 down_payment=None, mip_rate=MIP_MONTHLY_RATE, dfi_rate=DFI_MONTHLY_RATE, admin_fee=ADMIN_FEE,
+                 upfront_fees=0.0):
+        """
+        Conditions of a real estate loan
+
+        Args:
+            property_value (float): Value of the property
+            annual_rate (float): Effective annual interest rate (0.1149 for 11.49% a.a.)
+            months (int): Term in months (1 to MAX_MONTHS)
+            down_payment (float): Amount paid upfront (defaults to DEFAULT_DOWN_PAYMENT_RATIO of the value)
+            mip_rate (float): Monthly death and disability insurance rate, on the outstanding balance
+            dfi_rate (float): Monthly property damage insurance rate, on the property value
+            admin_fee (float): Monthly administration fee
+            upfront_fees (float): Fees deducted from the loan when it is released (appraisal, registry)
+        """
+        if property_value <= 0:
+            raise ValueError("property_value must be positive")
+        if not 1 <= months <= MAX_MONTHS:
+            raise ValueError(f"months must be between 1 and {MAX_MONTHS}")
+        if down_payment is None:
+            down_payment = property_value * DEFAULT_DOWN_PAYMENT_RATIO
+        if not 0 <= down_payment < property_value:
+            raise ValueError("down_payment must be smaller than property_value")
+
+        self.property_value = float(property_value)
+        self.annual_rate = float(annual_rate)
+        self.months = int(months)
+        self.down_payment = float(down_payment)
+        self.mip_rate = mip_rate
+        self.dfi_rate = dfi_rate
+        self.admin_fee = admin_fee
+        self.upfront_fees = upfront_fees
+
+    @classmethod
+    def for_person_type(cls, person_type, property_value, **kwargs):
+        """Terms with the reference rate for 'física' or 'jurídica' (see person_type_key)"""
+        rate = DEFAULT_ANNUAL_RATE[person_type_key(person_type)]
+        kwargs.setdefault("annual_rate", rate)
+        return cls(property_value, **kwargs)
+
+    @property
+    def loan_amount(self):
+        return self.property_value - self.down_payment
+
+    @property
+    def monthly_rate(self):
+        return monthly_rate(self.annual_rate)
+
+def build_schedule(terms, system=SAC):
+    """
+    Month-by-month schedule of a loan, computed in closed form over NumPy arrays
+
+    Args:
+        terms (FinancingTerms): Loan conditions
+        system (str): SAC (constant amortization) or PRICE (constant installment)
+
+    Returns:
+        np.ndarray: Structured array of SCHEDULE_DTYPE with terms.months rows
+    """
+    principal = terms.loan_amount
+    rate = terms.monthly_rate
+    n = terms.months
+    elapsed = np.arange(n, dtype=np.float64)  # Months already paid before each row
+
+    if system == SAC:
+        amortization = np.full(n, principal / n)
+        balance_before = principal - amortization[0] * elapsed
+        interest = balance_before * rate
+        installment = amortization + interest
+    elif system == PRICE:
+        if rate == 0:
+            installment = np.full(n, principal / n)
+            balance_before = principal - installment[0] * elapsed
+        else:
+            payment = principal * rate / (1 - (1 + rate) ** -n)
+            growth = (1 + rate) ** elapsed
+            balance_before = principal * growth - payment * (growth - 1) / rate
+            installment = np.full(n, payment)
+        interest = balance_before * rate
+        amortization = installment - interest
+    else:
+        raise ValueError(f"Unknown amortization system: {system}")
+
+    schedule = np.empty(n, dtype=SCHEDULE_DTYPE)
+    schedule["month"] = elapsed + 1
+    schedule["installment"] = installment
+    schedule["interest"] = interest
+    schedule["amortization"] = amortization
+    schedule["balance"] = balance_before - amortization
+    # Clear the floating point residue left after the last month
+    schedule["balance"][schedule["balance"] < 1e-6] = 0.0
+    schedule["insurance"] = balance_before * terms.mip_rate + terms.property_value * terms.dfi_rate
+    schedule["total_payment"] = installment + schedule["insurance"] + terms.admin_fee
+    return schedule
+
+def internal_rate_of_return(cash_flows, present_value, guess=0.01, tolerance=1e-10, max_iterations=50):
+    """
+    Monthly rate that discounts cash_flows (paid at months 1..n) to present_value, by Newton's method
+
+    Args:
+        cash_flows (np.ndarray): Payments of every month
+        present_value (float): Amount received at month 0
+        guess (float): Starting rate
+
+    Returns:
+        float: The monthly rate, or nan if it did not converge
+    """
+    months = np.arange(1, len(cash_flows) + 1, dtype=np.float64)
+    rate = guess
+    for _ in range(max_iterations):
+        discount = (1 + rate) ** -months
+        value = cash_flows @ discount - present_value
+        derivative = -(months * cash_flows) @ (discount / (1 + rate))
+        step = value / derivative
+        rate -= step
+        if abs(step) < tolerance:
+            return rate
+    return float("nan")
+
+def summarize(schedule, terms):
+    """
+    Compact description of a schedule for the agent
+
+    CET (custo efetivo total) is the annual rate that equates everything the
+    borrower pays (installments, insurance and fees) to the amount actually
+    released, net of upfront fees.
+    """
+    cet_monthly = internal_rate_of_return(
+        schedule["total_payment"],
+        terms.loan_amount - terms.upfront_fees,
+        guess=terms.monthly_rate,
+    )
+    return {
+        "first_installment": round(float(schedule["total_payment"][0]), 2),
+        "last_installment": round(float(schedule["total_payment"][-1]), 2),
+        "total_paid": round(float(schedule["total_payment"].sum()), 2),
+        "total_interest": round(float(schedule["interest"].sum()), 2),
+        "total_insurance": round(float(schedule["insurance"].sum()), 2),
+        "cet_monthly": round(float(cet_monthly), 6),
+        "cet_annual": round(float((1 + cet_monthly) ** 12 - 1), 6),
+    }
+
+def simulate(terms, systems=SYSTEMS):
+    """
+    Build the schedule of every system and summarize them
+
+    Returns:
+        tuple: (summary dict, {system: schedule array})
+    """
+    schedules = {system: build_schedule(terms, system) for system in systems}
+    summary = {
+        "property_value": terms.property_value,
+        "down_payment": round(terms.down_payment, 2),
+        "loan_amount": round(terms.loan_amount, 2),
+        "annual_rate": terms.annual_rate,
+        "months": terms.months,
+        "systems": {system: summarize(schedule, terms) for system, schedule in schedules.items()},
+    }
+    return summary, schedules
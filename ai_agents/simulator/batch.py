@@ -0,0 +1,273 @@
+import math
+
+import numpy as np
+
+from ai_agents.simulator.amortization import (
+    SAC, SYSTEMS, MAX_MONTHS, MIP_MONTHLY_RATE, DFI_MONTHLY_RATE, ADMIN_FEE,
+)
+
+# Grid axes, in the order of the result dimensions
+AXES = ("property_value", "down_payment_ratio", "months", "annual_rate")
+
+# Largest grid simulate_grid builds in one pass (larger grids go through iter_grid_chunks)
+MAX_GRID_SCENARIOS = 1000000
+
+# Summary of one scenario under one system (the fields of amortization.summarize)
+GRID_DTYPE = np.dtype([
+    ("loan_amount", np.float64),
+    ("first_installment", np.float64),
+    ("last_installment", np.float64),
+    ("total_paid", np.float64),
+    ("total_interest", np.float64),
+    ("total_insurance", np.float64),
+    ("cet_annual", np.float64),
+])
+
+def parse_axis(spec, max_values=None):
+    """
+    Values of a grid axis from a list, a single number or a range
+
+    The number of values is checked before any array is built, so a huge range
+    is rejected instead of exhausting memory.
+
+    Args:
+        spec: [v1, v2, ...], v, {"start", "stop", "step"} (stop included) or {"start", "stop", "num"}
+        max_values (int): Largest number of values accepted (None for no limit)
+
+    Returns:
+        np.ndarray: float64 values
+
+    Raises:
+        ValueError: If the spec is malformed, not finite, empty or longer than max_values
+    """
+    if isinstance(spec, dict):
+        start, stop = float(spec["start"]), float(spec["stop"])
+        if not (np.isfinite(start) and np.isfinite(stop)):
+            raise ValueError("start and stop must be finite numbers")
+        if "num" in spec:
+            count = int(spec["num"])
+            if count < 1:
+                raise ValueError("num must be at least 1")
+        else:
+            step = float(spec["step"])
+            if not np.isfinite(step) or step <= 0:
+                raise ValueError("step must be a positive number")
+            if stop < start:
+                raise ValueError("stop must not be lower than start")
+            # Same count as the arange below (half a step of slack includes a stop on the grid)
+            steps = (stop - start) / step
+            if not np.isfinite(steps):
+                raise ValueError("range has too many values")
+            count = int(np.ceil(steps + 0.5))
+        if max_values is not None and count > max_values:
+            raise ValueError(f"range has {count} values, the limit is {max_values}")
+        if "num" in spec:
+            return np.linspace(start, stop, count)
+        return np.arange(start, stop + step / 2, step)
+
+    values = np.atleast_1d(np.asarray(spec, dtype=np.float64))
+    if values.ndim != 1:
+        raise ValueError("an axis must be a number or a flat list of numbers")
+    if values.size == 0:
+        raise ValueError("an axis needs at least one value")
+    if not np.all(np.isfinite(values)):
+        raise ValueError("axis values must be finite numbers")
+    if max_values is not None and values.size > max_values:
+        raise ValueError(f"axis has {values.size} values, the limit is {max_values}")
+    return values
+
+class ScenarioGrid:
+    def __init__(self, axes, results):
+        """
+        Summaries of every scenario of a parameter grid
+
+        Args:
+            axes (dict): Axis name -> values, in AXES order
+            results (dict): System -> structured array of GRID_DTYPE shaped like the grid
+        """
+        self.axes = axes
+        self.results = results
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.axes.values())
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    def to_columns(self):
+        """Compact columnar form: axes, shape and one flat (C order) list per field and system"""
+        return {
+            "axes": {name: values.tolist() for name, values in self.axes.items()},
+            "shape": list(self.shape),
+            "systems": {
+                system: {field: np.round(result[field], 6).ravel().tolist() for field in GRID_DTYPE.names}
+                for system, result in self.results.items()
+            },
+        }
+
+def _discounted_sum(level, slope, geometric, ratio, months, rate):
+    """
+    Present value at rate of cash flows level + slope * k + geometric * ratio ** (k - 1), k = 1..months
+
+    Every input is an array broadcast over the scenarios.
+    """
+    v = 1 / (1 + rate)
+    v_n = v ** months
+    annuity = (1 - v_n) / rate                                             # sum of v^k
+    increasing = v * (1 - (months + 1) * v_n + months * v_n * v) / (1 - v) ** 2  # sum of k v^k
+    growth = ratio * v
+    # sum of ratio^(k-1) v^k, which tends to months * v as ratio * v approaches 1
+    near_one = np.abs(1 - growth) < 1e-12
+    safe = np.where(near_one, 0.5, 1 - growth)
+    geometric_sum = np.where(near_one, months * v, v * (1 - growth ** months) / safe)
+    return level * annuity + slope * increasing + geometric * geometric_sum
+
+def _solve_cet(level, slope, geometric, ratio, months, present_value, guess, tolerance=1e-10, max_iterations=50):
+    """Monthly IRR of every scenario at once, by Newton's method with a numerical derivative"""
+    rate = guess.copy()
+    for _ in range(max_iterations):
+        value = _discounted_sum(level, slope, geometric, ratio, months, rate) - present_value
+        step_size = 1e-7
+        derivative = (_discounted_sum(level, slope, geometric, ratio, months, rate + step_size) - present_value - value) / step_size
+        step = value / derivative
+        rate = rate - step
+        if np.all(np.abs(step) < tolerance):
+            break
+    return rate
+
+def grid_axes(property_values, down_payment_ratios, months, annual_rates, systems=SYSTEMS):
+    """
+    Parse and validate the axes of a grid (and the systems to compute)
+
+    Returns:
+        dict: Axis name -> values, in AXES order
+
+    Raises:
+        ValueError: If a value is out of range or a system is unknown
+    """
+    axes = {
+        "property_value": parse_axis(property_values),
+        "down_payment_ratio": parse_axis(down_payment_ratios),
+        "months": np.round(parse_axis(months)),
+        "annual_rate": parse_axis(annual_rates),
+    }
+    if np.any(axes["property_value"] <= 0):
+        raise ValueError("property values must be positive")
+    if np.any((axes["down_payment_ratio"] < 0) | (axes["down_payment_ratio"] >= 1)):
+        raise ValueError("down payment ratios must be in [0, 1)")
+    if np.any((axes["months"] < 1) | (axes["months"] > MAX_MONTHS)):
+        raise ValueError(f"months must be between 1 and {MAX_MONTHS}")
+    if np.any(axes["annual_rate"] <= 0):
+        raise ValueError("annual rates must be positive")
+    for system in systems:
+        if system not in SYSTEMS:
+            raise ValueError(f"Unknown amortization system: {system}")
+    return axes
+
+def grid_size(axes):
+    """Number of scenarios of a grid, as a Python int (NumPy's product would overflow)"""
+    return math.prod(len(values) for values in axes.values())
+
+def simulate_grid(property_values, down_payment_ratios=(0.2,), months=(360,), annual_rates=(0.1149,),
+                  systems=SYSTEMS, mip_rate=MIP_MONTHLY_RATE, dfi_rate=DFI_MONTHLY_RATE,
+                  admin_fee=ADMIN_FEE, upfront_fees=0.0, max_scenarios=MAX_GRID_SCENARIOS):
+    """
+    Summarize every combination of the given parameters in one vectorized pass
+
+    The cash flows of both systems have closed forms (SAC payments fall
+    linearly, Price insurance follows the geometric balance), so totals and
+    CET are computed per scenario without building month-by-month schedules.
+    Results match amortization.summarize for the same terms.
+
+    Args:
+        property_values: Property values (any spec accepted by parse_axis)
+        down_payment_ratios: Down payment as a fraction of the value
+        months: Terms in months (1 to MAX_MONTHS)
+        annual_rates: Effective annual interest rates
+        systems (tuple): Amortization systems to compute
+        mip_rate (float): Monthly death and disability insurance rate, on the outstanding balance
+        dfi_rate (float): Monthly property damage insurance rate, on the property value
+        admin_fee (float): Monthly administration fee
+        upfront_fees (float): Fees deducted from the loan when it is released
+        max_scenarios (int): Largest grid accepted, checked before any grid-sized array is built
+
+    Returns:
+        ScenarioGrid: One summary array per system, shaped (values, down payments, months, rates)
+
+    Raises:
+        ValueError: If an axis is invalid or the grid has more than max_scenarios scenarios
+    """
+    axes = grid_axes(property_values, down_payment_ratios, months, annual_rates, systems)
+    size = grid_size(axes)
+    if size > max_scenarios:
+        raise ValueError(f"grid has {size} scenarios, the limit is {max_scenarios}")
+
+    # Broadcast every axis to the full grid shape
+    value, ratio, n, annual_rate = np.meshgrid(*axes.values(), indexing="ij", sparse=True)
+    principal = value * (1 - ratio)
+    rate = (1 + annual_rate) ** (1 / 12) - 1
+    growth = 1 + rate
+    property_insurance = value * dfi_rate
+    shape = np.broadcast_shapes(value.shape, ratio.shape, n.shape, annual_rate.shape)
+
+    results = {}
+    for system in systems:
+        if system == SAC:
+            amortization = principal / n
+            # Payment of month k: amortization + (rate + mip) * balance before it, which falls linearly
+            level = amortization + (rate + mip_rate) * (principal + amortization) + property_insurance + admin_fee
+            slope = -(rate + mip_rate) * amortization
+            geometric = np.zeros(shape)
+            total_interest = rate * principal * (n + 1) / 2
+            total_insurance = mip_rate * principal * (n + 1) / 2 + property_insurance * n
+            first = amortization + (rate + mip_rate) * principal + property_insurance + admin_fee
+            last = amortization + (rate + mip_rate) * amortization + property_insurance + admin_fee
+        else:
+            payment = principal * rate / (1 - growth ** -n)
+            # Balance before month k: payment / rate + (principal - payment / rate) * growth^(k-1)
+            perpetuity = payment / rate
+            level = payment + mip_rate * perpetuity + property_insurance + admin_fee
+            slope = np.zeros(shape)
+            geometric = mip_rate * (principal - perpetuity)
+            total_interest = payment * n - principal
+            balance_sum = perpetuity * n + (principal - perpetuity) * (growth ** n - 1) / rate
+            total_insurance = mip_rate * balance_sum + property_insurance * n
+            first = payment + mip_rate * principal + property_insurance + admin_fee
+            last_balance = perpetuity + (principal - perpetuity) * growth ** (n - 1)
+            last = payment + mip_rate * last_balance + property_insurance + admin_fee
+
+        cet_monthly = _solve_cet(
+            np.broadcast_to(level, shape), np.broadcast_to(slope, shape), np.broadcast_to(geometric, shape),
+            np.broadcast_to(growth, shape), np.broadcast_to(n, shape),
+            np.broadcast_to(principal - upfront_fees, shape), np.broadcast_to(rate, shape).copy(),
+        )
+
+        result = np.empty(shape, dtype=GRID_DTYPE)
+        result["loan_amount"] = principal
+        result["first_installment"] = first
+        result["last_installment"] = last
+        result["total_paid"] = principal + total_interest + total_insurance + admin_fee * n
+        result["total_interest"] = total_interest
+        result["total_insurance"] = total_insurance
+        result["cet_annual"] = (1 + cet_monthly) ** 12 - 1
+        results[system] = result
+
+    return ScenarioGrid(axes, results)
+
+def iter_grid_chunks(property_values, chunk_size=1000, **kwargs):
+    """
+    Simulate a large grid a few property values at a time
+
+    Args:
+        property_values: Property values (any spec accepted by parse_axis)
+        chunk_size (int): Property values per chunk
+        **kwargs: Other arguments of simulate_grid
+
+    Yields:
+        ScenarioGrid: The grid of each block of property values, in order
+    """
+    values = parse_axis(property_values)
+    for start in range(0, len(values), chunk_size):
+        yield simulate_grid(values[start:start + chunk_size], **kwargs)
@@ -0,0 +1,159 @@
+import os
+import threading
+
+from utils.text import fold_text
+from utils.pdf_writer import PdfDocument, PAGE_HEIGHT
+from utils.file_cache import ContentAddressedCache, content_key
+from ai_agents.simulator.amortization import SYSTEMS, person_type_key
+
+# Bump when the layout changes, so documents rendered by older code are not reused
+RENDER_VERSION = 2
+
+SYSTEM_LABELS = {"SAC": "Tabela SAC", "PRICE": "Tabela Price"}
+
+# The document shows the person type the key was built from, not the user's spelling
+PERSON_TYPE_LABELS = {"fisica": "Pessoa física", "juridica": "Pessoa jurídica"}
+
+# Layout, in points
+MARGIN = 50
+ROW_HEIGHT = 12
+
+def format_brl(value):
+    """Format a number as Brazilian currency (R$ 1.234,56)"""
+    text = f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"R$ {text}"
+
+def format_percent(rate):
+    return f"{100 * rate:.2f}%".replace(".", ",")
+
+def simulation_key(person_type, state, city, terms):
+    """
+    Content key of a simulation document: its normalized inputs and the loan conditions
+
+    Spelling variations ("São Paulo", "sao paulo", "PJ", "Pessoa Jurídica") and
+    float noise in the value map to the same document.
+    """
+    return content_key(
+        RENDER_VERSION,
+        person_type_key(person_type),
+        fold_text(state).upper(),
+        fold_text(city),
+        f"{terms.property_value:.2f}",
+        f"{terms.down_payment:.2f}",
+        terms.annual_rate,
+        terms.months,
+        terms.mip_rate,
+        terms.dfi_rate,
+        terms.admin_fee,
+        terms.upfront_fees,
+    )
+
+def render_simulation_pdf(person_type, state, city, summary, schedules):
+    """
+    Render the simulation document: parameters, SAC x Price comparison and full schedules
+
+    Args:
+        person_type (str): Type of person
+        state (str): State of the property
+        city (str): City of the property
+        summary (dict): Summary returned by amortization.simulate
+        schedules (dict): Schedules returned by amortization.simulate
+
+    Returns:
+        bytes: The PDF
+    """
+    pdf = PdfDocument()
+    pdf.add_page()
+    y = PAGE_HEIGHT - MARGIN
+
+    pdf.text(MARGIN, y, "Simulação de Financiamento Imobiliário", size=16, font="F2")
+    y -= 30
+
+    parameters = [
+        ("Tipo de pessoa", PERSON_TYPE_LABELS[person_type_key(person_type)]),
+        ("Localização", f"{city} - {state}"),
+        ("Valor do imóvel", format_brl(summary["property_value"])),
+        ("Entrada", format_brl(summary["down_payment"])),
+        ("Valor financiado", format_brl(summary["loan_amount"])),
+        ("Taxa de juros", f"{format_percent(summary['annual_rate'])} a.a."),
+        ("Prazo", f"{summary['months']} meses"),
+    ]
+    for label, value in parameters:
+        pdf.text(MARGIN, y, f"{label}:", size=10, font="F2")
+        pdf.text(MARGIN + 120, y, str(value), size=10)
+        y -= 15
+
+    # Side-by-side comparison of the systems
+    y -= 15
+    pdf.text(MARGIN, y, "Comparativo", size=13, font="F2")
+    y -= 18
+    columns = [MARGIN + 170 + 150 * i for i in range(len(summary["systems"]))]
+    for x, system in zip(columns, summary["systems"]):
+        pdf.text(x, y, SYSTEM_LABELS.get(system, system), size=10, font="F2")
+    y -= 14
+    rows = [
+        ("Primeira parcela", "first_installment", format_brl),
+        ("Última parcela", "last_installment", format_brl),
+        ("Total pago", "total_paid", format_brl),
+        ("Total de juros", "total_interest", format_brl),
+        ("Total de seguros", "total_insurance", format_brl),
+        ("CET", "cet_annual", lambda rate: f"{format_percent(rate)} a.a."),
+    ]
+    for label, field, formatter in rows:
+        pdf.text(MARGIN, y, label, size=10)
+        for x, values in zip(columns, summary["systems"].values()):
+            pdf.text(x, y, formatter(values[field]), size=10)
+        y -= 14
+    pdf.text(MARGIN, y - 10, "Valores de referência, sujeitos à análise de crédito. Parcelas incluem seguros MIP/DFI e taxa de administração.", size=7)
+
+    # Month-by-month schedules, one table per system
+    header = f"{'Mês':>4} {'Parcela':>13} {'Juros':>13} {'Amortização':>13} {'Seguros':>10} {'Saldo devedor':>15}"
+    for system in SYSTEMS:
+        if system not in schedules:
+            continue
+        y = 0
+        for row in schedules[system]:
+            if y < MARGIN:
+                pdf.add_page()
+                y = PAGE_HEIGHT - MARGIN
+                pdf.text(MARGIN, y, f"{SYSTEM_LABELS.get(system, system)} - evolução mensal", size=12, font="F2")
+                y -= 20
+                pdf.text(MARGIN, y, header, size=8, font="F3")
+                pdf.line(MARGIN, y - 3, pdf.width - MARGIN, y - 3)
+                y -= ROW_HEIGHT + 2
+            pdf.text(MARGIN, y, (
+                f"{row['month']:>4} {row['total_payment']:>13,.2f} {row['interest']:>13,.2f} "
+                f"{row['amortization']:>13,.2f} {row['insurance']:>10,.2f} {row['balance']:>15,.2f}"
+            ).replace(",", "_").replace(".", ",").replace("_", "."), size=8, font="F3")
+            y -= ROW_HEIGHT
+    return pdf.render()
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Return the process-wide simulation PDF cache, created on first use"""
+    global _pdf_cache
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = ContentAddressedCache(
+                os.environ.get("SIMULATION_PDF_DIR", "assets/simulations"),
+                max_bytes=int(os.environ.get("SIMULATION_PDF_CACHE_MAX_BYTES", 100 * 1024 * 1024)),
+                suffix=".pdf",
+            )
+        return _pdf_cache
+
+def get_pdf_cache_stats():
+    """Render and cache counters of the simulation PDFs (empty until the first simulation)"""
+    return _pdf_cache.stats() if _pdf_cache is not None else {}
+
+def get_simulation_pdf(person_type, state, city, terms, summary, schedules):
+    """
+    Path of the simulation document, rendered only if this scenario was never rendered before
+
+    Returns:
+        str: Path to the PDF
+    """
+    key = simulation_key(person_type, state, city, terms)
+    return get_pdf_cache().get_or_create(
+        key, lambda: render_simulation_pdf(person_type, state, city, summary, schedules))
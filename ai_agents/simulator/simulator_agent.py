@@ -1,5 +1,9 @@
 from ai_agents import Agent, function_tool
-from pathlib import Path
+
+from ai_agents.simulator.amortization import FinancingTerms, simulate
+from ai_agents.simulator.simulation_pdf import get_simulation_pdf
+from utils.locations import normalize_location
+
 @function_tool
 def generate_financing_simulation(person_type:str, property_value:float, state:str, city:str):
     """
@@ -15,21 +19,22 @@ def generate_financing_simulation(person_type:str, property_value:float, state:s
         dict: Response containing the path to the PDF file and simulation details
     """
 
-    # Path to the PDF file in the assets folder
-    PDF_PATH = Path("assets/simulacao.pdf")
-    # Create assets directory if it doesn't exist
-    assets_dir = Path("assets")
-    if not assets_dir.exists():
-        assets_dir.mkdir(exist_ok=True)
-        print(f"Created assets directory at {assets_dir.absolute()}")
-    
-    # Check if PDF exists
-    if not PDF_PATH.exists():
+    # Official UF and municipality name (accents, abbreviations and small typos are fixed)
+    location = normalize_location(state, city)
+    if not location["found"]:
         return {
             "success": False,
-            "message": "Desculpe, o PDF de simulação de financiamento não está disponível no momento.",
-            "error": "Arquivo PDF não encontrado em: " + str(PDF_PATH.absolute())
+            "message": ("Não encontrei essa cidade, mas há uma parecida. Pergunte ao usuário se é a sugerida."
+                        if location["match"] == "fuzzy" else
+                        "Não encontrei essa cidade. Confirme a cidade e o estado com o usuário."),
+            "match": location["match"],
+            "suggestions": location["suggestions"],
         }
+    state, city = location["state"], location["city"]
+    
+    # SAC and Price schedules with the reference conditions for the person type
+    terms = FinancingTerms.for_person_type(person_type, property_value)
+    simulation, schedules = simulate(terms)
     
     # Log the simulation parameters (for debugging or record-keeping)
     print(f"Gerando simulação de financiamento para:")
@@ -37,19 +42,20 @@ def generate_financing_simulation(person_type:str, property_value:float, state:s
     print(f"- Valor do imóvel: {property_value}")
     print(f"- Localização: {city}, {state}")
     
-    # In a real implementation, you might use these parameters to generate a custom PDF
-    # For now, we're just returning the existing PDF
+    # Per-simulation PDF, served from the on-disk cache when this scenario was already rendered
+    pdf_path = get_simulation_pdf(person_type, state, city, terms, simulation, schedules)
     
     return {
         "success": True,
         "message": "Aqui está o seu documento de simulação de financiamento imobiliário:",
-        "pdf_path": str(PDF_PATH),
+        "pdf_path": pdf_path,
         "simulation_details": {
             "person_type": person_type,
             "property_value": property_value,
             "state": state,
             "city": city
-        }
+        },
+        "simulation": simulation
     }
 
 simulator_agent = Agent(
@@ -90,7 +96,10 @@ Quando tiver todas as informações, use a função `generate_financing_simulati
 - state: estado onde o imóvel está localizado
 - city: cidade onde o imóvel está localizado
 
+A função corrige sozinha a grafia do estado e da cidade (acentos, nome ou sigla do estado, um erro de digitação). Se ela responder que não encontrou a cidade, mostre as sugestões retornadas e pergunte qual é a correta; quando houver uma cidade parecida (match "fuzzy"), pergunte ao usuário se é essa antes de simular, porque pode ser outra cidade.
+
 A função retornará um objeto com o caminho para o PDF e detalhes da simulação.
+O campo `simulation` traz o valor financiado, a taxa de juros, o prazo e, para as tabelas SAC e Price, a primeira e a última parcela, o total pago e o CET anual. Apresente esses valores ao usuário de forma resumida, comparando os dois sistemas.
 """,
     tools=[generate_financing_simulation]
 )
@@ -0,0 +1,62 @@
+import time
+
+from agents import Runner
+from openai.types.responses import ResponseTextDeltaEvent
+
+class TurnTimings:
+    def __init__(self):
+        """Wall-clock milestones of one streamed agent turn"""
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.finished = None
+
+    @property
+    def time_to_first_token(self):
+        """Seconds until the first output token, or None if no text was streamed"""
+        return self.first_token - self.started if self.first_token is not None else None
+
+    @property
+    def total_time(self):
+        """Seconds until the run finished"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def __str__(self):
+        ttft = self.time_to_first_token
+        ttft_text = f"{ttft:.2f} s" if ttft is not None else "-"
+        return f"primeiro token: {ttft_text}, total: {self.total_time:.2f} s"
+
+async def run_streamed_turn(starting_agent, input, run_config=None, context=None, on_text=None, on_event=None, hooks=None):
+    """
+    Run one agent turn with Runner.run_streamed, reporting output as it is produced
+
+    Args:
+        starting_agent (Agent): Agent to start the turn at
+        input (str | list): The message, or the history plus the new message
+        run_config (RunConfig): Run configuration
+        context: Run context handed to the agents' dynamic instructions and tools
+        on_text (callable): Called with every text delta of the agents' replies
+        on_event (callable): Called with (kind, detail) for "handoff" (target agent name)
+            and "tool_call" (tool name) events
+        hooks (RunHooks): Lifecycle hooks of the run (agent, tool and handoff callbacks)
+
+    Returns:
+        tuple: (RunResultStreaming, TurnTimings); the result exposes final_output,
+            last_agent, new_items and to_input_list() like a regular run result
+    """
+    timings = TurnTimings()
+    result = Runner.run_streamed(starting_agent, input, context=context, run_config=run_config, hooks=hooks)
+
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            if timings.first_token is None:
+                timings.first_token = time.perf_counter()
+            if on_text is not None:
+                on_text(event.data.delta)
+        elif event.type == "run_item_stream_event" and on_event is not None:
+            if event.name == "handoff_occured":
+                on_event("handoff", event.item.target_agent.name)
+            elif event.name == "tool_called":
+                on_event("tool_call", getattr(event.item.raw_item, "name", "tool"))
+
+    timings.finished = time.perf_counter()
+    return result, timings
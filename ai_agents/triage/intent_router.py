@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import math
+import threading
+from pathlib import Path
+
+from utils.text import fold_text
+
+# Labelled examples used to build the router, besides the ones in the triage instructions.
+# Examples labelled with the triage agent's own name (greetings, vague requests)
+# teach the router when to leave the decision to the LLM triage. The triage eval
+# dataset is kept out of them, so the router is measured on messages it never saw.
+EXAMPLES_PATH = Path(__file__).resolve().parent / "intent_examples.json"
+
+# Words that carry no routing signal, folded (fold_text strips accents: "é" is "e")
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das", "em", "no", "na",
+    "nos", "nas", "e", "ou", "para", "pra", "por", "com", "que", "se", "eu", "me", "meu", "minha",
+    "voce", "vc", "sao", "ser", "sou", "ter", "tem", "isso", "esse", "essa", "r",
+}
+
+def extract_features(text):
+    """
+    Sparse features of a message: word stems, character trigrams and word bigrams
+
+    Args:
+        text (str): The message
+
+    Returns:
+        dict: feature -> count
+    """
+    features = {}
+    words = fold_text(text).split()
+
+    # Bigrams keep phrasing cues that stopword removal loses ("o que e", "como faco")
+    for first, second in zip(words, words[1:]):
+        bigram = f"b:{first}_{second}"
+        features[bigram] = features.get(bigram, 0) + 0.5
+
+    for word in words:
+        if word in STOPWORDS or word.isdigit():
+            continue
+        # Crude stemming: "financiamento" and "financiar" share "financ"
+        stem = "w:" + word[:6]
+        features[stem] = features.get(stem, 0) + 1
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            trigram = "c:" + padded[i:i + 3]
+            features[trigram] = features.get(trigram, 0) + 0.5
+    return features
+
+def parse_instruction_examples(instructions):
+    """
+    Extract the example phrases listed for each agent in the triage instructions
+
+    Args:
+        instructions (str): The triage agent's instructions
+
+    Returns:
+        list: (example text, agent name) pairs
+    """
+    examples = []
+    agent_name = None
+    for line in instructions.splitlines():
+        header = re.match(r"\s*\d+\.\s*\*\*(.+?)\*\*", line)
+        if header:
+            agent_name = header.group(1).strip()
+            continue
+        example = re.match(r'\s*-\s*"(.+?)"', line)
+        if example and agent_name:
+            examples.append((example.group(1), agent_name))
+    return examples
+
+def load_examples(path):
+    """Read (text, agent name) pairs from a JSON file mapping agent names to phrases"""
+    with open(path, "r") as f:
+        examples_by_agent = json.load(f)
+    return [(text, agent_name) for agent_name, texts in examples_by_agent.items() for text in texts]
+
+class RouteDecision:
+    def __init__(self, agent_name, agent, confidence, similarity):
+        """
+        Outcome of the local router for one message
+
+        Args:
+            agent_name (str): Best matching agent name (the triage agent's name for vague messages)
+            agent (Agent): The agent to start at, or None to fall back to the LLM triage
+            confidence (float): Relative margin of the best agent over the runner-up (0 to 1)
+            similarity (float): Cosine similarity to the closest example of the best agent
+        """
+        self.agent_name = agent_name
+        self.agent = agent
+        self.confidence = confidence
+        self.similarity = similarity
+
+    @property
+    def routed(self):
+        """True if the message can skip the LLM triage"""
+        return self.agent is not None
+
+    def __repr__(self):
+        return (f"RouteDecision(agent={self.agent_name!r}, routed={self.routed}, "
+                f"confidence={self.confidence:.2f}, similarity={self.similarity:.2f})")
+
+class IntentRouter:
+    def __init__(self, examples, agents, min_confidence=0.3, min_similarity=0.3, triage_agent=None,
+                 topic_change_min_similarity=0.5):
+        """
+        Nearest-example classifier that picks the triage target without a model call
+
+        Args:
+            examples (list): (text, agent name) training pairs
+            agents (dict): agent name -> Agent (None for labels that fall back to the LLM triage)
+            min_confidence (float): Minimum margin over the runner-up agent to route locally
+            min_similarity (float): Minimum similarity to the closest example to route locally
+            triage_agent (Agent): Agent that follow-up turns go back to on a topic change
+            topic_change_min_similarity (float): Minimum similarity for a follow-up to count as a
+                topic change (stricter than first-message routing, since short answers such as
+                a city name can look like another agent's examples)
+        """
+        self.agents = agents
+        self.triage_agent = triage_agent
+        self.topic_change_min_similarity = topic_change_min_similarity
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+
+        # Deduplicate examples (the examples file may repeat the instruction examples)
+        unique = {}
+        for text, agent_name in examples:
+            unique.setdefault(fold_text(text), agent_name)
+        self.examples = [(text, agent_name) for text, agent_name in unique.items()]
+
+        # Inverse document frequency of every feature across the examples
+        document_frequency = {}
+        raw_vectors = [extract_features(text) for text, _ in self.examples]
+        for features in raw_vectors:
+            for feature in features:
+                document_frequency[feature] = document_frequency.get(feature, 0) + 1
+        total = len(raw_vectors)
+        self._idf = {
+            feature: math.log((1 + total) / (1 + count)) + 1
+            for feature, count in document_frequency.items()
+        }
+        self._vectors = [self._weight(features) for features in raw_vectors]
+
+        # Counters
+        self.routed = 0
+        self.fallbacks = 0
+        self.routed_by_agent = {}
+        self.sticky_turns = 0
+        self.topic_changes = 0
+
+    @classmethod
+    def from_triage_agent(cls, triage_agent):
+        """
+        Build a router from the triage instructions, its handoffs and intent_examples.json
+
+        Args:
+            triage_agent (Agent): The triage agent whose handoffs are the possible routes
+        """
+        agents = {agent.name: agent for agent in triage_agent.handoffs}
+        agents[triage_agent.name] = None
+        examples = (
+            parse_instruction_examples(triage_agent.instructions)
+            + load_examples(EXAMPLES_PATH)
+        )
+        examples = [(text, name) for text, name in examples if name in agents]
+        return cls(
+            examples,
+            agents,
+            min_confidence=float(os.environ.get("TRIAGE_ROUTER_MIN_CONFIDENCE", 0.3)),
+            min_similarity=float(os.environ.get("TRIAGE_ROUTER_MIN_SIMILARITY", 0.3)),
+            triage_agent=triage_agent,
+            topic_change_min_similarity=float(os.environ.get("TOPIC_CHANGE_MIN_SIMILARITY", 0.5)),
+        )
+
+    def _weight(self, features):
+        """TF-IDF weight and L2-normalize a feature dict"""
+        vector = {feature: count * self._idf.get(feature, 0.0) for feature, count in features.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm == 0:
+            return {}
+        return {feature: value / norm for feature, value in vector.items()}
+
+    def classify(self, text, exclude=None):
+        """
+        Score a message against every agent
+
+        Args:
+            text (str): The message
+            exclude (str): Folded example text to ignore (for leave-one-out evaluation)
+
+        Returns:
+            RouteDecision: The best agent and its confidence, with agent set only if confident
+        """
+        query = self._weight(extract_features(text))
+        best_by_agent = {name: 0.0 for name in self.agents}
+        for (example_text, agent_name), vector in zip(self.examples, self._vectors):
+            if example_text == exclude:
+                continue
+            # Iterate over the smaller of the two sparse vectors
+            small, large = (query, vector) if len(query) < len(vector) else (vector, query)
+            similarity = sum(value * large.get(feature, 0.0) for feature, value in small.items())
+            if similarity > best_by_agent[agent_name]:
+                best_by_agent[agent_name] = similarity
+
+        ranked = sorted(best_by_agent.items(), key=lambda pair: pair[1], reverse=True)
+        best_name, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = (best - runner_up) / best if best > 0 else 0.0
+
+        confident = confidence >= self.min_confidence and best >= self.min_similarity
+        agent = self.agents[best_name] if confident else None
+        return RouteDecision(best_name, agent, confidence, best)
+
+    def route(self, text):
+        """Classify a message and count whether it was routed locally"""
+        decision = self.classify(text)
+        with self._lock:
+            if decision.routed:
+                self.routed += 1
+                self.routed_by_agent[decision.agent_name] = self.routed_by_agent.get(decision.agent_name, 0) + 1
+            else:
+                self.fallbacks += 1
+        return decision
+
+    def continue_conversation(self, text, last_agent_name):
+        """
+        Pick the agent a follow-up turn starts at.
+
+        The turn stays with the agent that answered the previous one, unless the
+        message confidently belongs to another agent (the user changed topic),
+        in which case it goes back to the triage agent with the full history.
+
+        Args:
+            text (str): The new message
+            last_agent_name (str): Name of the agent that produced the previous reply
+
+        Returns:
+            Agent: The agent to start the turn at
+        """
+        last_agent = self.agents.get(last_agent_name)
+        if last_agent is None:
+            # The previous turn ended at triage (or at an unknown agent)
+            return self.triage_agent
+
+        decision = self.classify(text)
+        topic_changed = (
+            decision.routed
+            and decision.agent is not last_agent
+            and decision.similarity >= self.topic_change_min_similarity
+        )
+        with self._lock:
+            if topic_changed:
+                self.topic_changes += 1
+            else:
+                self.sticky_turns += 1
+        return self.triage_agent if topic_changed else last_agent
+
+    def stats(self):
+        """Return how many messages skipped the LLM triage"""
+        with self._lock:
+            total = self.routed + self.fallbacks
+            return {
+                "examples": len(self.examples),
+                "routed": self.routed,
+                "fallbacks": self.fallbacks,
+                "routed_rate": self.routed / total if total else 0.0,
+                "routed_by_agent": dict(self.routed_by_agent),
+                "sticky_turns": self.sticky_turns,
+                "topic_changes": self.topic_changes,
+            }
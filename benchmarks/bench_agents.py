@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+
+from agents import RunConfig, RunHooks
+
+from ai_agents.streaming import run_streamed_turn
+from utils.cassette_model import CassetteMiss
+from ai_agents.triage.triage_agent import triage_agent
+from ai_agents.questions.questions_agent import questions_agent
+from ai_agents.simulator.simulator_agent import simulator_agent
+from ai_agents.application.application_agent import application_agent
+
+# Latency and tokens per agent, on the four eval datasets.
+#
+# Every case of every dataset is played turn by turn (a conversation's
+# follow-ups continue at the agent that answered, as in the evals), streamed,
+# and each turn records its wall time, time to first token, model calls, model
+# time, handoffs, tool time and input/output tokens. The report has p50, p95
+# and p99 per agent and per turn position, and is written as JSON;
+# --compare flags the metrics that got worse than a saved report.
+#
+# --model stub uses the offline stub model (--latency seconds per call; triage
+# hands off to the case's expected agent), replay answers from a cassette
+# recorded with utils/cassette_model.py (--cassette), live calls OpenAI.
+#
+# Usage: python benchmarks/bench_agents.py [--model stub|replay|live] [--latency 0.3] [--cassette path] [--repeat 1] [--output report.json] [--compare baseline.json] [--threshold 0.2]
+
+SUITES = {
+    "triage": triage_agent,
+    "questions": questions_agent,
+    "simulator": simulator_agent,
+    "application": application_agent,
+}
+
+METRICS = ["wall_ms", "first_token_ms", "model_calls", "model_ms", "handoffs", "tool_ms", "input_tokens", "output_tokens"]
+
+# Smallest change that can count as a regression, per metric (on top of --threshold)
+MIN_DELTA = {
+    "wall_ms": 5, "first_token_ms": 5, "model_ms": 5, "tool_ms": 2,
+    "model_calls": 0.5, "handoffs": 0.5, "input_tokens": 20, "output_tokens": 20,
+}
+
+class TurnHooks(RunHooks):
+    def __init__(self):
+        """Time spent in model calls and tools during one turn"""
+        self.model_seconds = 0.0
+        self.tool_seconds = 0.0
+        self._model_started = {}
+        self._tool_started = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._model_started[agent.name] = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response):
+        started = self._model_started.pop(agent.name, None)
+        if started is not None:
+            self.model_seconds += time.perf_counter() - started
+
+    async def on_tool_start(self, context, agent, tool):
+        self._tool_started.setdefault(tool.name, []).append(time.perf_counter())
+
+    async def on_tool_end(self, context, agent, tool, result):
+        starts = self._tool_started.get(tool.name)
+        if starts:
+            self.tool_seconds += time.perf_counter() - starts.pop()
+
+def case_turns(case):
+    """User messages of a case, in order"""
+    if "conversation" in case:
+        return [message["content"] for message in case["conversation"] if message["role"] == "user"]
+    return [case["input"]] + [follow_up["user"] for follow_up in case.get("follow_up_inputs", [])]
+
+def build_run_config(args):
+    """Run configuration for the selected model; returns (RunConfig, target agent setter)"""
+    target = {"agent": None}
+    if args.model == "stub":
+        from utils.stub_model import StubModelProvider
+        provider = StubModelProvider(
+            latency_seconds=args.latency,
+            choose_handoff=lambda input, handoffs: next(
+                (h for h in handoffs if h.agent_name.lower() == target["agent"]), None
+            ),
+        )
+        return RunConfig(workflow_name="benchmark", model_provider=provider), target
+    if args.model == "replay":
+        from utils.cassette_model import CassetteModelProvider
+        return RunConfig(workflow_name="benchmark", model_provider=CassetteModelProvider(args.cassette, mode="replay")), target
+    return RunConfig(workflow_name="benchmark"), target
+
+async def run_case(suite, case, run_config, target):
+    """Play one case; return one record per turn"""
+    target["agent"] = case.get("expected_agent", "").replace("_", " ").lower() or None
+    agent, history, records = SUITES[suite], None, []
+    for position, message in enumerate(case_turns(case), 1):
+        hooks = TurnHooks()
+        turn_input = message if history is None else history + [{"role": "user", "content": message}]
+        try:
+            result, timings = await run_streamed_turn(agent, turn_input, run_config=run_config, hooks=hooks)
+        except CassetteMiss:
+            # Replay only covers the turns that were recorded (the evals don't play follow_up_inputs)
+            print(f"[{suite}] {case['name']}: turn {position} is not in the cassette, skipping the rest of the case")
+            break
+        usage = [response.usage for response in result.raw_responses]
+        records.append({
+            "suite": suite,
+            "case": case["name"],
+            "turn": position,
+            "wall_ms": 1000 * timings.total_time,
+            "first_token_ms": 1000 * timings.time_to_first_token if timings.first_token is not None else None,
+            "model_calls": len(result.raw_responses),
+            "model_ms": 1000 * hooks.model_seconds,
+            "handoffs": sum(1 for item in result.new_items if item.type == "handoff_output_item"),
+            "tool_ms": 1000 * hooks.tool_seconds,
+            "input_tokens": sum(u.input_tokens for u in usage),
+            "output_tokens": sum(u.output_tokens for u in usage),
+        })
+        history, agent = result.to_input_list(), result.last_agent
+    return records
+
+def percentiles(records):
+    """p50/p95/p99 and mean of every metric over records"""
+    summary = {"turns": len(records)}
+    for metric in METRICS:
+        values = [r[metric] for r in records if r[metric] is not None]
+        if not values:
+            continue
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary[metric] = {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(values))}
+    return summary
+
+def build_report(records, args):
+    suites = {}
+    for suite in SUITES:
+        suite_records = [r for r in records if r["suite"] == suite]
+        if not suite_records:
+            continue
+        positions = sorted({r["turn"] for r in suite_records})
+        suites[suite] = dict(
+            percentiles(suite_records),
+            by_turn={str(p): percentiles([r for r in suite_records if r["turn"] == p]) for p in positions},
+        )
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model": args.model,
+        "latency": args.latency if args.model == "stub" else None,
+        "repeat": args.repeat,
+        "suites": suites,
+        "turns": records,
+    }
+
+def print_report(report):
+    print(f"\n{'agent':<12} {'metric':<15} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for suite, summary in report["suites"].items():
+        for metric in METRICS:
+            if metric in summary:
+                values = summary[metric]
+                print(f"{suite:<12} {metric:<15} {values['p50']:>9.1f} {values['p95']:>9.1f} {values['p99']:>9.1f}")
+        print()
+
+def compare(report, baseline, threshold):
+    """Print every metric against the baseline; return the regressions"""
+    regressions = []
+    print(f"\n{'agent':<12} {'metric':<15} {'stat':<4} {'baseline':>9} {'current':>9} {'change':>8}")
+    for suite, summary in report["suites"].items():
+        base_summary = baseline.get("suites", {}).get(suite)
+        if base_summary is None:
+            continue
+        for metric in METRICS:
+            if metric not in summary or metric not in base_summary:
+                continue
+            for stat in ("p50", "p95"):
+                current, previous = summary[metric][stat], base_summary[metric][stat]
+                change = (current - previous) / previous if previous else 0.0
+                worse = current - previous > MIN_DELTA[metric] and current > previous * (1 + threshold)
+                if worse:
+                    regressions.append((suite, metric, stat, previous, current))
+                flag = "  REGRESSION" if worse else ""
+                print(f"{suite:<12} {metric:<15} {stat:<4} {previous:>9.1f} {current:>9.1f} {100 * change:>+7.0f}%{flag}")
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Latency and token benchmark of every agent on the eval datasets")
+    parser.add_argument('--model', choices=['stub', 'replay', 'live'], default='stub')
+    parser.add_argument('--latency', type=float, default=0.3, help="Stub model latency in seconds")
+    parser.add_argument('--cassette', help="Cassette replayed with --model replay")
+    parser.add_argument('--suites', default=",".join(SUITES))
+    parser.add_argument('--repeat', type=int, default=1, help="Times every case is played")
+    parser.add_argument('--output', default='benchmarks/results/agents.json', help="Where the JSON report is written")
+    parser.add_argument('--compare', help="Saved report to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative increase flagged as a regression")
+    args = parser.parse_args()
+    if args.model == "replay" and not args.cassette:
+        parser.error("--model replay needs --cassette")
+
+    run_config, target = build_run_config(args)
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    cases = []
+    for suite in suites:
+        with open(f'evals/{suite}_agent_test_dataset.json', 'r') as f:
+            cases.extend((suite, case) for case in json.load(f)['test_cases'])
+
+    print(f"\n===== AGENT LATENCY BENCHMARK ({len(cases)} cases x {args.repeat}, {args.model} model) =====")
+
+    async def run_all():
+        records = []
+        # One case at a time, so turns don't compete for the event loop
+        for _ in range(args.repeat):
+            for suite, case in cases:
+                records.extend(await run_case(suite, case, run_config, target))
+        return records
+
+    records = asyncio.run(run_all())
+    report = build_report(records, args)
+    print_report(report)
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        print(f"\n{len(regressions)} regressions against {args.compare} (threshold {100 * args.threshold:.0f}%)")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
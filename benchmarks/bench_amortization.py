@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agents.simulator.amortization import (
+    FinancingTerms, SAC, PRICE, MAX_MONTHS, build_schedule, simulate,
+)
+
+# Latency and throughput of the vectorized amortization engine.
+#
+# "Loop" is the same schedule computed month by month in plain Python (list of
+# dicts), for comparison; "simulate" builds both schedules and their summaries
+# (including the CET solve), which is what the simulator tool runs per call.
+#
+# Usage: python benchmarks/bench_amortization.py
+
+def loop_schedule(terms, system):
+    """Reference month-by-month implementation"""
+    balance = terms.loan_amount
+    rate = terms.monthly_rate
+    n = terms.months
+    payment = balance * rate / (1 - (1 + rate) ** -n)
+    rows = []
+    for month in range(1, n + 1):
+        interest = balance * rate
+        amortization = terms.loan_amount / n if system == SAC else payment - interest
+        insurance = balance * terms.mip_rate + terms.property_value * terms.dfi_rate
+        balance -= amortization
+        rows.append({
+            "month": month,
+            "installment": amortization + interest,
+            "interest": interest,
+            "amortization": amortization,
+            "balance": max(balance, 0.0),
+            "insurance": insurance,
+            "total_payment": amortization + interest + insurance + terms.admin_fee,
+        })
+    return rows
+
+def measure(function, repetitions):
+    """Return sorted per-call latencies"""
+    latencies = []
+    for _ in range(repetitions):
+        started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return latencies
+
+def main():
+    print("\n===== AMORTIZATION ENGINE BENCHMARK =====")
+    repetitions = 2000
+
+    print(f"\n{'months':>6} {'case':<22} {'p50 µs':>9} {'p99 µs':>9} {'per second':>11}")
+    for months in (120, 360, MAX_MONTHS):
+        terms = FinancingTerms(500000, months=months, upfront_fees=3000)
+        cases = [
+            ("loop SAC", lambda: loop_schedule(terms, SAC)),
+            ("loop PRICE", lambda: loop_schedule(terms, PRICE)),
+            ("vectorized SAC", lambda: build_schedule(terms, SAC)),
+            ("vectorized PRICE", lambda: build_schedule(terms, PRICE)),
+            ("simulate (both + CET)", lambda: simulate(terms)),
+        ]
+        for label, function in cases:
+            latencies = measure(function, repetitions)
+            p50 = latencies[len(latencies) // 2]
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print(f"{months:>6} {label:<22} {1e6 * p50:>9.0f} {1e6 * p99:>9.0f} {len(latencies) / sum(latencies):>11.0f}")
+
+    # Memory of one full schedule
+    schedule = build_schedule(FinancingTerms(500000, months=MAX_MONTHS), PRICE)
+    rows = loop_schedule(FinancingTerms(500000, months=MAX_MONTHS), PRICE)
+    dict_bytes = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values()) for row in rows)
+    print(f"\n{MAX_MONTHS}-month schedule: {schedule.nbytes} bytes as a structured array, ~{dict_bytes} bytes as dicts")
+
+if __name__ == "__main__":
+    main()
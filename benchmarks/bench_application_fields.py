@@ -0,0 +1,291 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import itertools
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+
+from agents import ModelProvider, ModelResponse, Usage
+from agents.models.interface import Model
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+)
+
+import main
+from ai_agents.application.field_extractor import (
+    FIELDS,
+    FIELD_LABELS,
+    ApplicationSlots,
+    UF_NAMES,
+    cnpj_is_valid,
+    cpf_is_valid,
+    extract_fields,
+    fields_asked,
+    format_document,
+    last_reply,
+)
+
+# Turns and latency per completed application, with and without the local
+# pre-extraction of application fields.
+#
+# Each case of evals/application_agent_test_dataset.json becomes a scripted
+# user: it opens with the case's first message and then answers whatever the
+# agent asks for, from the case's data (CPFs and CNPJs with wrong check digits
+# get correct ones, fields the case lacks come from DEFAULT_PROFILE). The
+# conversation goes through the webhook pipeline until
+# apply_for_real_estate_financing is called.
+#
+# Offline, the model is a scripted form filler with the same questioning policy
+# in both arms: it asks for every missing field at once (--ask one asks for one
+# field per turn instead). Only where its field values come from differs: the
+# slot state injected in its instructions, or, without it, its own reading of
+# the conversation. Each call takes --latency seconds. A scripted model reads
+# the conversation as well as the extractor does, so offline the arms show what
+# the injected state changes for a given policy; --live runs the real agents
+# instead (needs OPENAI_API_KEY), which is where the extraction saves turns.
+#
+# Usage: python benchmarks/bench_application_fields.py [--latency 1.0] [--ask all|one] [--live]
+
+DEFAULT_PROFILE = {
+    "full_name": "Ana Paula Ferreira",
+    "cpf_number": "529.982.247-25",
+    "date_of_birth": "10/02/1988",
+    "monthly_income": 9000,
+    "marital_status": "casado",
+    "person_type": "física",
+    "property_value": 450000,
+    "state": "SP",
+    "city": "Campinas",
+}
+
+MAX_TURNS = 15
+
+_ids = itertools.count(1)
+
+def brl(value):
+    return f"{value:,.0f}".replace(",", ".")
+
+def with_check_digits(document):
+    """The same CPF/CNPJ with its verification digits corrected"""
+    digits = "".join(char for char in document if char.isdigit())
+    is_valid = cpf_is_valid if len(digits) == 11 else cnpj_is_valid
+    for suffix in range(100):
+        candidate = digits[:-2] + f"{suffix:02d}"
+        if is_valid(candidate):
+            return format_document(candidate)
+    return document
+
+def answer(field, value, profile):
+    """What the scripted user says when asked for a field"""
+    if field == "cpf_number":
+        return f"{'O CNPJ' if profile['person_type'] == 'jurídica' else 'Meu CPF'} é {value}"
+    templates = {
+        "full_name": "Meu nome é {}",
+        "date_of_birth": "Nasci em {}",
+        "marital_status": "Sou {}",
+        "person_type": "Pessoa {}",
+        "state": "O estado é {}",
+        "city": "A cidade é {}",
+    }
+    if field == "monthly_income":
+        return f"Minha renda mensal é de R$ {brl(value)}"
+    if field == "property_value":
+        return f"O imóvel custa R$ {brl(value)}"
+    if field == "state":
+        value = UF_NAMES.get(value, value)
+    return templates[field].format(value)
+
+def load_cases():
+    """(name, first message, profile) of every case of the application dataset"""
+    with open('evals/application_agent_test_dataset.json', 'r') as f:
+        test_cases = json.load(f)['test_cases']
+    cases = []
+    for case in test_cases:
+        profile = dict(DEFAULT_PROFILE)
+        profile.update(case.get("expected_fields", {}))
+        if "conversation" in case:
+            first_message = case["conversation"][0]["content"]
+        else:
+            first_message = case["input"]
+            # Fields given in the first message or in the scripted follow-ups
+            for message in [first_message] + [f["user"] for f in case.get("follow_up_inputs", [])]:
+                values, _ = extract_fields(message, asked=FIELDS)
+                profile.update(values)
+        if profile["person_type"] == "jurídica" and len(profile["cpf_number"]) < 18:
+            profile["cpf_number"] = "11.222.333/0001-81"
+        profile["cpf_number"] = with_check_digits(profile["cpf_number"])
+        state = profile["state"]
+        profile["state"] = next((uf for uf, name in UF_NAMES.items() if name == state), state)
+        cases.append((case["name"], first_message, profile))
+    return cases
+
+class FormFillingModel(Model):
+    def __init__(self, latency_seconds, ask_all=True):
+        """
+        Scripted application agent (and triage, which always hands off to it)
+
+        Args:
+            latency_seconds (float): Time taken by each call
+            ask_all (bool): Ask for every missing field at once (else one per turn), in both arms
+        """
+        self.latency_seconds = latency_seconds
+        self.ask_all = ask_all
+        self.requests = 0
+
+    def _known_fields(self, system_instructions, input):
+        """Field values the model has, from the slot state if it was given one"""
+        if "# Application data already collected" in (system_instructions or ""):
+            section = system_instructions.split("# Application data already collected")[1]
+            section = section.split("\n# ")[0]
+            values = {}
+            for line in section.splitlines():
+                if line.startswith("- ") and ": " in line:
+                    field, value = line[2:].split(": ", 1)
+                    values[field] = value
+            return values
+        # No slot state: what a model would gather from the conversation itself
+        slots, reply = ApplicationSlots(), None
+        for item in input if isinstance(input, list) else [{"role": "user", "content": input}]:
+            if item.get("role") == "user":
+                slots.update(item["content"], last_reply=reply)
+            elif item.get("role") == "assistant":
+                reply = last_reply([item])
+        return slots.values
+
+    def _respond(self, system_instructions, input, handoffs):
+        if handoffs:
+            handoff = next(h for h in handoffs if h.agent_name == "Application Agent")
+            return ResponseFunctionToolCall(
+                id=f"fc_{next(_ids)}", call_id=f"call_{next(_ids)}", type="function_call",
+                name=handoff.tool_name, arguments="{}", status="completed",
+            )
+        calls = [item for item in input if item.get("type") == "function_call"] if isinstance(input, list) else []
+        if calls and calls[-1]["name"] == "apply_for_real_estate_financing" and input[-1].get("type") == "function_call_output":
+            text = "Sua aplicação de financiamento foi enviada com sucesso!"
+        else:
+            values = self._known_fields(system_instructions, input)
+            missing = [field for field in FIELDS if field not in values]
+            if not missing:
+                arguments = dict(values, monthly_income=float(values["monthly_income"]),
+                                 property_value=float(values["property_value"]))
+                return ResponseFunctionToolCall(
+                    id=f"fc_{next(_ids)}", call_id=f"call_{next(_ids)}", type="function_call",
+                    name="apply_for_real_estate_financing", arguments=json.dumps(arguments), status="completed",
+                )
+            asked = missing if self.ask_all else missing[:1]
+            text = "Para continuar, preciso de: " + ", ".join(FIELD_LABELS[field] for field in asked) + "."
+        return ResponseOutputMessage(
+            id=f"msg_{next(_ids)}", type="message", role="assistant", status="completed",
+            content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                           prompt=None):
+        self.requests += 1
+        await asyncio.sleep(self.latency_seconds)
+        output = self._respond(system_instructions, input, handoffs)
+        return ModelResponse(output=[output], usage=Usage(requests=1), response_id=None)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                              prompt=None):
+        self.requests += 1
+        await asyncio.sleep(self.latency_seconds)
+        output = self._respond(system_instructions, input, handoffs)
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=0,
+            response=Response.model_construct(
+                id=f"resp_{next(_ids)}", created_at=time.time(), model="form-filler", object="response",
+                output=[output], status="completed", tools=[], tool_choice="auto", parallel_tool_calls=False,
+            ),
+        )
+
+class FormFillingProvider(ModelProvider):
+    def __init__(self, latency_seconds, ask_all=True):
+        self.model = FormFillingModel(latency_seconds, ask_all)
+
+    def get_model(self, model_name):
+        return self.model
+
+def applied(sender):
+    """Whether the conversation with sender has called apply_for_real_estate_financing"""
+    session = main.session_store.get(sender)
+    return session is not None and any(
+        item.get("type") == "function_call" and item.get("name") == "apply_for_real_estate_financing"
+        for item in session.history
+    )
+
+def converse(sender, first_message, profile, model):
+    """Play the scripted user until the application is submitted"""
+    requests_before = model.requests if model else 0
+    started = time.perf_counter()
+    message = first_message
+    for turn in range(1, MAX_TURNS + 1):
+        reply = main.run_conversation_turn(sender, message)
+        if applied(sender):
+            return turn, (model.requests if model else 0) - requests_before, time.perf_counter() - started
+        asked = fields_asked(reply) or FIELDS
+        message = ". ".join(answer(field, profile[field], profile) for field in asked) + "."
+    return None, None, time.perf_counter() - started
+
+def main_cli():
+    latency = float(sys.argv[sys.argv.index('--latency') + 1]) if '--latency' in sys.argv else 1.0
+    ask = sys.argv[sys.argv.index('--ask') + 1] if '--ask' in sys.argv else "all"
+    live = '--live' in sys.argv
+    model = None
+    if not live:
+        provider = FormFillingProvider(latency, ask_all=ask != "one")
+        main.model_provider = provider
+        model = provider.model
+
+    cases = load_cases()
+    print(f"\n===== APPLICATION FIELD PRE-EXTRACTION BENCHMARK ({len(cases)} conversations, "
+          f"{'live model' if live else f'scripted model asking {ask} per turn, {1000 * latency:.0f} ms per call'}) =====")
+
+    # Extraction alone, on every first message
+    started = time.perf_counter()
+    repetitions = 200
+    for _ in range(repetitions):
+        for _, first_message, _ in cases:
+            ApplicationSlots().update(first_message)
+    per_message = (time.perf_counter() - started) / (repetitions * len(cases))
+    print(f"\nExtraction: {1e6 * per_message:.0f} µs per message")
+
+    print(f"\n{'case':<60} {'arm':<10} {'turns':>6} {'calls':>6} {'seconds':>8}")
+    totals = {}
+    for arm, extraction in (("baseline", False), ("extracted", True)):
+        main.APPLICATION_FIELD_EXTRACTION = extraction
+        completed = []
+        for index, (name, first_message, profile) in enumerate(cases):
+            sender = f"whatsapp:+55119{index:07d}{int(extraction)}"
+            main.session_store.reset(sender)
+            turns, calls, elapsed = converse(sender, first_message, profile, model)
+            if turns is not None:
+                completed.append((turns, calls, elapsed))
+            print(f"{name[:60]:<60} {arm:<10} {turns if turns else '-':>6} "
+                  f"{calls if model and turns else '-':>6} {elapsed:>8.2f}")
+        totals[arm] = completed
+
+    print(f"\n{'per completed application':<26} {'completed':>10} {'turns':>7} {'calls':>7} {'seconds':>8}")
+    for arm, completed in totals.items():
+        if not completed:
+            print(f"{arm:<26} {0:>10}")
+            continue
+        count = len(completed)
+        calls = f"{sum(c[1] for c in completed) / count:>7.1f}" if model else f"{'-':>7}"
+        print(f"{arm:<26} {count:>7}/{len(cases)} {sum(c[0] for c in completed) / count:>7.1f} "
+              f"{calls} {sum(c[2] for c in completed) / count:>8.2f}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.application_store import ApplicationStore, COLUMNS, SCHEMA, encode_code, cpf_digits, property_key
+
+# Burst throughput of the application store.
+#
+# Several threads submit applications as fast as they can (every tenth one a
+# retry of an earlier application, which must get the same code back). The
+# report has the submit latency seen by the tool call, how long the writer
+# takes to get everything on disk, and the same applications written with one
+# durable commit per insert (synchronous=FULL), which is what a tool call
+# writing synchronously would wait for.
+#
+# Usage: python benchmarks/bench_application_store.py [applications] [threads]
+
+def make_application(number):
+    return {
+        "full_name": f"Cliente {number}",
+        "cpf_number": f"{number:011d}",
+        "date_of_birth": "10/02/1988",
+        "monthly_income": 9000.0,
+        "marital_status": "casado",
+        "person_type": "física",
+        "property_value": 400000.0 + number,
+        "state": "SP",
+        "city": "Campinas",
+        "submission_date": "18/10/2026",
+    }
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def burst(store, count, threads):
+    """Submit count applications from threads; return latencies, codes by number and mismatched retries"""
+    latencies, codes, mismatches = [], {}, []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for number in range(offset, count, threads):
+            started = time.perf_counter()
+            code, _ = store.submit(make_application(number))
+            local.append(time.perf_counter() - started)
+            with lock:
+                codes[number] = code
+            if number % 10 == 0:
+                # Retried tool call: same CPF and property
+                retry, created = store.submit(make_application(number))
+                if created or retry != code:
+                    mismatches.append(number)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, codes, mismatches
+
+def commit_per_insert(path, count):
+    """Per-insert latencies of count applications written with one durable transaction each"""
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=FULL")
+    connection.executescript(SCHEMA)
+    insert = f"INSERT INTO applications ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+    latencies = []
+    for number in range(count):
+        started = time.perf_counter()
+        application = make_application(number)
+        row = dict(
+            application,
+            confirmation_code=encode_code(number + 1),
+            cpf=cpf_digits(application["cpf_number"]),
+            property_key=property_key(application["state"], application["city"], application["property_value"]),
+            created_at=time.time(),
+        )
+        connection.execute(insert, [row[column] for column in COLUMNS])
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return latencies
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    directory = tempfile.mkdtemp()
+
+    print(f"\n===== APPLICATION STORE BENCHMARK ({count} applications, {threads} threads) =====")
+
+    store = ApplicationStore(os.path.join(directory, "batched.db"))
+    started = time.perf_counter()
+    latencies, codes, mismatches = burst(store, count, threads)
+    submitted = time.perf_counter() - started
+    store.flush()
+    drained = time.perf_counter() - started
+    stats = store.stats()
+
+    print(f"\nSubmit latency: p50 {1e6 * percentile(latencies, 0.5):.0f} µs, "
+          f"p99 {1e6 * percentile(latencies, 0.99):.0f} µs")
+    print(f"Submitted in {submitted:.2f} s, on disk after {drained:.2f} s "
+          f"({count / drained:,.0f} applications/s)")
+    print(f"Batches: {stats['batches']}, {stats['avg_batch_size']:.0f} rows and "
+          f"{stats['avg_batch_ms']:.1f} ms on average")
+    print(f"Unique codes: {len(set(codes.values()))}/{count}, "
+          f"retries with a different code: {len(mismatches)}")
+
+    # Everything is readable back by code and by CPF
+    missing = [number for number, code in codes.items() if store.get(code) is None]
+    by_cpf = sum(1 for number in range(0, count, 97) if store.find_by_cpf(f"{number:011d}"))
+    print(f"Lookups: {count - len(missing)}/{count} by code, {by_cpf}/{len(range(0, count, 97))} by CPF")
+    store.close()
+
+    latencies = commit_per_insert(os.path.join(directory, "per_insert.db"), count)
+    print(f"\nOne durable commit per insert: p50 {1e6 * percentile(latencies, 0.5):.0f} µs, "
+          f"p99 {1e6 * percentile(latencies, 0.99):.0f} µs, {count / sum(latencies):,.0f} applications/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+import json
+import time
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agents.simulator.amortization import FinancingTerms, simulate
+from ai_agents.simulator.batch import simulate_grid
+
+# Throughput of the batch scenario simulator.
+#
+# "grid" is simulate_grid alone; "json" and "npz" add the encoding the
+# /simulations/batch route does. "one by one" calls amortization.simulate per
+# scenario (what the chat tool does), for comparison.
+#
+# Usage: python benchmarks/bench_batch_simulation.py
+
+DOWN_PAYMENTS = [0.1, 0.2, 0.3, 0.4, 0.5]
+TERMS = [120, 180, 240, 300, 360, 420]
+RATES = list(np.round(np.arange(0.08, 0.14, 0.005), 4))
+
+def grid_for(scenarios):
+    """Property values giving about the requested number of scenarios"""
+    per_value = len(DOWN_PAYMENTS) * len(TERMS) * len(RATES)
+    return np.linspace(150000, 3000000, max(scenarios // per_value, 1))
+
+def best_of(function, repetitions=3):
+    """Fastest of a few runs, in seconds"""
+    timings = []
+    for _ in range(repetitions):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    print("\n===== BATCH SIMULATION BENCHMARK (both systems per scenario) =====")
+
+    # Per-scenario baseline
+    count = 500
+    elapsed = best_of(lambda: [simulate(FinancingTerms(400000 + i, months=360)) for i in range(count)], 1)
+    print(f"\nOne by one (amortization.simulate): {count / elapsed:,.0f} scenarios/s")
+
+    print(f"\n{'scenarios':>10} {'grid /s':>12} {'+json /s':>12} {'+npz /s':>12} {'json MB':>8} {'npz MB':>7}")
+    for target in (1000, 10000, 100000, 1000000):
+        property_values = grid_for(target)
+        kwargs = dict(down_payment_ratios=DOWN_PAYMENTS, months=TERMS, annual_rates=RATES)
+        grid = simulate_grid(property_values, **kwargs)
+        size = grid.size
+
+        grid_time = best_of(lambda: simulate_grid(property_values, **kwargs))
+        json_body = json.dumps(grid.to_columns())
+        json_time = grid_time + best_of(lambda: json.dumps(grid.to_columns()), 1)
+
+        def encode_npz():
+            buffer = io.BytesIO()
+            np.savez(buffer, **grid.results)
+            return buffer.getvalue()
+        npz_body = encode_npz()
+        npz_time = grid_time + best_of(encode_npz, 1)
+
+        print(f"{size:>10,} {size / grid_time:>12,.0f} {size / json_time:>12,.0f} {size / npz_time:>12,.0f} "
+              f"{len(json_body) / 1e6:>8.1f} {len(npz_body) / 1e6:>7.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+os.environ.setdefault("APPLICATION_STORE_PATH", os.path.join(tempfile.mkdtemp(), "applications.db"))
+
+import main
+from utils.cassette_model import Cassette, CassetteModelProvider
+from benchmarks.bench_application_fields import FormFillingProvider, MAX_TURNS, answer, load_cases
+from ai_agents.application.field_extractor import FIELDS, fields_asked
+
+# Pipeline overhead with the model taken out: record, then replay.
+#
+# The application conversations of bench_application_fields.py (triage, the
+# handoff to the application agent, the questions and the
+# apply_for_real_estate_financing tool call) go through the webhook pipeline
+# twice. The first pass records the scripted model's answers (--latency
+# seconds each, standing in for OpenAI) in a cassette; the second replays them
+# with no model at all, so what is left is the runner, routing, handoffs and
+# tools. Replies must be identical in both passes.
+#
+# Usage: python benchmarks/bench_cassette_replay.py [--latency 0.5] [--cassette path.jsonl.gz]
+
+def play(cases):
+    """Run every scripted conversation; return the reply of every turn"""
+    replies = []
+    for index, (name, first_message, profile) in enumerate(cases):
+        sender = f"whatsapp:+55119{index:07d}"
+        main.session_store.reset(sender)
+        message = first_message
+        for _ in range(MAX_TURNS):
+            reply = main.run_conversation_turn(sender, message)
+            replies.append(reply)
+            if reply.startswith("Sua aplicação de financiamento foi enviada"):
+                break
+            asked = fields_asked(reply) or FIELDS
+            message = ". ".join(answer(field, profile[field], profile) for field in asked) + "."
+    return replies
+
+def main_cli():
+    latency = float(sys.argv[sys.argv.index('--latency') + 1]) if '--latency' in sys.argv else 0.5
+    path = (sys.argv[sys.argv.index('--cassette') + 1] if '--cassette' in sys.argv
+            else os.path.join(tempfile.mkdtemp(), "cassette.jsonl.gz"))
+    cases = load_cases()
+
+    print(f"\n===== CASSETTE REPLAY BENCHMARK ({len(cases)} conversations, "
+          f"recorded model {1000 * latency:.0f} ms per call) =====")
+    print(f"\n{'pass':<8} {'turns':>6} {'seconds':>8} {'ms/turn':>8}")
+
+    results = {}
+    for arm in ("record", "replay"):
+        cassette = Cassette(path)
+        live = FormFillingProvider(latency) if arm == "record" else None
+        main.model_provider = CassetteModelProvider(cassette, mode=arm, live_provider=live)
+        main.answer_cache = type(main.answer_cache)()
+        started = time.perf_counter()
+        replies = play(cases)
+        elapsed = time.perf_counter() - started
+        cassette.save()
+        results[arm] = replies
+        print(f"{arm:<8} {len(replies):>6} {elapsed:>8.2f} {1000 * elapsed / len(replies):>8.1f}")
+
+    print(f"\nCassette: {len(Cassette(path))} responses, {os.path.getsize(path) / 1024:.1f} KB ({path})")
+    print(f"Identical replies: {sum(a == b for a, b in zip(results['record'], results['replay']))}/{len(results['record'])}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Compare the legacy serving path (a new event loop per request + Runner.run_sync)
+# with the shared per-worker loop + Runner.run, using the offline stub model.
+#
+# Usage: python benchmarks/bench_event_loop.py [--requests 200] [--concurrency 20] [--latency 0.2]
+
+def rss_mb():
+    """Resident memory of the current process, in MB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def open_fds():
+    """Number of file descriptors open in the current process"""
+    return len(os.listdir('/proc/self/fd'))
+
+def legacy_conversation_turn(main, sender, incoming_msg):
+    """The request path as it was before the shared event loop"""
+    from agents import Runner
+    from utils.session_store import Session
+
+    session = main.session_store.get(sender) or Session()
+
+    # Create a new event loop for this thread (never closed)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    new_input = session.history + [{"role": "user", "content": incoming_msg}] if session.history else incoming_msg
+    result = Runner.run_sync(starting_agent=main.triage_agent, run_config=main.build_run_config(), input=new_input)
+
+    session.history = result.to_input_list()
+    main.session_store.save(sender, session)
+    return result.final_output
+
+def run_mode(mode, num_requests, concurrency, senders):
+    """Run the benchmark for one serving path (called in a fresh process)"""
+    import main
+
+    if mode == 'legacy':
+        main.run_conversation_turn = lambda sender, msg: legacy_conversation_turn(main, sender, msg)
+
+    def post(i):
+        client = main.app.test_client()
+        started = time.perf_counter()
+        response = client.post('/receive_whatsapp', data={
+            'Body': 'Quero simular um financiamento',
+            'From': f'whatsapp:+5511900{i % senders:06d}',
+        })
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    # Warm up imports and the first agent run
+    post(0)
+    rss_before = rss_mb()
+    fds_before = open_fds()
+
+    # Concurrent requests, as a threaded worker (gunicorn gthread) would see them
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(post, range(num_requests)))
+    elapsed = time.perf_counter() - started
+
+    # Single request thread: how many turns can run before the next request is served
+    single_started = time.perf_counter()
+    if mode == 'legacy':
+        for i in range(concurrency):
+            main.run_conversation_turn(f'whatsapp:+5521900{i:06d}', 'Quero simular')
+    else:
+        async def many_turns():
+            await asyncio.gather(*[
+                main.run_conversation_turn_async(f'whatsapp:+5521900{i:06d}', 'Quero simular')
+                for i in range(concurrency)
+            ])
+        main.agent_loop.run(many_turns())
+    single_elapsed = time.perf_counter() - single_started
+
+    return {
+        'mode': mode,
+        'requests': num_requests,
+        'concurrency': concurrency,
+        'throughput_rps': num_requests / elapsed,
+        'p50_ms': 1000 * latencies[len(latencies) // 2],
+        'p95_ms': 1000 * latencies[int(len(latencies) * 0.95) - 1],
+        'single_thread_turns_per_s': concurrency / single_elapsed,
+        'rss_growth_mb': rss_mb() - rss_before,
+        'fd_growth': open_fds() - fds_before,
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the agent serving paths")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--senders', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument('--mode', choices=['legacy', 'shared'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.requests, args.concurrency, args.senders)))
+        return
+
+    # Each mode runs in its own process so memory figures don't mix
+    env = dict(os.environ, AGENT_MODEL_PROVIDER='stub', STUB_MODEL_LATENCY=str(args.latency),
+               OPENAI_AGENTS_DISABLE_TRACING='1', WEBHOOK_MODE='sync', MESSAGE_COALESCING='false')
+    results = []
+    for mode in ['legacy', 'shared']:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode,
+             '--requests', str(args.requests), '--concurrency', str(args.concurrency),
+             '--senders', str(args.senders)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n===== SERVING PATH BENCHMARK (stub latency {args.latency * 1000:.0f} ms) =====")
+    print(f"{'mode':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'1-thread turns/s':>17} {'RSS +MB':>8} {'fds +':>6}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['throughput_rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['single_thread_turns_per_s']:>17.1f} {r['rss_growth_mb']:>8.1f} {r['fd_growth']:>6}")
+
+if __name__ == "__main__":
+    main_cli()
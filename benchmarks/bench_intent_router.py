@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agents.triage.triage_agent import triage_agent
+from utils.text import fold_text
+from ai_agents.triage.intent_router import IntentRouter
+
+# Offline accuracy and latency of the local intent router on the triage dataset.
+#
+# The router is not trained on the dataset, and each case is scored with its
+# own text removed from the router's examples (in case an instruction example
+# repeats it), so every number is held-out: what an unseen message gets.
+#
+# Usage: python benchmarks/bench_intent_router.py
+
+def evaluate(router, test_cases):
+    """Return routing outcomes and per-message latency for every case"""
+    outcomes = {"correct": 0, "wrong": 0, "fallback": 0}
+    latencies = []
+    for case in test_cases:
+        started = time.perf_counter()
+        decision = router.classify(case["input"], exclude=fold_text(case["input"]))
+        latencies.append(time.perf_counter() - started)
+
+        expected = (case.get("expected_agent") or "").replace("_", " ").lower()
+        if not decision.routed:
+            outcomes["fallback"] += 1
+        elif expected and expected == decision.agent_name.lower():
+            outcomes["correct"] += 1
+        else:
+            outcomes["wrong"] += 1
+    return outcomes, latencies
+
+def main():
+    with open('evals/triage_agent_test_dataset.json', 'r') as f:
+        test_cases = json.load(f)['test_cases']
+
+    router = IntentRouter.from_triage_agent(triage_agent)
+    print(f"\n===== INTENT ROUTER BENCHMARK ({len(test_cases)} cases, {len(router.examples)} examples) =====")
+
+    seen = {text for text, _ in router.examples}
+    overlap = sum(1 for case in test_cases if fold_text(case["input"]) in seen)
+    outcomes, _ = evaluate(router, test_cases)
+    routed = outcomes["correct"] + outcomes["wrong"]
+    precision = outcomes["correct"] / routed if routed else 0.0
+    print(f"\nHeld-out ({overlap} cases also among the examples, excluded when scoring them):")
+    print(f"  Routed locally: {routed}/{len(test_cases)} ({100 * routed / len(test_cases):.0f}%)")
+    print(f"  Correct: {outcomes['correct']}  Wrong: {outcomes['wrong']}  Precision: {100 * precision:.0f}%")
+    print(f"  Fallback to LLM triage: {outcomes['fallback']}")
+
+    # Latency over many repetitions
+    repetitions = 2000
+    latencies = []
+    for _ in range(repetitions // len(test_cases)):
+        latencies.extend(evaluate(router, test_cases)[1])
+    latencies.sort()
+    print(f"\nLatency per message ({len(latencies)} calls):")
+    print(f"  p50: {1e6 * latencies[len(latencies) // 2]:.0f} µs")
+    print(f"  p99: {1e6 * latencies[int(len(latencies) * 0.99)]:.0f} µs")
+    print(f"  max: {1e6 * latencies[-1]:.0f} µs")
+
+    print("\nDecisions:")
+    for case in test_cases:
+        decision = router.classify(case["input"], exclude=fold_text(case["input"]))
+        print(f"  {case['input'][:55]:<55} -> {decision}")
+
+if __name__ == "__main__":
+    main()
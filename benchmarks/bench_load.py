@@ -0,0 +1,378 @@
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import signal
+import socket
+import tempfile
+import argparse
+import itertools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_twilio import FakeTwilioServer
+
+# Load test of /receive_whatsapp on a real gunicorn server.
+#
+# The app runs as `gunicorn main:app` (gthread, --workers x --threads) with the
+# offline stub model (--latency seconds per call) and its outbound messages
+# going to a local fake of the Twilio API. Simulated senders play the user
+# turns of the four eval datasets, one conversation each, as form-encoded
+# webhooks shaped like Twilio's. Either --concurrency senders talk at once,
+# each waiting for the reply before its next message (in the TwiML response
+# with WEBHOOK_MODE=sync, at the fake Twilio otherwise), or messages arrive at
+# --rate per second whatever the server's pace. The report has throughput,
+# latency percentiles, error and timeout rates and the RSS of every worker.
+#
+# --url targets a server that is already running instead (no RSS figures);
+# --env KEY=VALUE passes settings to the app (e.g. MESSAGE_COALESCING=true).
+#
+# Usage: python benchmarks/bench_load.py [--workers 2] [--threads 16] [--concurrency 20 | --rate 10] [--duration 30] [--senders 200] [--latency 0.3] [--webhook-mode sync|async] [--json report.json]
+
+DATASETS = ["triage", "questions", "simulator", "application"]
+
+# Twilio gives up on a webhook after 15 seconds
+TWILIO_TIMEOUT = 15.0
+
+def load_conversations():
+    """User turns of every eval case, one list per conversation"""
+    conversations = []
+    for dataset in DATASETS:
+        with open(f'evals/{dataset}_agent_test_dataset.json', 'r') as f:
+            for case in json.load(f)['test_cases']:
+                if "conversation" in case:
+                    turns = [message["content"] for message in case["conversation"] if message["role"] == "user"]
+                else:
+                    turns = [case["input"]] + [follow_up["user"] for follow_up in case.get("follow_up_inputs", [])]
+                conversations.append(turns)
+    return conversations
+
+def webhook_payload(sender_number, body, account_sid="ACfake", to_number="+14155238886"):
+    """Form fields of an inbound WhatsApp message, as Twilio posts them"""
+    message_sid = "SM" + uuid.uuid4().hex
+    return {
+        "SmsMessageSid": message_sid,
+        "NumMedia": "0",
+        "ProfileName": f"Cliente {sender_number[-4:]}",
+        "MessageType": "text",
+        "SmsSid": message_sid,
+        "WaId": sender_number.lstrip("+"),
+        "SmsStatus": "received",
+        "Body": body,
+        "To": f"whatsapp:{to_number}",
+        "NumSegments": "1",
+        "ReferralNumMedia": "0",
+        "MessageSid": message_sid,
+        "AccountSid": account_sid,
+        "From": f"whatsapp:{sender_number}",
+        "ApiVersion": "2010-04-01",
+    }
+
+class SimulatedSender:
+    def __init__(self, index, conversation):
+        """A WhatsApp user replaying one conversation, in a loop"""
+        self.number = f"+55119{index:08d}"
+        self._turns = itertools.cycle(conversation)
+
+    def next_message(self):
+        return next(self._turns)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def worker_pids(master_pid):
+    """PIDs of the gunicorn workers forked by the master"""
+    try:
+        with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+def rss_mb(pid):
+    """Resident memory of a process, in MB (None once it is gone)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+class RSSSampler:
+    def __init__(self, master_pid, interval_seconds=0.5):
+        """Samples the RSS of every worker of a gunicorn master in the background"""
+        self.master_pid = master_pid
+        self.interval_seconds = interval_seconds
+        self.samples = {}  # worker pid -> [MB, ...]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval_seconds)
+
+    def sample(self):
+        for pid in worker_pids(self.master_pid):
+            value = rss_mb(pid)
+            if value is not None:
+                self.samples.setdefault(pid, []).append(value)
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def report(self):
+        return {
+            str(pid): {"start_mb": values[0], "peak_mb": max(values), "end_mb": values[-1]}
+            for pid, values in sorted(self.samples.items())
+        }
+
+def start_server(args, twilio_url):
+    """Start gunicorn with the stub model and the fake Twilio; return (process, url)"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        AGENT_MODEL_PROVIDER="stub",
+        STUB_MODEL_LATENCY=str(args.latency),
+        OPENAI_AGENTS_DISABLE_TRACING="1",
+        TWILIO_API_BASE_URL=twilio_url,
+        TWILIO_ACCOUNT_SID="ACfake",
+        TWILIO_AUTH_TOKEN="fake",
+        TWILIO_WHATSAPP_NUMBER="+14155238886",
+        WEBHOOK_MODE=args.webhook_mode,
+        REPLY_DELIVERY=args.reply_delivery,
+        APPLICATION_STORE_PATH=os.path.join(tempfile.mkdtemp(), "applications.db"),
+    )
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "--bind", f"127.0.0.1:{port}",
+         "--worker-class", "gthread", "--workers", str(args.workers), "--threads", str(args.threads),
+         "--timeout", "120", "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    # Wait until every worker has imported the app and answers
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode} (run with --verbose)")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok and len(worker_pids(process.pid)) >= args.workers:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("gunicorn did not start within 60 seconds")
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+class LoadGenerator:
+    def __init__(self, url, senders, twilio, wait_for_outbound, timeout):
+        """
+        Sends webhooks to url and records the outcome of each
+
+        Args:
+            url (str): Base URL of the app
+            senders (list): SimulatedSender instances
+            twilio (FakeTwilioServer): Where outbound replies arrive
+            wait_for_outbound (bool): Replies are outbound messages, not the TwiML response
+            timeout (float): Seconds a webhook (or its outbound reply) may take
+        """
+        self.url = url
+        self.senders = senders
+        self.twilio = twilio
+        self.wait_for_outbound = wait_for_outbound
+        self.timeout = timeout
+        self.results = []  # (sent at, outcome, latency seconds)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        # One keep-alive connection per client thread
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _record(self, sent_at, outcome, latency):
+        with self._lock:
+            self.results.append((sent_at, outcome, latency))
+
+    def send(self, sender, wait_for_reply):
+        """Post sender's next message; with wait_for_reply, also wait for the reply to arrive"""
+        replies_before = len(self.twilio.received(sender.number)) if self.wait_for_outbound else 0
+        payload = webhook_payload(sender.number, sender.next_message())
+        started = time.perf_counter()
+        try:
+            response = self._session().post(f"{self.url}/receive_whatsapp", data=payload, timeout=self.timeout)
+        except requests.Timeout:
+            self._record(started, "timeout", time.perf_counter() - started)
+            return
+        except requests.RequestException:
+            self._record(started, "error", time.perf_counter() - started)
+            return
+        if response.status_code != 200:
+            self._record(started, "error", time.perf_counter() - started)
+            return
+
+        if wait_for_reply and self.wait_for_outbound:
+            # The webhook only acknowledged: the reply is an outbound message
+            deadline = started + self.timeout
+            while len(self.twilio.received(sender.number)) <= replies_before:
+                if time.perf_counter() > deadline:
+                    self._record(started, "timeout", time.perf_counter() - started)
+                    return
+                time.sleep(0.005)
+        self._record(started, "ok", time.perf_counter() - started)
+
+    def run_closed(self, concurrency, duration):
+        """concurrency senders at once, each sending its next message when the previous one is answered"""
+        idle = queue.Queue()
+        for sender in self.senders:
+            idle.put(sender)
+        stop_at = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < stop_at:
+                sender = idle.get()
+                try:
+                    self.send(sender, wait_for_reply=True)
+                finally:
+                    idle.put(sender)
+
+        threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate, duration, max_in_flight):
+        """Messages at rate per second, round-robin over the senders, however long they take"""
+        total = int(rate * duration)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            for i in range(total):
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, self.senders[i % len(self.senders)], False)
+
+def summarize(results, elapsed):
+    latencies = [latency for _, outcome, latency in results if outcome == "ok"]
+    count = len(results)
+    summary = {
+        "requests": count,
+        "ok": len(latencies),
+        "errors": sum(1 for _, outcome, _ in results if outcome == "error"),
+        "timeouts": sum(1 for _, outcome, _ in results if outcome == "timeout"),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+    }
+    summary["error_rate"] = summary["errors"] / count if count else 0.0
+    summary["timeout_rate"] = summary["timeouts"] / count if count else 0.0
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update(p50_ms=1000 * p50, p95_ms=1000 * p95, p99_ms=1000 * p99, max_ms=1000 * max(latencies))
+    return summary
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Load test /receive_whatsapp with a stub model and a fake Twilio")
+    parser.add_argument('--url', help="Target an app that is already running instead of starting gunicorn")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=16, help="Threads per worker (gthread)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=20, help="Senders talking at the same time (closed loop)")
+    load.add_argument('--rate', type=float, help="Messages per second, whatever the response times (open loop)")
+    parser.add_argument('--max-in-flight', type=int, default=500, help="Client threads with --rate")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of load")
+    parser.add_argument('--senders', type=int, default=200, help="Simulated WhatsApp users")
+    parser.add_argument('--latency', type=float, default=0.3, help="Stub model latency in seconds")
+    parser.add_argument('--twilio-latency', type=float, default=0.05, help="Fake Twilio API latency in seconds")
+    parser.add_argument('--timeout', type=float, default=TWILIO_TIMEOUT, help="Seconds before a message counts as timed out")
+    parser.add_argument('--webhook-mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--reply-delivery', choices=['single', 'progressive'], default='single')
+    parser.add_argument('--env', action='append', default=[], help="KEY=VALUE passed to the app (repeatable)")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--verbose', action='store_true', help="Show gunicorn's output")
+    args = parser.parse_args()
+
+    twilio = FakeTwilioServer(latency_seconds=args.twilio_latency).start()
+    process, sampler = None, None
+    if args.url:
+        url = args.url.rstrip('/')
+    else:
+        process, url = start_server(args, twilio.url)
+        sampler = RSSSampler(process.pid).start()
+
+    conversations = load_conversations()
+    senders = [SimulatedSender(i, conversations[i % len(conversations)]) for i in range(args.senders)]
+    # Replies come back as outbound messages unless they are in the TwiML response
+    wait_for_outbound = args.webhook_mode == "async" or args.reply_delivery == "progressive"
+    generator = LoadGenerator(url, senders, twilio, wait_for_outbound, args.timeout)
+
+    load = f"{args.rate:g} msg/s" if args.rate else f"{args.concurrency} concurrent senders"
+    server = url if args.url else f"{args.workers} workers x {args.threads} threads"
+    print(f"\n===== WEBHOOK LOAD TEST ({load}, {args.duration:g} s, {server}, "
+          f"stub model {1000 * args.latency:.0f} ms, {args.webhook_mode}/{args.reply_delivery}) =====")
+
+    started = time.perf_counter()
+    try:
+        if args.rate:
+            generator.run_open(args.rate, args.duration, args.max_in_flight)
+        else:
+            generator.run_closed(args.concurrency, args.duration)
+        elapsed = time.perf_counter() - started
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if process is not None:
+            stop_server(process)
+        twilio.stop()
+
+    summary = summarize(generator.results, elapsed)
+    summary["outbound_messages"] = len(twilio.received())
+    print(f"\n{'requests':>9} {'ok':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'timeouts':>9}")
+    print(f"{summary['requests']:>9} {summary['ok']:>7} {summary['throughput_rps']:>8.1f} "
+          f"{summary.get('p50_ms', 0):>8.0f} {summary.get('p95_ms', 0):>8.0f} {summary.get('p99_ms', 0):>8.0f} "
+          f"{summary.get('max_ms', 0):>8.0f} {100 * summary['error_rate']:>6.1f}% {100 * summary['timeout_rate']:>8.1f}%")
+    print(f"Outbound messages received by the fake Twilio: {summary['outbound_messages']}")
+
+    if sampler is not None:
+        summary["workers"] = sampler.report()
+        print(f"\n{'worker pid':>10} {'RSS start MB':>13} {'peak MB':>8} {'end MB':>7}")
+        for pid, rss in summary["workers"].items():
+            print(f"{pid:>10} {rss['start_mb']:>13.1f} {rss['peak_mb']:>8.1f} {rss['end_mb']:>7.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(summary, settings=vars(args)), f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main_cli()
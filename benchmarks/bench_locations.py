@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text import fold_text
+from utils.locations import LocationIndex, normalize_state
+
+# Load time, memory footprint and lookup latency of the municipality index.
+#
+# Queries are real municipality names (accents stripped, lowercased, one or
+# two typos added, or cut to a prefix), with and without the UF. "linear scan"
+# folds and compares every name per query, for comparison.
+#
+# Usage: python benchmarks/bench_locations.py [queries per kind]
+
+def add_typo(text, rng):
+    """Delete, replace or swap one character"""
+    position = rng.randrange(len(text) - 1)
+    operation = rng.choice(["delete", "replace", "swap"])
+    if operation == "delete":
+        return text[:position] + text[position + 1:]
+    if operation == "replace":
+        return text[:position] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[position + 1:]
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+def per_call_us(function, queries):
+    started = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return 1e6 * (time.perf_counter() - started) / len(queries)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(7)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = LocationIndex.load()
+    load_ms = 1000 * (time.perf_counter() - started)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n===== LOCATION INDEX BENCHMARK ({len(index)} municipalities, {count} queries per kind) =====")
+    print(f"\nLoad: {load_ms:.0f} ms, {memory / 1e6:.2f} MB")
+
+    municipalities = [index._municipality(position) for position in range(len(index))]
+    sample = [rng.choice(municipalities) for _ in range(count)]
+    long_names = [m for m in sample if len(fold_text(m.name)) >= 8]
+
+    kinds = [
+        ("exact", index.exact, [(m.name, None) for m in sample]),
+        ("exact + UF", index.exact, [(m.name.upper(), m.uf) for m in sample]),
+        ("prefix", index.prefix, [(fold_text(m.name)[:5], None) for m in sample]),
+        ("typo", index.fuzzy, [(add_typo(fold_text(m.name), rng), None) for m in long_names]),
+        ("typo + UF", index.fuzzy, [(add_typo(fold_text(m.name), rng), m.uf) for m in long_names]),
+        ("resolve, typo", index.resolve, [(add_typo(m.name, rng), m.uf) for m in long_names]),
+        ("state name", lambda text, _: normalize_state(text), [(m.uf, None) for m in sample]),
+    ]
+    print(f"\n{'lookup':<16} {'µs/call':>9}")
+    for label, function, queries in kinds:
+        print(f"{label:<16} {per_call_us(function, queries):>9.1f}")
+
+    # Typo tolerance: how often the intended municipality is the unique answer
+    hits = sum(
+        1 for m in long_names
+        if index.resolve(add_typo(m.name, rng), m.uf).municipality == m
+    )
+    print(f"\nOne typo with the UF resolves to the right municipality: {hits}/{len(long_names)}")
+
+    folded_names = [fold_text(m.name) for m in municipalities]
+    def linear_scan(city, uf):
+        key = fold_text(city)
+        return [m for m, name in zip(municipalities, folded_names) if name == key]
+    print(f"Linear scan, exact: {per_call_us(linear_scan, [(m.name, None) for m in sample[:200]]):.1f} µs/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AGENT_MODEL_PROVIDER", "stub")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+os.environ.setdefault("WEBHOOK_MODE", "sync")
+
+# Agent turns and model calls when senders send several short messages in a
+# row, with and without per-sender coalescing.
+#
+# Each sender posts a burst of 3 or 4 messages ("oi", "quero simular",
+# "imóvel de 500 mil em SP"...) to /receive_whatsapp, 0.2 to 0.8 s apart,
+# with the stub model. Many senders do so at the same time. The benchmark also
+# checks that no two turns of the same sender ever overlap.
+#
+# Usage: python benchmarks/bench_message_coalescing.py [senders] [debounce window seconds] [model latency seconds]
+
+BURSTS = [
+    ["oi", "quero simular um financiamento", "imóvel de 500 mil em SP"],
+    ["olá", "tudo bem?", "queria saber sobre financiamento", "como funciona o SAC?"],
+    ["bom dia", "quero fazer a aplicação", "meu nome é Ana Paula Ferreira"],
+    ["oi", "imóvel de 300 mil", "em Campinas, SP", "pessoa física"],
+]
+
+def main():
+    senders = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    window = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    os.environ.setdefault("STUB_MODEL_LATENCY", str(latency))
+
+    import main as app_main
+    from utils.message_coalescer import MessageCoalescer
+
+    lock = threading.Lock()
+    turns, running, overlaps = [], {}, []
+    run_turn = app_main.run_conversation_turn_async
+
+    async def tracked_turn(sender, incoming_msg, on_text=None):
+        with lock:
+            turns.append(sender)
+            if running.get(sender):
+                overlaps.append(sender)
+            running[sender] = running.get(sender, 0) + 1
+        try:
+            return await run_turn(sender, incoming_msg, on_text)
+        finally:
+            with lock:
+                running[sender] -= 1
+    app_main.run_conversation_turn_async = tracked_turn
+
+    print(f"\n===== MESSAGE COALESCING BENCHMARK ({senders} senders, {window:.1f} s window, "
+          f"stub latency {1000 * latency:.0f} ms) =====")
+    print(f"\n{'arm':<12} {'messages':>9} {'turns':>6} {'model calls':>12} {'overlaps':>9} {'seconds':>8}")
+
+    for arm, coalescing in (("per message", False), ("coalesced", True)):
+        app_main.MESSAGE_COALESCING = coalescing
+        app_main.message_coalescer = MessageCoalescer(window_seconds=window)
+        turns.clear()
+        overlaps.clear()
+        model = app_main.model_provider.model
+        requests_before = model.requests
+
+        def converse(index):
+            rng = random.Random(index)
+            sender = f"whatsapp:+55119{index:08d}{int(coalescing)}"
+            posts = []
+            for message in BURSTS[index % len(BURSTS)]:
+                thread = threading.Thread(target=lambda body=message: app_main.app.test_client().post(
+                    '/receive_whatsapp', data={"Body": body, "From": sender}))
+                thread.start()
+                posts.append(thread)
+                time.sleep(rng.uniform(0.2, 0.8))
+            for thread in posts:
+                thread.join()
+            return len(posts)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=senders) as executor:
+            messages = sum(executor.map(converse, range(senders)))
+        elapsed = time.perf_counter() - started
+        print(f"{arm:<12} {messages:>9} {len(turns):>6} {model.requests - requests_before:>12} "
+              f"{len(overlaps):>9} {elapsed:>8.2f}")
+
+    print(f"\n{app_main.message_coalescer.stats()}")
+
+if __name__ == "__main__":
+    main()
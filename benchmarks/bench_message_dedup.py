@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("AGENT_MODEL_PROVIDER", "stub")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+os.environ.setdefault("WEBHOOK_MODE", "sync")
+# Retries of one message only; merging a sender's messages is measured by bench_message_coalescing.py
+os.environ.setdefault("MESSAGE_COALESCING", "false")
+
+# Agent runs during a retry storm, with and without MessageSid deduplication.
+#
+# Every message is delivered several times to /receive_whatsapp (the original
+# and Twilio's retries, a fraction of a second apart, while the first run is
+# still in flight), using the stub model. Without deduplication (requests
+# without MessageSid) each delivery runs the agents; with it, retries attach
+# to the first run.
+#
+# Usage: python benchmarks/bench_message_dedup.py [messages] [deliveries per message] [model latency seconds]
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    deliveries = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    os.environ.setdefault("STUB_MODEL_LATENCY", str(latency))
+
+    import main as app_main
+
+    runs = []
+    lock = threading.Lock()
+    run_turn = app_main.run_conversation_turn_async
+
+    async def counted_turn(sender, incoming_msg, on_text=None):
+        with lock:
+            runs.append(sender)
+        return await run_turn(sender, incoming_msg, on_text)
+    app_main.run_conversation_turn_async = counted_turn
+
+    print(f"\n===== MESSAGE DEDUP BENCHMARK ({messages} messages x {deliveries} deliveries, "
+          f"stub latency {1000 * latency:.0f} ms) =====")
+    print(f"\n{'arm':<10} {'runs':>6} {'replies':>8} {'identical':>10} {'seconds':>8}")
+
+    for arm in ("no dedup", "dedup"):
+        runs.clear()
+        rng = random.Random(3)
+
+        def deliver(job):
+            number, attempt = job
+            # Retries land a little after the original delivery
+            time.sleep(attempt * rng.uniform(0.05, 0.2))
+            data = {"Body": "Quero simular um financiamento", "From": f"whatsapp:+55119{number:08d}"}
+            if arm == "dedup":
+                data["MessageSid"] = f"SM{number:032d}"
+            response = app_main.app.test_client().post('/receive_whatsapp', data=data)
+            return number, response.data
+
+        jobs = [(number, attempt) for number in range(messages) for attempt in range(deliveries)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            responses = list(executor.map(deliver, jobs))
+        elapsed = time.perf_counter() - started
+
+        # Each retry should get the same TwiML reply as the original delivery
+        by_message = {}
+        for number, body in responses:
+            by_message.setdefault(number, set()).add(body)
+        identical = sum(1 for bodies in by_message.values() if len(bodies) == 1)
+        for number in range(messages):
+            app_main.session_store.reset(f"whatsapp:+55119{number:08d}")
+        print(f"{arm:<10} {len(runs):>6} {len(responses):>8} {identical:>7}/{messages} {elapsed:>8.2f}")
+
+    print(f"\n{app_main.message_deduplicator.stats()}")
+
+if __name__ == "__main__":
+    main()
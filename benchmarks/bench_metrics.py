@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+os.environ.setdefault("APPLICATION_STORE_PATH", os.path.join(tempfile.mkdtemp(), "applications.db"))
+os.environ.setdefault("AGENT_MODEL_PROVIDER", "stub")
+os.environ.setdefault("STUB_MODEL_LATENCY", "0")
+
+from utils.metrics import MetricsRegistry
+
+# Cost of the hot-path instrumentation (utils/metrics.py).
+#
+# First the primitives: a timed span, an observation and a counter increment,
+# from one thread and from several at once (they share the metric's lock),
+# and a span of a disabled registry. Then whole conversation turns through
+# main.run_conversation_turn with a zero-latency stub model, so the agents SDK
+# and the instrumentation are all that is measured, with metrics enabled and
+# disabled (alternating rounds), and the time to render /metrics afterwards.
+#
+# Usage: python benchmarks/bench_metrics.py [--operations 200000] [--threads 8] [--turns 300] [--rounds 5]
+
+def per_operation_ns(operation, count, threads=1):
+    """Nanoseconds per call of operation, with count calls spread over threads"""
+    per_thread = count // threads
+
+    def work():
+        for _ in range(per_thread):
+            operation()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return 1e9 * (time.perf_counter() - started) / (per_thread * threads)
+
+def primitives(operations, threads):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "Benchmark histogram", ("stage",))
+    counter = registry.counter("bench_total", "Benchmark counter", ("stage",))
+    disabled = MetricsRegistry(enabled=False).histogram("bench_seconds", "Benchmark histogram", ("stage",))
+
+    def span():
+        with histogram.time("agent_run"):
+            pass
+
+    def disabled_span():
+        with disabled.time("agent_run"):
+            pass
+
+    def bare():
+        pass
+
+    cases = [
+        ("empty call (baseline)", bare),
+        ("span", span),
+        ("observe", lambda: histogram.observe(0.01, "agent_run")),
+        ("counter inc", lambda: counter.inc("agent_run")),
+        ("span, metrics disabled", disabled_span),
+    ]
+    print(f"\n{'operation':<24} {'ns/op 1 thread':>15} {f'ns/op {threads} threads':>17}")
+    for name, operation in cases:
+        print(f"{name:<24} {per_operation_ns(operation, operations):>15.0f} "
+              f"{per_operation_ns(operation, operations, threads):>17.0f}")
+
+def turns(count, rounds):
+    import main
+
+    messages = ["Quero simular um financiamento", "Qual a diferença entre SAC e Price?", "Quero aplicar para um financiamento"]
+    counter = [0]
+
+    def play():
+        started = time.perf_counter()
+        for i in range(count):
+            counter[0] += 1
+            sender = f"whatsapp:+55119{counter[0]:08d}"
+            main.run_conversation_turn(sender, messages[i % len(messages)])
+        return (time.perf_counter() - started) / count
+
+    # Warm up imports, agents and caches; cached answers would skip the run
+    main.answer_cache.get = lambda message, agent: None
+    main.semantic_cache.get = lambda message, agent: None
+    play()
+
+    timings = {True: [], False: []}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            main.metrics.enabled = enabled
+            timings[enabled].append(play())
+    main.metrics.enabled = True
+
+    off, on = min(timings[False]), min(timings[True])
+    print(f"\n{'turns':<24} {'µs/turn':>15}")
+    print(f"{'metrics disabled':<24} {1e6 * off:>15.0f}")
+    print(f"{'metrics enabled':<24} {1e6 * on:>15.0f}")
+    print(f"Overhead: {1e6 * (on - off):.0f} µs per turn ({100 * (on - off) / off:+.1f}%), best of {rounds} rounds of {count} turns")
+
+    started = time.perf_counter()
+    exposition = main.app.test_client().get('/metrics').data
+    print(f"/metrics: {len(exposition)} bytes rendered in {1000 * (time.perf_counter() - started):.1f} ms")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Overhead of the hot-path metrics")
+    parser.add_argument('--operations', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--turns', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    print("\n===== METRICS OVERHEAD BENCHMARK =====")
+    primitives(args.operations, args.threads)
+    turns(args.turns, args.rounds)
+
+if __name__ == "__main__":
+    main_cli()
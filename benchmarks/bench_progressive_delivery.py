@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import logging
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_twilio import FakeTwilioServer
+
+# Time to the first visible WhatsApp message, single vs progressive delivery.
+#
+# The stub model streams a long multi-paragraph reply (half of its latency
+# before the first token, the rest spread over the text), and replies are
+# sent to a local fake of the Twilio API, which records when each message
+# arrives. Per-conversation ordering is checked on what the fake received.
+#
+# Usage: python benchmarks/bench_progressive_delivery.py [model latency seconds] [conversations]
+
+LONG_REPLY = (
+    "Claro! Vou te explicar como funciona o financiamento imobiliário.\n\n"
+    "No sistema SAC a amortização é constante. As parcelas começam mais altas e diminuem "
+    "ao longo do contrato, porque os juros incidem sobre um saldo cada vez menor. "
+    "É uma boa opção para quem pode pagar mais no início.\n\n"
+    "Na tabela Price as parcelas são fixas. No começo a maior parte da parcela é juros, "
+    "e a amortização cresce com o tempo. O total pago costuma ser maior do que no SAC.\n\n"
+    "Para seguir com a simulação, preciso de algumas informações: o tipo de pessoa (física ou "
+    "jurídica), o valor do imóvel, o estado e a cidade onde ele fica. "
+    "Com esses dados eu gero a simulação completa, com as duas tabelas e o custo efetivo total.\n\n"
+    "Se preferir, também posso tirar outras dúvidas sobre documentação, FGTS ou prazos."
+)
+
+def main():
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else 6.0
+    conversations = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = FakeTwilioServer(latency_seconds=0.05).start()
+    os.environ.update({
+        "TWILIO_API_BASE_URL": server.url,
+        "TWILIO_ACCOUNT_SID": "ACfake",
+        "TWILIO_AUTH_TOKEN": "fake",
+        "TWILIO_WHATSAPP_NUMBER": "+15550000000",
+        "OPENAI_AGENTS_DISABLE_TRACING": "1",
+    })
+
+    import main as app_main
+    logging.getLogger("twilio.http_client").setLevel(logging.WARNING)
+    from utils.stub_model import StubModelProvider
+    from utils.message_chunker import split_message
+    app_main.model_provider = StubModelProvider(latency_seconds=latency, reply=LONG_REPLY)
+
+    print(f"\n===== PROGRESSIVE DELIVERY BENCHMARK ({conversations} conversations, "
+          f"{len(LONG_REPLY)}-char reply, {latency:.1f} s model) =====")
+    print(f"\n{'mode':<12} {'first msg s':>12} {'last msg s':>11} {'messages':>9} {'in order':>9}")
+
+    for mode in ("single", "progressive"):
+        app_main.REPLY_DELIVERY = mode
+        server.reset()
+        started = {}
+
+        def converse(i):
+            sender = f"whatsapp:+55119{mode[0]}{i:07d}"
+            started[sender] = time.perf_counter()
+            app_main.reply_in_background(sender, f"Quero simular o financiamento de um imóvel de {300 + i} mil")
+
+        threads = [threading.Thread(target=converse, args=(i,)) for i in range(conversations)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Progressive sends may still be in flight when the run returns
+        expected = " ".join(LONG_REPLY.split())
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline:
+            if all(" ".join(" ".join(m[2] for m in server.received(sender)).split()) == expected for sender in started):
+                break
+            time.sleep(0.05)
+
+        first, last, counts, ordered = [], [], [], 0
+        for sender, start in started.items():
+            received = server.received(sender)
+            first.append(received[0][0] - start)
+            last.append(received[-1][0] - start)
+            counts.append(len(received))
+            ordered += " ".join(" ".join(m[2] for m in received).split()) == expected
+        print(f"{mode:<12} {sum(first) / len(first):>12.2f} {sum(last) / len(last):>11.2f} "
+              f"{sum(counts) / len(counts):>9.1f} {ordered:>5}/{len(started)}")
+
+    print(f"\nSingle-message split of the reply: {[len(chunk) for chunk in split_message(LONG_REPLY)]} chars")
+    server.stop()
+
+if __name__ == "__main__":
+    main()
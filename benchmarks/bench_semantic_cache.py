@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agents.questions.questions_agent import questions_agent
+from ai_agents.questions.semantic_cache import SemanticCache, embed_question, guard_tokens
+
+# Lookup latency of the questions_agent semantic cache at growing sizes.
+#
+# The matrix is filled with random unit vectors (embedding a million real
+# questions would only measure the embedding), then real questions are looked
+# up against it. Insertion throughput is measured separately with real text.
+#
+# Usage: python benchmarks/bench_semantic_cache.py [sizes...]   (default: 10000 100000 1000000)
+
+QUERIES = [
+    "quais documentos preciso",
+    "posso usar FGTS na entrada",
+    "o que significa ITBI",
+    "diferença SAC e Price",
+    "qual horario de atendimento",
+]
+
+# Questions close in wording whose answers differ: none may reuse the other's answer
+HARD_NEGATIVES = [
+    ("Qual o prazo máximo do financiamento?", "Qual o prazo mínimo do financiamento?"),
+    ("Pessoa jurídica pode financiar?", "Pessoa física pode financiar?"),
+    ("Qual a taxa de juros da Caixa?", "Qual a taxa de juros do Itaú?"),
+    ("Qual o horário de atendimento?", "Qual o horário de atendimento no sábado?"),
+    ("Posso fazer um financiamento de 500 mil?", "Posso fazer um financiamento de 300 mil?"),
+    ("Posso usar o FGTS na entrada?", "Não posso usar o FGTS na entrada?"),
+    ("Qual a entrada mínima no SAC?", "Qual a entrada mínima na Price?"),
+    ("Qual o prazo máximo em anos?", "Qual o prazo máximo em meses?"),
+]
+
+PARAPHRASES = [
+    ("Quais documentos preciso apresentar?", "quais documentos preciso"),
+    ("Posso usar o FGTS para dar entrada?", "posso usar FGTS na entrada"),
+    ("Qual a diferença entre SAC e Price?", "diferença SAC e Price"),
+    ("O que é alienação fiduciária?", "o que e alienacao fiduciaria"),
+    ("O que é ITBI?", "O que é CET?"),
+    ("Posso usar o FGTS para dar entrada?", "Posso usar o FGTS para amortizar?"),
+]
+
+def fill_random(cache, size, seed=0):
+    """Fill the first size rows of the cache with random unit vectors"""
+    rng = np.random.default_rng(seed)
+    chunk = 100000
+    for start in range(0, size, chunk):
+        stop = min(start + chunk, size)
+        block = rng.standard_normal((stop - start, cache.dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        cache._vectors[start:stop] = block
+    cache._last_used[:size] = np.arange(1, size + 1)
+    cache._questions = [f"q{i}" for i in range(size)]
+    cache._guards = [frozenset()] * size
+    cache._answers = ["answer"] * size
+    cache._fingerprints = [""] * size
+    cache._clock = size
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    dim = int(os.environ.get("SEMANTIC_CACHE_DIM", 256))
+
+    print(f"\n===== SEMANTIC CACHE BENCHMARK (dim={dim}) =====")
+
+    threshold = SemanticCache(dim=dim, capacity=1).threshold
+    print(f"\nSimilarity of paraphrases (threshold {threshold}):")
+    for first, second in PARAPHRASES:
+        similarity = float(embed_question(first, dim) @ embed_question(second, dim))
+        reused = similarity >= threshold and guard_tokens(first) == guard_tokens(second)
+        print(f"  {similarity:.2f} {'reused' if reused else 'missed':<7} {first:<38} | {second}")
+
+    # Precision: the second question of each pair must miss a cache holding the first
+    print("\nHard negatives (must never be served from the cache):")
+    served = 0
+    for cached, question in HARD_NEGATIVES:
+        cache = SemanticCache(dim=dim, capacity=10)
+        cache.set(cached, questions_agent, "answer")
+        hit = cache.get(question, questions_agent) is not None
+        served += hit
+        similarity = float(embed_question(cached, dim) @ embed_question(question, dim))
+        print(f"  {similarity:.2f} {'SERVED' if hit else 'ok':<7} {cached:<42} | {question}")
+    print(f"{served}/{len(HARD_NEGATIVES)} hard negatives served")
+
+    # Insertion throughput with real text (embedding + search + write)
+    cache = SemanticCache(dim=dim, capacity=10000)
+    started = time.perf_counter()
+    for i in range(5000):
+        cache.set(f"{QUERIES[i % len(QUERIES)]} variante {i}", questions_agent, "answer")
+    elapsed = time.perf_counter() - started
+    print(f"\nInsertion: {5000 / elapsed:.0f} questions/s into a cache growing to 5000 entries")
+
+    print(f"\n{'entries':>10} {'matrix MB':>10} {'embed µs':>9} {'p50 µs':>9} {'p99 µs':>9}")
+    for size in sizes:
+        cache = SemanticCache(dim=dim, capacity=size)
+        fill_random(cache, size)
+
+        embed_times = []
+        lookup_times = []
+        for i in range(200):
+            query = QUERIES[i % len(QUERIES)]
+            started = time.perf_counter()
+            vector = embed_question(query, dim)
+            embedded = time.perf_counter()
+            cache._search(vector)
+            finished = time.perf_counter()
+            embed_times.append(embedded - started)
+            lookup_times.append(finished - started)
+        embed_times.sort()
+        lookup_times.sort()
+        print(f"{size:>10} {cache._vectors.nbytes / 1e6:>10.0f} {1e6 * percentile(embed_times, 0.5):>9.0f} "
+              f"{1e6 * percentile(lookup_times, 0.5):>9.0f} {1e6 * percentile(lookup_times, 0.99):>9.0f}")
+        del cache
+    return served
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
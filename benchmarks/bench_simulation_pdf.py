@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_agents.simulator.amortization import FinancingTerms, simulate
+from ai_agents.simulator.simulation_pdf import render_simulation_pdf, simulation_key
+from utils.file_cache import ContentAddressedCache
+
+# Rendering time, hit ratio and disk usage of the simulation PDF pipeline.
+#
+# Requests are drawn from a Zipf-like distribution over scenarios (a few
+# popular property values and cities, a long tail of rare ones), and served
+# through the content-addressed cache at a few disk budgets.
+#
+# Usage: python benchmarks/bench_simulation_pdf.py
+
+CITIES = [("SP", "São Paulo"), ("RJ", "Rio de Janeiro"), ("MG", "Belo Horizonte"), ("PR", "Curitiba"),
+          ("RS", "Porto Alegre"), ("BA", "Salvador"), ("PE", "Recife"), ("DF", "Brasília")]
+
+def make_scenarios(count):
+    """Distinct (person type, state, city, property value) scenarios"""
+    scenarios = []
+    for i in range(count):
+        state, city = CITIES[i % len(CITIES)]
+        person_type = "física" if i % 5 else "jurídica"
+        scenarios.append((person_type, state, city, 200000 + 10000 * (i // len(CITIES))))
+    return scenarios
+
+def serve(cache, scenario):
+    """What the simulator tool does per call"""
+    person_type, state, city, value = scenario
+    terms = FinancingTerms.for_person_type(person_type, value)
+    summary, schedules = simulate(terms)
+    key = simulation_key(person_type, state, city, terms)
+    return cache.get_or_create(key, lambda: render_simulation_pdf(person_type, state, city, summary, schedules))
+
+def main():
+    print("\n===== SIMULATION PDF BENCHMARK =====")
+
+    # Rendering alone
+    terms = FinancingTerms(450000)
+    summary, schedules = simulate(terms)
+    latencies = []
+    for _ in range(50):
+        started = time.perf_counter()
+        data = render_simulation_pdf("física", "SP", "São Paulo", summary, schedules)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"\nRender (360 months, both systems): p50 {1000 * latencies[len(latencies) // 2]:.1f} ms, "
+          f"{len(data) / 1024:.0f} KB per document")
+
+    # Served through the cache with a skewed request mix
+    rng = random.Random(0)
+    scenarios = make_scenarios(500)
+    weights = [1 / (rank + 1) for rank in range(len(scenarios))]
+    requests = rng.choices(scenarios, weights=weights, k=3000)
+
+    print(f"\n{len(requests)} requests over {len(scenarios)} scenarios (Zipf):")
+    print(f"{'budget MB':>10} {'hit rate':>9} {'files':>6} {'disk MB':>8} {'evictions':>10} {'ms/request':>11}")
+    for budget_mb in (1, 5, 20):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ContentAddressedCache(directory, max_bytes=budget_mb * 1024 * 1024, suffix=".pdf")
+            started = time.perf_counter()
+            for scenario in requests:
+                serve(cache, scenario)
+            elapsed = time.perf_counter() - started
+            stats = cache.stats()
+            print(f"{budget_mb:>10} {100 * stats['hit_rate']:>8.0f}% {stats['files']:>6} {stats['bytes'] / 1e6:>8.1f} "
+                  f"{stats['evictions']:>10} {1000 * elapsed / len(requests):>11.2f}")
+        finally:
+            shutil.rmtree(directory)
+
+    # Hit vs miss latency of one call
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ContentAddressedCache(directory, suffix=".pdf")
+        scenario = scenarios[0]
+        started = time.perf_counter()
+        serve(cache, scenario)
+        miss = time.perf_counter() - started
+        started = time.perf_counter()
+        serve(cache, scenario)
+        hit = time.perf_counter() - started
+        print(f"\nTool call: {1000 * miss:.1f} ms on a miss, {1000 * hit:.2f} ms on a hit")
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The webhook pipeline runs on the offline stub model
+os.environ.setdefault("AGENT_MODEL_PROVIDER", "stub")
+os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+
+import main
+from utils.stub_model import StubModelProvider
+
+# Per-turn latency, model calls and handoffs of the multi-turn eval conversations,
+# with every follow-up going through triage (before) and with sticky agents (after).
+#
+# The stub triage model always hands off to the conversation's target agent, and
+# every model call takes --latency seconds.
+#
+# Usage: python benchmarks/bench_sticky_agents.py [--latency 0.3]
+
+def load_conversations():
+    """User messages of every multi-turn case, with the agent they belong to"""
+    conversations = []
+    for dataset, agent_name in [("application", "Application Agent"), ("simulator", "Simulator Agent")]:
+        with open(f'evals/{dataset}_agent_test_dataset.json', 'r') as f:
+            test_cases = json.load(f)['test_cases']
+        for case in test_cases:
+            if 'conversation' in case:
+                messages = [m['content'] for m in case['conversation'] if m['role'] == 'user']
+            elif 'follow_up_inputs' in case:
+                messages = [case['input']] + [f['user'] for f in case['follow_up_inputs']]
+            else:
+                continue
+            conversations.append((case['name'], agent_name, messages))
+    return conversations
+
+def run(conversations, sticky, latency):
+    """Replay every conversation through the webhook pipeline and collect per-turn figures"""
+    target = {"agent": None}
+    provider = StubModelProvider(
+        latency_seconds=latency,
+        choose_handoff=lambda input, handoffs: next(
+            (h for h in handoffs if h.agent_name == target["agent"]), None
+        ),
+    )
+    main.model_provider = provider
+    main.STICKY_AGENTS = sticky
+    model = provider.model
+
+    turns = []
+    for index, (name, agent_name, messages) in enumerate(conversations):
+        target["agent"] = agent_name
+        sender = f"whatsapp:+55119{index:08d}-{'sticky' if sticky else 'triage'}"
+        for position, message in enumerate(messages):
+            requests_before, handoffs_before = model.requests, model.handoffs
+            started = time.perf_counter()
+            main.run_conversation_turn(sender, message)
+            turns.append({
+                "follow_up": position > 0,
+                "latency": time.perf_counter() - started,
+                "model_calls": model.requests - requests_before,
+                "handoffs": model.handoffs - handoffs_before,
+            })
+    return turns
+
+def summarize(turns):
+    follow_ups = [t for t in turns if t["follow_up"]]
+    latencies = sorted(t["latency"] for t in follow_ups)
+    return {
+        "follow_up_turns": len(follow_ups),
+        "avg_latency_ms": 1000 * sum(latencies) / len(latencies),
+        "p95_latency_ms": 1000 * latencies[int(len(latencies) * 0.95) - 1],
+        "model_calls_per_turn": sum(t["model_calls"] for t in follow_ups) / len(follow_ups),
+        "handoffs_per_turn": sum(t["handoffs"] for t in follow_ups) / len(follow_ups),
+        "total_handoffs": sum(t["handoffs"] for t in turns),
+    }
+
+def main_cli():
+    latency = float(sys.argv[sys.argv.index('--latency') + 1]) if '--latency' in sys.argv else 0.3
+    conversations = load_conversations()
+    total_messages = sum(len(messages) for _, _, messages in conversations)
+    print(f"\n===== STICKY AGENTS BENCHMARK ({len(conversations)} conversations, "
+          f"{total_messages} messages, stub latency {1000 * latency:.0f} ms) =====")
+
+    results = [("always triage", summarize(run(conversations, False, latency))),
+               ("sticky", summarize(run(conversations, True, latency)))]
+
+    print(f"\n{'follow-up turns':<16} {'avg ms':>8} {'p95 ms':>8} {'calls/turn':>11} {'handoffs/turn':>14} {'handoffs':>9}")
+    for label, r in results:
+        print(f"{label:<16} {r['avg_latency_ms']:>8.0f} {r['p95_latency_ms']:>8.0f} "
+              f"{r['model_calls_per_turn']:>11.2f} {r['handoffs_per_turn']:>14.2f} {r['total_handoffs']:>9}")
+    print(f"\nIntent router: {main.intent_router.stats()}")
+
+if __name__ == "__main__":
+    main_cli()
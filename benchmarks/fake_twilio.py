@@ -0,0 +1,73 @@
+import json
+import time
+import threading
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local stand-in for the Twilio Messages API, for benchmarks.
+#
+# Point a WhatsAppSender at it with base_url=server.url (or TWILIO_API_BASE_URL);
+# every message it receives is recorded with its arrival time.
+
+class FakeTwilioServer:
+    def __init__(self, latency_seconds=0.0, port=0):
+        """
+        Args:
+            latency_seconds (float): Delay before answering each request (Twilio's API latency)
+            port (int): Port to listen on (0 picks a free one)
+        """
+        self.latency_seconds = latency_seconds
+        self.messages = []  # (arrival time, to, body)
+        self._lock = threading.Lock()
+        self._count = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                form = parse_qs(self.rfile.read(length).decode("utf-8"))
+                arrived = time.perf_counter()
+                if server.latency_seconds:
+                    time.sleep(server.latency_seconds)
+                with server._lock:
+                    server._count += 1
+                    sid = f"SM{server._count:032d}"
+                    server.messages.append((arrived, form.get("To", [""])[0], form.get("Body", [""])[0]))
+                body = json.dumps({"sid": sid, "status": "queued"}).encode("utf-8")
+                self.send_response(201)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def received(self, to=None):
+        """Messages received so far, optionally only those sent to one address"""
+        with self._lock:
+            return [message for message in self.messages if to is None or message[1] == to]
+
+    def reset(self):
+        with self._lock:
+            self.messages = []
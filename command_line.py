@@ -13,6 +13,11 @@ from ai_agents.simulator.simulator_agent import simulator_agent
 from ai_agents.application.application_agent import application_agent
 from ai_agents.questions.questions_agent import questions_agent
 from ai_agents.triage.triage_agent import triage_agent
+from ai_agents.triage.intent_router import IntentRouter
+from ai_agents.application.field_extractor import ApplicationSlots
+from utils.history_compaction import HistoryCompactor
+from ai_agents.streaming import run_streamed_turn
+from utils.event_loop import get_event_loop
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,6 +25,10 @@ load_dotenv()
 # Store the API key to ensure it's available throughout the session
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+# Messages with an obvious intent go straight to the specialist agent,
+# skipping the LLM triage hop
+intent_router = IntentRouter.from_triage_agent(triage_agent)
+
 @function_tool
 def apply_for_real_estate_financing(full_name:str, cpf_number:str, date_of_birth:str, monthly_income:float, marital_status:str, person_type:str, property_value:float, state:str, city:str):
     """
@@ -100,8 +109,48 @@ def generate_financing_simulation(person_type:str, property_value:float, state:s
         }
     }
 
+def print_token(delta):
+    """Print a streamed text delta as soon as it arrives"""
+    print(delta, end="", flush=True)
+
+def print_event(kind, detail):
+    """Show handoffs and tool calls inline with the streamed reply"""
+    if kind == "handoff":
+        print(f"\n[transferido para {detail}]", flush=True)
+    elif kind == "tool_call":
+        print(f"\n[ferramenta: {detail}]", flush=True)
+
+def run_turn(starting_agent, turn_input, stream, context=None):
+    """
+    Run one turn, printing the reply as it is generated when stream is True
+    
+    Every turn runs on the same long-lived event loop: the agents SDK shares one
+    HTTP client across runs, and its connections can't outlive the loop they
+    were opened on.
+    
+    Args:
+        context: Run context (the conversation's ApplicationSlots)
+
+    Returns:
+        RunResult: The run result (a RunResultStreaming when streaming)
+    """
+    run_config = RunConfig(workflow_name="loft-whatsapp-chatbot")
+    if not stream:
+        result = get_event_loop().run(Runner.run(
+            starting_agent=starting_agent, run_config=run_config, input=turn_input, context=context,
+        ))
+        print(f"\nAgente: {result.final_output}")
+        return result
+    
+    print("\nAgente: ", end="", flush=True)
+    result, timings = get_event_loop().run(run_streamed_turn(
+        starting_agent, turn_input, run_config=run_config, context=context, on_text=print_token, on_event=print_event,
+    ))
+    print(f"\n({timings})")
+    return result
+
 # Add interactive command line chat functionality
-def interactive_chat():
+def interactive_chat(stream=True):
     print("Bem-vindo ao chatbot de financiamento imobiliário da Loft!")
     print("Digite 'sair' para encerrar a conversa.")
     print("-------------------------------------------------")
@@ -112,6 +161,12 @@ def interactive_chat():
     # Initialize result for the first turn
     result = None
     
+    # Old turns are condensed or dropped so each prompt stays under a token budget
+    history_compactor = HistoryCompactor.from_env()
+    
+    # Application fields extracted from the messages, read by application_agent
+    slots = ApplicationSlots()
+    
     while True:
         user_input = input("\nVocê: ")
         
@@ -123,26 +178,32 @@ def interactive_chat():
             # Ensure API key is set for each request
             os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
             
+            # The first message starts at the specialist agent when the local
+            # router is confident; follow-ups stay with the last active agent
+            # unless the user changes topic
+            if result is None:
+                decision = intent_router.route(user_input)
+                starting_agent = decision.agent or triage_agent
+                turn_input = user_input
+            else:
+                starting_agent = intent_router.continue_conversation(user_input, result.last_agent.name)
+                # Subsequent turns - use previous result to maintain context,
+                # compacted to the token budget
+                history, report = history_compactor.compact(result.to_input_list())
+                if report.tokens_saved > 0:
+                    print(f"(histórico compactado: {report.tokens_saved} tokens economizados)")
+                turn_input = history + [{"role": "user", "content": user_input}]
+            
+            slots.update(user_input, last_reply=result.final_output if result is not None else None)
+            
             # Use trace to maintain conversation context
             with trace(workflow_name="loft-whatsapp-chatbot", group_id=thread_id):
-                if result is None:
-                    # First turn
-                    result = Runner.run_sync(
-                        starting_agent=triage_agent,
-                        run_config=RunConfig(workflow_name="loft-whatsapp-chatbot"),
-                        input=user_input,
-                    )
-                else:
-                    # Subsequent turns - use previous result to maintain context
-                    new_input = result.to_input_list() + [{"role": "user", "content": user_input}]
-                    result = Runner.run_sync(
-                        starting_agent=triage_agent,
-                        run_config=RunConfig(workflow_name="loft-whatsapp-chatbot"),
-                        input=new_input,
-                    )
+                result = run_turn(starting_agent, turn_input, stream, context=slots)
             
-            # Print the agent's response
-            print(f"\nAgente: {result.final_output}")
+            # A submitted application starts the next one from scratch
+            if any(item.type == "tool_call_item" and getattr(item.raw_item, "name", None) == "apply_for_real_estate_financing"
+                   for item in result.new_items):
+                slots = ApplicationSlots()
             
         except Exception as e:
             print(f"\nErro: {str(e)}")
@@ -150,27 +211,31 @@ def interactive_chat():
 
 # Add command-line execution
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    # Replies are streamed token by token unless --no-stream is given
+    stream = "--no-stream" not in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--no-stream"]
+    
+    if args:
         # If command line arguments are provided, use them as input
         try:
             # Ensure API key is set
             os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
             
-            user_input = " ".join(sys.argv[1:])
+            user_input = " ".join(args)
             
             # Generate a unique thread ID for this conversation
             thread_id = str(uuid.uuid4())
             
-            with trace(workflow_name="loft-whatsapp-chatbot", group_id=thread_id):
-                output = Runner.run_sync(
-                    starting_agent=triage_agent,
-                    run_config=RunConfig(workflow_name="loft-whatsapp-chatbot"),
-                    input=user_input,
-                )
+            # Start at the specialist agent when the local router is confident
+            decision = intent_router.route(user_input)
             
-            print(output.final_output)
+            slots = ApplicationSlots()
+            slots.update(user_input)
+            
+            with trace(workflow_name="loft-whatsapp-chatbot", group_id=thread_id):
+                run_turn(decision.agent or triage_agent, user_input, stream, context=slots)
         except Exception as e:
             print(f"Erro: {str(e)}")
     else:
         # Otherwise, start interactive chat
-        interactive_chat()
\ No newline at end of file
+        interactive_chat(stream=stream)
@@ -0,0 +1,47 @@
+import os
+import sys
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig
+
+from utils.cassette_model import Cassette, CassetteModelProvider
+
+# Model cassettes for the evals.
+#
+# With EVAL_CASSETTE set to a file (e.g. evals/cassettes/evals.jsonl.gz), the
+# agents and the questions judge answer from it instead of calling OpenAI.
+# EVAL_CASSETTE_MODE is "replay" (default: offline, a request that was never
+# recorded fails), "record" (call the model and record every answer) or
+# "auto" (replay what is recorded and record the rest).
+#
+#   EVAL_CASSETTE=evals/cassettes/evals.jsonl.gz EVAL_CASSETTE_MODE=record python evals/run_all.py
+#   EVAL_CASSETTE=evals/cassettes/evals.jsonl.gz python evals/run_all.py
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_cassette_provider():
+    """The evals' cassette model provider, or None when EVAL_CASSETTE is not set"""
+    global _provider
+    path = os.environ.get("EVAL_CASSETTE")
+    if not path:
+        return None
+    with _provider_lock:
+        if _provider is None:
+            _provider = CassetteModelProvider(Cassette(path), mode=os.environ.get("EVAL_CASSETTE_MODE", "replay"))
+        return _provider
+
+def eval_run_config():
+    """Run configuration of the eval cases (served from the cassette when EVAL_CASSETTE is set)"""
+    provider = get_cassette_provider()
+    if provider is not None:
+        return RunConfig(workflow_name="test", model_provider=provider)
+    return RunConfig(workflow_name="test")
+
+def save_cassette():
+    """Write what was recorded so far (also done at exit)"""
+    if _provider is not None:
+        _provider.cassette.save()
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evals.cassettes import get_cassette_provider
+from utils.cassette_model import CassetteMiss
+
+# Judge of the questions eval: is an answer semantically equivalent to the
+# expected one?
+#
+# Verdicts are cached on disk, keyed by a hash of the judge's prompt version,
+# model, question, expected answer and actual answer, so a re-run only judges
+# answers that changed. Comparisons waiting at the same time are sent together
+# (up to JUDGE_BATCH_SIZE per request, with a structured verdict for each),
+# through one shared client and at most JUDGE_CONCURRENCY requests at once.
+# With EVAL_CASSETTE set, verdicts are recorded in (and replayed from) the
+# cassette instead of the cache file.
+
+# Bump when the prompt changes, so cached verdicts are not reused
+PROMPT_VERSION = 2
+
+SYSTEM_PROMPT = "You are an expert judge evaluating answers to real estate questions."
+
+BATCH_PROMPT = """
+You are an expert judge evaluating answers to real estate questions in Portuguese.
+
+For each comparison below, decide whether the actual answer is semantically
+equivalent to the expected answer. The answers don't need to be identical, but
+should convey the same key information: identify the key points of both and
+check that the actual answer provides the same essential information.
+
+Give one verdict per comparison id, with a brief explanation.
+
+{comparisons}
+"""
+
+VERDICT_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "verdicts",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "verdicts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "equivalent": {"type": "boolean"},
+                            "explanation": {"type": "string"},
+                        },
+                        "required": ["id", "equivalent", "explanation"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["verdicts"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+class LLMJudge:
+    def __init__(self, model="gpt-4o-mini", cache_path="evals/judge_verdicts.json", batch_size=5,
+                 max_concurrency=4, batch_wait_seconds=0.05, client_factory=None):
+        """
+        Batched, cached LLM judge of answer equivalence
+
+        Args:
+            model (str): Chat model used as the judge
+            cache_path (str): JSON file where verdicts are kept between runs (None to keep them in memory)
+            batch_size (int): Maximum comparisons per request
+            max_concurrency (int): Maximum requests in flight
+            batch_wait_seconds (float): How long a comparison waits for others to share its request
+            client_factory (callable): Returns the OpenAI client (defaults to openai.OpenAI)
+        """
+        self.model = model
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.batch_wait_seconds = batch_wait_seconds
+        self.client_factory = client_factory
+        self._client = None
+        self._lock = threading.Lock()
+        self._verdicts = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r') as f:
+                self._verdicts = json.load(f)
+
+        # Batching state, bound to the running event loop
+        self._loop = None
+        self._pending = []
+        self._flush_handle = None
+        self._semaphore = None
+
+        # Counters
+        self.lookups = 0
+        self.cache_hits = 0
+        self.judged = 0
+        self.requests = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a judge configured through the JUDGE_* environment variables"""
+        return cls(
+            model=os.environ.get("JUDGE_MODEL", "gpt-4o-mini"),
+            cache_path=os.environ.get("JUDGE_CACHE_PATH", "evals/judge_verdicts.json"),
+            batch_size=int(os.environ.get("JUDGE_BATCH_SIZE", 5)),
+            max_concurrency=int(os.environ.get("JUDGE_CONCURRENCY", 4)),
+        )
+
+    @property
+    def client(self):
+        """The OpenAI client shared by every request, created on first use"""
+        with self._lock:
+            if self._client is None:
+                if self.client_factory is None:
+                    from openai import OpenAI
+                    self.client_factory = OpenAI
+                self._client = self.client_factory()
+            return self._client
+
+    def _key(self, question, expected_answer, actual_answer):
+        payload = json.dumps([PROMPT_VERSION, self.model, question, expected_answer, actual_answer], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def _cached(self, key):
+        provider = get_cassette_provider()
+        if provider is not None:
+            if provider.mode == "record":
+                return None
+            verdict = provider.cassette.get(f"verdict:{key}")
+            if verdict is None and provider.mode == "replay":
+                raise CassetteMiss(f"No recorded verdict for comparison {key}")
+            return verdict
+        with self._lock:
+            return self._verdicts.get(key)
+
+    def _store(self, verdicts):
+        provider = get_cassette_provider()
+        if provider is not None:
+            for key, verdict in verdicts.items():
+                provider.cassette.put(f"verdict:{key}", "verdict", verdict)
+            return
+        with self._lock:
+            self._verdicts.update(verdicts)
+            if not self.cache_path:
+                return
+            temporary_path = f"{self.cache_path}.tmp"
+            with open(temporary_path, 'w') as f:
+                json.dump(self._verdicts, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.cache_path)
+
+    async def judge(self, question, expected_answer, actual_answer):
+        """
+        Judge whether actual_answer conveys the same key information as expected_answer
+
+        Returns:
+            tuple: (is_correct, explanation). If the judge can't be reached, falls
+                back to a substring check (not cached).
+        """
+        key = self._key(question, expected_answer, actual_answer)
+        with self._lock:
+            self.lookups += 1
+        verdict = self._cached(key)
+        if verdict is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return verdict["equivalent"], verdict["explanation"]
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new event loop (each asyncio.run): start from a fresh batching state
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        future = loop.create_future()
+        self._pending.append((key, question, expected_answer, actual_answer, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        """Send the pending comparisons as one request"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        if self._pending:
+            self._flush_handle = self._loop.call_later(self.batch_wait_seconds, self._flush)
+        if batch:
+            self._loop.create_task(self._judge_batch(batch))
+
+    async def _judge_batch(self, batch):
+        comparisons = "\n".join(
+            f"## Comparison {index}\nQuestion: {question}\nExpected Answer: {expected}\nActual Answer: {actual}\n"
+            for index, (_, question, expected, actual, _) in enumerate(batch)
+        )
+        try:
+            async with self._semaphore:
+                with self._lock:
+                    self.requests += 1
+                # The client is blocking: call it off the event loop
+                response = await asyncio.to_thread(
+                    self.client.chat.completions.create,
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": BATCH_PROMPT.format(comparisons=comparisons)},
+                    ],
+                    temperature=0.0,
+                    max_tokens=150 * len(batch),
+                    response_format=VERDICT_SCHEMA,
+                )
+            by_id = {verdict["id"]: verdict for verdict in json.loads(response.choices[0].message.content)["verdicts"]}
+        except Exception as e:
+            print(f"Error using LLM judge: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            by_id = {}
+
+        verdicts = {}
+        for index, (key, _, expected, actual, future) in enumerate(batch):
+            verdict = by_id.get(index)
+            if verdict is None:
+                # Fallback to simple substring check
+                result = (expected.lower() in actual.lower(), "Fallback to substring check due to LLM API error")
+            else:
+                verdicts[key] = {"equivalent": verdict["equivalent"], "explanation": verdict["explanation"]}
+                result = (verdict["equivalent"], verdict["explanation"])
+            if not future.done():
+                future.set_result(result)
+        with self._lock:
+            self.judged += len(verdicts)
+        if verdicts:
+            self._store(verdicts)
+
+    def stats(self):
+        """Return lookups, cache hits and requests made"""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "cache_hits": self.cache_hits,
+                "hit_rate": self.cache_hits / self.lookups if self.lookups else 0.0,
+                "judged": self.judged,
+                "requests": self.requests,
+                "avg_batch_size": self.judged / self.requests if self.requests else 0.0,
+                "errors": self.errors,
+                "cached_verdicts": len(self._verdicts),
+            }
+
+    def report(self):
+        """One line summary of the judge's work"""
+        stats = self.stats()
+        return (f"Judge: {stats['lookups']} comparisons, {stats['cache_hits']} from cache "
+                f"({100 * stats['hit_rate']:.0f}%), {stats['judged']} judged in {stats['requests']} requests, "
+                f"{stats['errors']} errors")
+
+# Judge shared by every case of a run
+_judge = None
+_judge_lock = threading.Lock()
+
+def get_judge():
+    """Return the process-wide judge, configured from the environment on first use"""
+    global _judge
+    with _judge_lock:
+        if _judge is None:
+            _judge = LLMJudge.from_env()
+        return _judge
+
+def get_judge_stats():
+    """Counters of the judge (empty until it is first used)"""
+    return _judge.stats() if _judge is not None else {}
@@ -0,0 +1,188 @@
+import json
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import RunConfig
+
+from evals.cassettes import eval_run_config, get_cassette_provider, save_cassette
+from evals.llm_judge import get_judge
+from evals.test_triage_agent import colored, DATASET_PATH as TRIAGE_DATASET, run_triage_case
+from evals.test_questions_agent import DATASET_PATH as QUESTIONS_DATASET, run_questions_case
+from evals.test_simulator_agent import DATASET_PATH as SIMULATOR_DATASET, run_simulator_case
+from evals.test_application_agent import DATASET_PATH as APPLICATION_DATASET, run_application_case
+
+# Run the four agent eval suites at once.
+#
+# Every test case (a multi-turn conversation counts as one case, its turns run
+# in order) is a task on one event loop; at most --concurrency of them wait on
+# the model at the same time, and each gets --timeout seconds. Pass/fail is
+# decided by the same checks as the evals/test_*_agent.py scripts. The report
+# compares the wall-clock time with the sum of the case times, which is what
+# running them one after the other would take (--compare runs them that way
+# too and measures it).
+#
+# AGENT_MODEL_PROVIDER=stub runs the suites against the offline stub model;
+# EVAL_CASSETTE replays (or records) the model's answers (see evals/cassettes.py).
+#
+# Usage: python evals/run_all.py [--concurrency 8] [--timeout 120] [--suites triage,questions,simulator,application] [--compare] [--json report.json]
+
+SUITES = {
+    "triage": (TRIAGE_DATASET, run_triage_case),
+    "questions": (QUESTIONS_DATASET, run_questions_case),
+    "simulator": (SIMULATOR_DATASET, run_simulator_case),
+    "application": (APPLICATION_DATASET, run_application_case),
+}
+
+def build_run_config():
+    """Run configuration of every case (the stub model when AGENT_MODEL_PROVIDER=stub, else eval_run_config())"""
+    if os.environ.get("AGENT_MODEL_PROVIDER") == "stub":
+        from utils.stub_model import StubModelProvider
+        provider = StubModelProvider(latency_seconds=float(os.environ.get("STUB_MODEL_LATENCY", 0.5)))
+        return RunConfig(workflow_name="test", model_provider=provider)
+    return eval_run_config()
+
+def load_cases(suites):
+    """(suite, test case, case function) for every case of the selected suites"""
+    cases = []
+    for suite in suites:
+        dataset_path, run_case = SUITES[suite]
+        with open(dataset_path, 'r') as f:
+            test_data = json.load(f)
+        cases.extend((suite, test_case, run_case) for test_case in test_data['test_cases'])
+    return cases
+
+async def run_case(semaphore, suite, test_case, case_function, run_config, timeout):
+    """Run one case under the semaphore; return its outcome"""
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(case_function(test_case, run_config), timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"Timed out after {timeout:.0f} s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        elapsed = time.perf_counter() - started
+
+    status = colored("✓", "green") if error is None else colored("✗", "red")
+    print(f"{status} [{suite}] {test_case['name']} ({elapsed:.1f} s)")
+    if error is not None:
+        print(colored(f"  Error: {error}", "red"))
+    return {"suite": suite, "name": test_case['name'], "passed": error is None, "error": error, "seconds": elapsed}
+
+async def run_cases(cases, concurrency, timeout):
+    """Run every case, at most concurrency at a time; return the outcomes and the wall-clock time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    run_config = build_run_config()
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*[
+        run_case(semaphore, suite, test_case, case_function, run_config, timeout)
+        for suite, test_case, case_function in cases
+    ])
+    return list(outcomes), time.perf_counter() - started
+
+async def run_passes(cases, concurrency, timeout, compare):
+    """
+    Run the cases concurrently, after a one-at-a-time pass when compare is set
+
+    Both passes share one event loop: the agents SDK keeps one HTTP client across
+    runs, and its connections can't outlive the loop that opened them.
+
+    Returns:
+        tuple: (outcomes, wall-clock time, one-at-a-time wall-clock time or None)
+    """
+    sequential_wall_clock = None
+    if compare:
+        print(colored(f"\n===== {len(cases)} CASES, ONE AT A TIME =====", "blue"))
+        _, sequential_wall_clock = await run_cases(cases, 1, timeout)
+
+    print(colored(f"\n===== {len(cases)} CASES, {concurrency} AT A TIME =====", "blue"))
+    outcomes, wall_clock = await run_cases(cases, concurrency, timeout)
+    return outcomes, wall_clock, sequential_wall_clock
+
+def summarize(outcomes, suites):
+    """Per-suite results, in the format the test_*_agent.py scripts return"""
+    summary = {}
+    for suite in suites:
+        results = [outcome for outcome in outcomes if outcome["suite"] == suite]
+        passed = sum(1 for outcome in results if outcome["passed"])
+        summary[suite] = {
+            "total": len(results),
+            "passed": passed,
+            "failed": len(results) - passed,
+            "percentage": 100 * passed / len(results) if results else 0,
+            "failed_tests": [{"name": o["name"], "error": o["error"]} for o in results if not o["passed"]],
+        }
+    return summary
+
+def print_report(summary, outcomes, wall_clock, concurrency, sequential_wall_clock=None):
+    print(colored("\n===== COMBINED EVAL REPORT =====", "blue"))
+    print(f"\n{'suite':<12} {'total':>6} {'passed':>7} {'failed':>7} {'pass %':>7}")
+    for suite, result in summary.items():
+        print(f"{suite:<12} {result['total']:>6} {result['passed']:>7} {result['failed']:>7} {result['percentage']:>6.1f}%")
+    total = sum(result["total"] for result in summary.values())
+    passed = sum(result["passed"] for result in summary.values())
+    print(f"{'all':<12} {total:>6} {passed:>7} {total - passed:>7} {100 * passed / total if total else 0:>6.1f}%")
+
+    failed = [outcome for outcome in outcomes if not outcome["passed"]]
+    if failed:
+        print(colored("\nFailed tests:", "red"))
+        for i, outcome in enumerate(failed, 1):
+            print(colored(f"  {i}. [{outcome['suite']}] {outcome['name']}: {outcome['error']}", "red"))
+
+    case_seconds = sum(outcome["seconds"] for outcome in outcomes)
+    print(f"\nWall clock: {wall_clock:.1f} s with {concurrency} concurrent cases")
+    print(f"Sum of case times: {case_seconds:.1f} s (speedup {case_seconds / wall_clock if wall_clock else 0:.1f}x)")
+    if sequential_wall_clock is not None:
+        print(f"Measured one at a time: {sequential_wall_clock:.1f} s "
+              f"(speedup {sequential_wall_clock / wall_clock if wall_clock else 0:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every agent eval suite concurrently")
+    parser.add_argument('--concurrency', type=int, default=8, help="Cases running at the same time")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds allowed per case")
+    parser.add_argument('--suites', default=",".join(SUITES), help="Comma-separated suites to run")
+    parser.add_argument('--compare', action='store_true', help="Also run the cases one at a time and measure the speedup")
+    parser.add_argument('--json', help="Write the combined report to this file")
+    args = parser.parse_args()
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = [suite for suite in suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+
+    cases = load_cases(suites)
+    outcomes, wall_clock, sequential_wall_clock = asyncio.run(
+        run_passes(cases, args.concurrency, args.timeout, args.compare))
+    summary = summarize(outcomes, suites)
+    print_report(summary, outcomes, wall_clock, args.concurrency, sequential_wall_clock)
+    if "questions" in suites:
+        print(get_judge().report())
+    provider = get_cassette_provider()
+    if provider is not None:
+        print(f"Cassette: {provider.stats()}")
+        save_cassette()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                "suites": summary,
+                "cases": outcomes,
+                "concurrency": args.concurrency,
+                "wall_clock_seconds": wall_clock,
+                "sequential_wall_clock_seconds": sequential_wall_clock,
+            }, f, ensure_ascii=False, indent=2)
+
+    return summary
+
+if __name__ == "__main__":
+    summary = main()
+
+    # Exit with appropriate code (0 for success, 1 for failure)
+    sys.exit(0 if all(result["failed"] == 0 for result in summary.values()) else 1)
@@ -1,6 +1,7 @@
 import json
 import sys
 import os
+import asyncio
 from termcolor import colored  # For colored terminal output
 
 # Add the parent directory to the Python path
@@ -8,10 +9,72 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ai_agents.application.application_agent import application_agent
 from agents import Runner, RunConfig
+from evals.cassettes import eval_run_config
 
-def test_application_agent():
+DATASET_PATH = 'evals/application_agent_test_dataset.json'
+
+async def run_application_case(test_case, run_config=None):
+    """
+    Run one application test case, raising an AssertionError if it fails
+    
+    Args:
+        test_case (dict): A case of the application dataset
+        run_config (RunConfig): Run configuration (defaults to eval_run_config())
+    """
+    run_config = run_config or eval_run_config()
+    if 'conversation' in test_case:
+        # Test multi-turn conversation
+        result = None
+        for i, message in enumerate(test_case['conversation']):
+            if message['role'] == 'user':
+                if result is None:
+                    result = await Runner.run(
+                        starting_agent=application_agent,
+                        run_config=run_config,
+                        input=message['content']
+                    )
+                else:
+                    new_input = result.to_input_list() + [{"role": "user", "content": message['content']}]
+                    # Continue with the agent that answered the previous turn
+                    result = await Runner.run(
+                        starting_agent=result.last_agent,
+                        run_config=run_config,
+                        input=new_input
+                    )
+
+                if i+1 < len(test_case['conversation']) and test_case['conversation'][i+1]['role'] == 'assistant':
+                    expected = test_case['conversation'][i+1]['content']
+                    # Flexible comparison since exact wording may vary
+                    assert any(keyword in result.final_output.lower() for keyword in expected.lower().split())
+    else:
+        # Test single input
+        result = await Runner.run(
+            starting_agent=application_agent,
+            run_config=run_config,
+            input=test_case['input']
+        )
+
+        # Check if agent asks for missing fields
+        if 'missing_fields' in test_case:
+            for field in test_case['missing_fields']:
+                field_keywords = {
+                    'full_name': ['nome', 'completo'],
+                    'cpf_number': ['cpf', 'documento'],
+                    'date_of_birth': ['nascimento', 'data'],
+                    'monthly_income': ['renda', 'salário', 'ganho'],
+                    'marital_status': ['civil', 'casado', 'solteiro'],
+                    'person_type': ['física', 'jurídica', 'pessoa'],
+                    'property_value': ['valor', 'imóvel', 'custa'],
+                    'state': ['estado', 'uf'],
+                    'city': ['cidade', 'município']
+                }
+
+                # Check if agent asks for this missing field
+                assert any(keyword in result.final_output.lower() for keyword in field_keywords[field])
+
+async def run_application_tests():
     # Load test cases
-    with open('evals/application_agent_test_dataset.json', 'r') as f:
+    with open(DATASET_PATH, 'r') as f:
         test_data = json.load(f)
     
     total_tests = len(test_data['test_cases'])
@@ -25,54 +88,7 @@ def test_application_agent():
         print(colored(f"\nRunning test: {test_name}", "cyan"))
         
         try:
-            if 'conversation' in test_case:
-                # Test multi-turn conversation
-                result = None
-                for i, message in enumerate(test_case['conversation']):
-                    if message['role'] == 'user':
-                        if result is None:
-                            result = Runner.run_sync(
-                                starting_agent=application_agent,
-                                run_config=RunConfig(workflow_name="test"),
-                                input=message['content']
-                            )
-                        else:
-                            new_input = result.to_input_list() + [{"role": "user", "content": message['content']}]
-                            result = Runner.run_sync(
-                                starting_agent=application_agent,
-                                run_config=RunConfig(workflow_name="test"),
-                                input=new_input
-                            )
-                        
-                        if i+1 < len(test_case['conversation']) and test_case['conversation'][i+1]['role'] == 'assistant':
-                            expected = test_case['conversation'][i+1]['content']
-                            # Flexible comparison since exact wording may vary
-                            assert any(keyword in result.final_output.lower() for keyword in expected.lower().split())
-            else:
-                # Test single input
-                result = Runner.run_sync(
-                    starting_agent=application_agent,
-                    run_config=RunConfig(workflow_name="test"),
-                    input=test_case['input']
-                )
-                
-                # Check if agent asks for missing fields
-                if 'missing_fields' in test_case:
-                    for field in test_case['missing_fields']:
-                        field_keywords = {
-                            'full_name': ['nome', 'completo'],
-                            'cpf_number': ['cpf', 'documento'],
-                            'date_of_birth': ['nascimento', 'data'],
-                            'monthly_income': ['renda', 'salário', 'ganho'],
-                            'marital_status': ['civil', 'casado', 'solteiro'],
-                            'person_type': ['física', 'jurídica', 'pessoa'],
-                            'property_value': ['valor', 'imóvel', 'custa'],
-                            'state': ['estado', 'uf'],
-                            'city': ['cidade', 'município']
-                        }
-                        
-                        # Check if agent asks for this missing field
-                        assert any(keyword in result.final_output.lower() for keyword in field_keywords[field])
+            await run_application_case(test_case)
             
             passed_tests += 1
             print(colored(f"✓ Test passed: {test_name}", "green"))
@@ -106,6 +122,11 @@ def test_application_agent():
         "failed_tests": failed_tests
     }
 
+def test_application_agent():
+    # One event loop for every case: the agents SDK shares one HTTP client
+    # across runs, and its connections can't outlive the loop that opened them
+    return asyncio.run(run_application_tests())
+
 if __name__ == "__main__":
     results = test_application_agent()
     
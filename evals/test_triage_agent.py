@@ -1,12 +1,14 @@
 import json
 import sys
 import os
+import asyncio
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ai_agents.triage.triage_agent import triage_agent
 from agents import Runner, RunConfig
+from evals.cassettes import eval_run_config
 
 # Simple colored output function
 def colored(text, color=None):
@@ -28,9 +30,40 @@ def colored(text, color=None):
         
     return f"{colors.get(color, '')}{text}{colors.get(None)}"
 
-def test_triage_agent():
+DATASET_PATH = 'evals/triage_agent_test_dataset.json'
+
+async def run_triage_case(test_case, run_config=None):
+    """
+    Run one triage test case, raising an AssertionError if it fails
+    
+    Args:
+        test_case (dict): A case of the triage dataset
+        run_config (RunConfig): Run configuration (defaults to eval_run_config())
+    """
+    # Test single input
+    result = await Runner.run(
+        starting_agent=triage_agent,
+        run_config=run_config or eval_run_config(),
+        input=test_case['input']
+    )
+    
+    # Check if agent is routing to the correct agent using last_agent property
+    if 'expected_agent' in test_case:
+        # Check the last_agent property
+        if hasattr(result, 'last_agent'):
+            last_agent_name = result.last_agent.name.lower()
+            
+            # Convert expected_agent from snake_case to space-separated format
+            expected_agent = test_case['expected_agent'].replace('_', ' ').lower()
+            
+            # Check if the expected agent name matches the last agent name
+            assert expected_agent in last_agent_name, f"Expected agent '{expected_agent}' but got '{last_agent_name}'"
+        else:
+            assert False, "Result does not have 'last_agent' property"
+
+async def run_triage_tests():
     # Load test cases
-    with open('evals/triage_agent_test_dataset.json', 'r') as f:
+    with open(DATASET_PATH, 'r') as f:
         test_data = json.load(f)
     
     total_tests = len(test_data['test_cases'])
@@ -44,26 +77,7 @@ def test_triage_agent():
         print(colored(f"\nRunning test: {test_name}", "cyan"))
         
         try:
-            # Test single input
-            result = Runner.run_sync(
-                starting_agent=triage_agent,
-                run_config=RunConfig(workflow_name="test"),
-                input=test_case['input']
-            )
-            
-            # Check if agent is routing to the correct agent using last_agent property
-            if 'expected_agent' in test_case:
-                # Check the last_agent property
-                if hasattr(result, 'last_agent'):
-                    last_agent_name = result.last_agent.name.lower()
-                    
-                    # Convert expected_agent from snake_case to space-separated format
-                    expected_agent = test_case['expected_agent'].replace('_', ' ').lower()
-                    
-                    # Check if the expected agent name matches the last agent name
-                    assert expected_agent in last_agent_name, f"Expected agent '{expected_agent}' but got '{last_agent_name}'"
-                else:
-                    assert False, "Result does not have 'last_agent' property"
+            await run_triage_case(test_case)
             
             passed_tests += 1
             print(colored(f"✓ Test passed: {test_name}", "green"))
@@ -97,6 +111,11 @@ def test_triage_agent():
         "failed_tests": failed_tests
     }
 
+def test_triage_agent():
+    # One event loop for every case: the agents SDK shares one HTTP client
+    # across runs, and its connections can't outlive the loop that opened them
+    return asyncio.run(run_triage_tests())
+
 if __name__ == "__main__":
     results = test_triage_agent()
     
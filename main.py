@@ -1,4 +1,4 @@
-from flask import Flask, request, Response
+from flask import Flask, request, Response, g
 from twilio.rest import Client
 from twilio.twiml.messaging_response import MessagingResponse
 import os
@@ -9,6 +9,7 @@ import os
 from pathlib import Path
 import json
 import asyncio 
+import time
 from datetime import datetime
 import sys
 import uuid
@@ -19,10 +20,30 @@ from ai_agents.simulator.simulator_agent import simulator_agent
 from ai_agents.application.application_agent import application_agent
 from ai_agents.questions.questions_agent import questions_agent
 from ai_agents.triage.triage_agent import triage_agent
+from ai_agents.triage.intent_router import IntentRouter
+from ai_agents.questions.answer_cache import AnswerCache
+from ai_agents.questions.semantic_cache import SemanticCache
+from ai_agents.simulator.simulation_pdf import get_pdf_cache_stats
+from ai_agents.application.field_extractor import ApplicationSlots, last_reply
+from utils.locations import get_location_index_stats
+from utils.application_store import get_application_store_stats
 
 # Add these imports at the top of your file
 from utils.ping_service import init_ping_service
+from utils.session_store import Session, SessionStore
+from utils.reply_worker import ReplyWorkerPool
+from utils.event_loop import get_event_loop
+from utils.twilio_client import get_whatsapp_sender, get_sender_stats
+from utils.history_compaction import HistoryCompactor
 from routes.health import health_bp
+from routes.stats import stats_bp, register_stats_source
+from routes.simulations import simulations_bp
+from routes.metrics import metrics_bp
+from utils.metrics import get_metrics, AgentMetricsHooks
+from ai_agents.streaming import run_streamed_turn
+from utils.message_chunker import MessageChunker, split_message
+from utils.message_dedup import MessageDeduplicator
+from utils.message_coalescer import MessageCoalescer
 
 def create_app():
     app = Flask(__name__)
@@ -30,6 +51,15 @@ def create_app():
     # Register the health check blueprint
     app.register_blueprint(health_bp)
     
+    # Register the Prometheus metrics blueprint
+    app.register_blueprint(metrics_bp)
+    
+    # Register the runtime counters blueprint
+    app.register_blueprint(stats_bp)
+    
+    # Register the batch simulation API
+    app.register_blueprint(simulations_bp)
+    
     return app
 
 # Create the app
@@ -38,6 +68,30 @@ app = create_app()
 # Load environment variables from .env file
 load_dotenv()
 
+# Where the time of each message goes (session lookup, routing, each agent,
+# tools, rendering...), as histograms exposed on /metrics
+metrics = get_metrics()
+stage_seconds = metrics.histogram(
+    "whatsapp_stage_seconds", "Time spent in each stage of handling a WhatsApp message", ("stage",))
+request_seconds = metrics.histogram(
+    "whatsapp_http_request_seconds", "Duration of HTTP requests, per endpoint", ("endpoint",))
+webhook_deliveries = metrics.counter(
+    "whatsapp_webhook_deliveries_total", "Webhook deliveries, new messages or Twilio retries", ("delivery",))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request_time(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint is not None:
+        request_seconds.observe(time.perf_counter() - started, request.endpoint)
+    return response
+
+# One long-lived event loop per worker process runs every agent turn
+agent_loop = get_event_loop()
+
 # Initialize the ping service directly
 # This will run when the module is loaded by Gunicorn
 try:
@@ -46,12 +100,105 @@ try:
 except Exception as e:
     print(f"Error initializing ping service: {str(e)}")
 
-# Initialize result as a global variable
-result = None
+# Conversations are kept per sender (Twilio "From" number), bounded in count,
+# memory and idle time so each worker's footprint stays flat under load
+session_store = SessionStore.from_env()
+register_stats_source("sessions", session_store.stats)
+
+# Twilio retries a slow webhook with the same MessageSid; retries attach to the
+# run already in progress instead of starting another one
+message_deduplicator = MessageDeduplicator.from_env()
+register_stats_source("message_dedup", message_deduplicator.stats)
+
+# Messages a sender sends in a row ("oi", "quero simular", "imóvel de 500 mil
+# em SP") are merged into one agent turn, and a sender's turns never overlap.
+# Opt-in: every turn then starts MESSAGE_DEBOUNCE_SECONDS late, even a lone message
+MESSAGE_COALESCING = os.environ.get("MESSAGE_COALESCING", "false").lower() == "true"
+message_coalescer = MessageCoalescer.from_env()
+register_stats_source("message_coalescing", message_coalescer.stats)
+
+# Messages with an obvious intent go straight to the specialist agent,
+# skipping the LLM triage hop
+intent_router = IntentRouter.from_triage_agent(triage_agent)
+register_stats_source("intent_router", intent_router.stats)
+
+# Answers to FAQ-style first messages are reused across conversations
+answer_cache = AnswerCache.from_env()
+register_stats_source("answer_cache", answer_cache.stats)
+
+# Paraphrases of questions already answered are served from a similarity index.
+# Off by default: its vectors are lexical, so it trades recall for precision
+# and is only turned on where a wrong cached answer is acceptable to risk
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+semantic_cache = SemanticCache.from_env()
+register_stats_source("semantic_cache", semantic_cache.stats)
+
+# Follow-up turns start at the agent that answered the previous one instead of
+# going through triage again, unless the user changes topic
+STICKY_AGENTS = os.environ.get("STICKY_AGENTS", "true").lower() != "false"
+
+# Application fields (CPF, dates, amounts, UF...) are extracted from each message
+# and validated locally, so application_agent only asks for what is still missing
+APPLICATION_FIELD_EXTRACTION = os.environ.get("APPLICATION_FIELD_EXTRACTION", "true").lower() != "false"
+
+# Old turns are condensed or dropped so each prompt stays under a token budget
+history_compactor = HistoryCompactor.from_env()
+register_stats_source("history_compaction", history_compactor.stats)
+
+# In "async" webhook mode Twilio gets an empty TwiML response right away and the
+# agent run happens on a bounded worker pool, which sends the reply with
+# send_whatsapp_message. The default "sync" mode replies inside the TwiML response.
+WEBHOOK_MODE = os.environ.get("WEBHOOK_MODE", "sync").lower()
+
+reply_workers = None
+if WEBHOOK_MODE == "async":
+    reply_workers = ReplyWorkerPool(
+        num_workers=int(os.environ.get("REPLY_WORKERS", 4)),
+        max_queue_size=int(os.environ.get("REPLY_QUEUE_SIZE", 100)),
+    )
+    reply_workers.start()
+    register_stats_source("reply_workers", reply_workers.stats)
+
+# "progressive" sends long replies as several messages while the agents are
+# still writing; "single" sends the whole reply at the end of the run
+REPLY_DELIVERY = os.environ.get("REPLY_DELIVERY", "single").lower()
+
+# Outbound message counters (the client itself is created on first send)
+register_stats_source("twilio", get_sender_stats)
+
+# Simulation PDF rendering time, cache hit ratio and disk usage
+register_stats_source("simulation_pdfs", get_pdf_cache_stats)
+
+# How the locations given to the tools were matched to IBGE municipalities
+register_stats_source("locations", get_location_index_stats)
+
+# Applications written to the local database, batches and duplicates
+register_stats_source("applications", get_application_store_stats)
 
 # Store the API key to ensure it's available throughout the session
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+# Model provider: None uses the default OpenAI provider; "stub" swaps in an
+# offline stand-in so load tests and benchmarks don't hit the network
+model_provider = None
+if os.environ.get("AGENT_MODEL_PROVIDER") == "stub":
+    from utils.stub_model import StubModelProvider
+    model_provider = StubModelProvider(latency_seconds=float(os.environ.get("STUB_MODEL_LATENCY", 0.5)))
+elif os.environ.get("AGENT_MODEL_PROVIDER") == "cassette":
+    # Recorded answers (see utils/cassette_model.py), replayed with no network
+    from utils.cassette_model import CassetteModelProvider
+    model_provider = CassetteModelProvider(os.environ["MODEL_CASSETTE_PATH"], mode=os.environ.get("MODEL_CASSETTE_MODE", "replay"))
+    register_stats_source("model_cassette", model_provider.stats)
+
+# Maximum time a request thread waits for an agent run (unset waits forever)
+AGENT_RUN_TIMEOUT = float(os.environ["AGENT_RUN_TIMEOUT"]) if os.environ.get("AGENT_RUN_TIMEOUT") else None
+
+def build_run_config():
+    """Run configuration shared by every conversation turn"""
+    if model_provider is not None:
+        return RunConfig(workflow_name="loft-whatsapp-chatbot", model_provider=model_provider)
+    return RunConfig(workflow_name="loft-whatsapp-chatbot")
+
 def send_whatsapp_message(to_number, message_body):
     """
     Send a WhatsApp message using Twilio.
@@ -63,22 +210,259 @@ def send_whatsapp_message(to_number, message_body):
     Returns:
         str: The SID of the sent message if successful
     """
-    # Get Twilio credentials from environment variables
-    account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-    auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-    from_number = os.environ.get('TWILIO_WHATSAPP_NUMBER')  # Your Twilio WhatsApp number
+    # The Twilio client is created once per process and reuses its connections
+    with stage_seconds.time("twilio_send"):
+        return get_whatsapp_sender().send(to_number, message_body)
+
+def send_whatsapp_messages(messages):
+    """
+    Send several WhatsApp messages at once, within Twilio's per-number rate limit.
     
-    # Initialize Twilio client
-    client = Client(account_sid, auth_token)
+    Args:
+        messages (list): (to_number, message_body) pairs
+        
+    Returns:
+        list: For each message, its SID or the exception raised while sending it
+    """
+    return get_whatsapp_sender().send_many(messages)
+
+async def run_conversation_turn_async(sender, incoming_msg, on_text=None):
+    """
+    Run the agents on a new message from sender and update the sender's session.
     
-    # Send the message
-    message = client.messages.create(
-        body=message_body,
-        from_=f'whatsapp:{from_number}',
-        to=f'whatsapp:{to_number}'
-    )
+    Args:
+        sender (str): The sender's address as sent by Twilio (e.g., whatsapp:+5511999999999)
+        incoming_msg (str): The message text
+        on_text (callable): Called with the reply's text as it is generated (on the event loop)
+        
+    Returns:
+        str: The agent's reply
+    """
+    # Look up this sender's conversation (a new one gets its own thread ID)
+    with stage_seconds.time("session_lookup"):
+        session = session_store.get(sender)
+    if session is None:
+        session = Session()
+    
+    # Keep the application fields found so far up to date; the slots are the
+    # run context, which application_agent's instructions read
+    slots = None
+    if APPLICATION_FIELD_EXTRACTION:
+        if session.application_slots is None:
+            session.application_slots = ApplicationSlots()
+        slots = session.application_slots
+        with stage_seconds.time("application_fields"):
+            filled = slots.update(incoming_msg, last_reply=last_reply(session.history))
+        if filled:
+            print(f"Application fields from {sender}: {', '.join(filled)} ({len(slots.missing())} missing)")
+    
+    # A first message that questions_agent already answered needs no agent run
+    if not session.history:
+        with stage_seconds.time("answer_cache"):
+            cached_answer = answer_cache.get(incoming_msg, questions_agent)
+            if cached_answer is None and SEMANTIC_CACHE_ENABLED:
+                cached_answer = semantic_cache.get(incoming_msg, questions_agent)
+        if cached_answer is not None:
+            print(f"Answer cache hit for {sender}")
+            session.history = [
+                {"role": "user", "content": incoming_msg},
+                {"role": "assistant", "content": cached_answer},
+            ]
+            session.last_agent = questions_agent.name
+            session_store.save(sender, session)
+            if on_text is not None:
+                on_text(cached_answer)
+            return cached_answer
+    
+    # A conversation's first message starts at the specialist agent when the
+    # local router is confident; follow-ups stay with the last active agent
+    with stage_seconds.time("routing"):
+        if not session.history:
+            decision = intent_router.route(incoming_msg)
+            starting_agent = decision.agent or triage_agent
+            print(f"Intent router for {sender}: {decision}")
+        elif STICKY_AGENTS:
+            starting_agent = intent_router.continue_conversation(incoming_msg, session.last_agent)
+        else:
+            starting_agent = triage_agent
+    
+    # Use trace to maintain conversation context
+    with trace(workflow_name="loft-whatsapp-chatbot", group_id=session.thread_id):
+        if not session.history:
+            # First turn
+            turn_input = incoming_msg
+        else:
+            # Subsequent turns - use this sender's history to maintain context,
+            # compacted to the token budget
+            with stage_seconds.time("history_compaction"):
+                history, report = history_compactor.compact(session.history)
+            if report.tokens_saved > 0:
+                print(f"History of {sender} compacted: {report}")
+            turn_input = history + [{"role": "user", "content": incoming_msg}]
+        
+        # Streamed, so the time to the first token is measured; the hooks time
+        # each agent (triage included), model call, tool call and handoff
+        with stage_seconds.time("agent_run"):
+            result, timings = await run_streamed_turn(
+                starting_agent,
+                turn_input,
+                run_config=build_run_config(),
+                context=slots,
+                on_text=on_text,
+                hooks=AgentMetricsHooks(metrics) if metrics.enabled else None,
+            )
+    
+    handoffs = sum(1 for item in result.new_items if item.type == "handoff_output_item")
+    first_token = f"first token {1000 * timings.time_to_first_token:.0f} ms, " if timings.first_token is not None else ""
+    print(f"Turn for {sender}: {starting_agent.name} -> {result.last_agent.name}, "
+          f"{handoffs} handoffs, {first_token}{1000 * timings.total_time:.0f} ms")
+    
+    # Single-turn, context-free questions answered by questions_agent are cached
+    if not session.history and result.last_agent is questions_agent:
+        answer_cache.set(incoming_msg, questions_agent, result.final_output)
+        if SEMANTIC_CACHE_ENABLED:
+            semantic_cache.set(incoming_msg, questions_agent, result.final_output)
+    
+    # A submitted application starts the next one from scratch
+    if any(item.type == "tool_call_item" and getattr(item.raw_item, "name", None) == "apply_for_real_estate_financing"
+           for item in result.new_items):
+        session.application_slots = None
     
-    return message.sid
+    # Keep only the serialized history and the active agent, not the whole run result
+    session.history = result.to_input_list()
+    session.last_agent = result.last_agent.name
+    with stage_seconds.time("session_save"):
+        session_store.save(sender, session)
+    
+    return result.final_output
+
+def run_conversation_turn(sender, incoming_msg, on_text=None):
+    """
+    Blocking wrapper around run_conversation_turn_async for request and worker threads.
+    
+    The run happens on the worker's long-lived event loop, so concurrent
+    conversations share it instead of each creating its own loop.
+    """
+    return agent_loop.run(run_conversation_turn_async(sender, incoming_msg, on_text), timeout=AGENT_RUN_TIMEOUT)
+
+# Sent when a progressive reply breaks off: the message is not processed again
+# on Twilio's retry, since that would send its first chunks a second time
+PARTIAL_REPLY_NOTICE = "Desculpe, não consegui terminar esta resposta. Pode enviar sua mensagem de novo?"
+
+class ReplyPartlySent(RuntimeError):
+    """Raised when a progressive reply fails after some of its chunks were sent"""
+
+def deliver_progressively(sender, incoming_msg):
+    """
+    Run a conversation turn, sending each paragraph or sentence group of the reply as soon as it is written.
+    
+    Chunks stay under WhatsApp's length limit and go out in order through
+    the shared sender, while the agents keep generating the rest.
+    
+    Args:
+        sender (str): The sender's address as sent by Twilio (e.g., whatsapp:+5511999999999)
+        incoming_msg (str): The message text
+        
+    Returns:
+        str: The agent's full reply
+        
+    Raises:
+        ReplyPartlySent: If the run failed after part of the reply was sent (the user is told
+            it broke off)
+    """
+    to_number = sender.replace('whatsapp:', '', 1)
+    whatsapp_sender = get_whatsapp_sender()
+    chunker = MessageChunker()
+    started = time.perf_counter()
+    first_chunk_at = []
+    
+    def on_text(delta):
+        for chunk in chunker.feed(delta):
+            if not first_chunk_at:
+                first_chunk_at.append(time.perf_counter())
+            whatsapp_sender.send_in_order(to_number, chunk)
+    
+    try:
+        reply = run_conversation_turn(sender, incoming_msg, on_text=on_text)
+    except Exception as e:
+        if not first_chunk_at:
+            raise
+        whatsapp_sender.send_in_order(to_number, PARTIAL_REPLY_NOTICE)
+        raise ReplyPartlySent(f"The reply to {sender} failed after part of it was sent") from e
+    
+    # Whatever is left once the run is over
+    for chunk in chunker.flush():
+        if not first_chunk_at:
+            first_chunk_at.append(time.perf_counter())
+        whatsapp_sender.send_in_order(to_number, chunk)
+    
+    if first_chunk_at:
+        print(f"First reply chunk for {sender} queued after {1000 * (first_chunk_at[0] - started):.0f} ms")
+    return reply
+
+def processed_once(message, job, *args):
+    """
+    Run job for a claimed webhook delivery and record its outcome for the retries.
+    
+    Args:
+        message (InboundMessage): The delivery returned by message_deduplicator.claim
+        job (callable): Function processing the message
+        *args: Arguments passed to the function
+        
+    Returns:
+        The job's return value
+    """
+    try:
+        reply = job(*args)
+    except Exception as e:
+        # Merged messages fail with their turn's error as the cause
+        if isinstance(e, ReplyPartlySent) or isinstance(e.__cause__, ReplyPartlySent):
+            # Part of the reply reached the user: a retry would send it again
+            message_deduplicator.complete(message, None)
+        else:
+            # Forgotten, so Twilio's next retry gets a fresh run
+            message_deduplicator.fail(message)
+        raise
+    message_deduplicator.complete(message, reply)
+    return reply
+
+def run_coalesced(job, sender, incoming_msg):
+    """
+    Run job for this message merged with the other messages sender sends close together.
+    
+    Args:
+        job (callable): Called as job(sender, text) with the merged messages
+        sender (str): The sender's address as sent by Twilio (e.g., whatsapp:+5511999999999)
+        incoming_msg (str): The message text
+        
+    Returns:
+        The job's return value, or None if the message was merged into a turn run by another request
+        (returned once that turn succeeded; if it failed, this raises too, with the turn's
+        error as the cause, so the message's SID is handled like the leader's)
+    """
+    if not MESSAGE_COALESCING:
+        return job(sender, incoming_msg)
+    ran, result = message_coalescer.submit(sender, incoming_msg, lambda text: job(sender, text))
+    if not ran:
+        print(f"Message from {sender} merged into the next turn")
+    return result
+
+def reply_in_background(sender, incoming_msg):
+    """
+    Run a conversation turn and send the reply as outbound WhatsApp messages.
+    
+    Args:
+        sender (str): The sender's address as sent by Twilio (e.g., whatsapp:+5511999999999)
+        incoming_msg (str): The message text
+    """
+    if REPLY_DELIVERY == "progressive":
+        deliver_progressively(sender, incoming_msg)
+        return
+    
+    reply = run_conversation_turn(sender, incoming_msg)
+    # Long replies are split to fit WhatsApp's length limit, and sent one after the other
+    for chunk in split_message(reply):
+        send_whatsapp_message(sender.replace('whatsapp:', '', 1), chunk)
 
 @app.route('/receive_whatsapp', methods=['POST'])
 def receive_whatsapp_message():
@@ -90,43 +474,49 @@ def receive_whatsapp_message():
     Returns:
         Response: A TwiML response that can include a reply message
     """
-    global result  # Declare that we're using the global result variable
-    
-    # Generate a unique thread ID for this conversation
-    thread_id = str(uuid.uuid4())
-
     # Get the incoming message details
     incoming_msg = request.values.get('Body', '').strip()
     sender = request.values.get('From', '')
+    message_sid = request.values.get('MessageSid', '')
     
     # Create a response
     resp = MessagingResponse()
     
-    # Create a new event loop for this thread
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    message, is_new = message_deduplicator.claim(message_sid)
+    webhook_deliveries.inc("new" if is_new else "duplicate")
+    if not is_new:
+        print(f"Duplicate delivery of {message_sid} from {sender}, not running the agents again")
+        if reply_workers is None and REPLY_DELIVERY != "progressive":
+            # The reply goes in the TwiML response: give the retry the original run's reply
+            reply = message_deduplicator.wait(message)
+            if reply:
+                for chunk in split_message(reply):
+                    resp.message(chunk)
+        # Otherwise the reply is sent as outbound messages by the original run
+        return Response(str(resp), mimetype='text/xml')
     
-    # Use trace to maintain conversation context
-    with trace(workflow_name="loft-whatsapp-chatbot", group_id=thread_id):
-        if result is None:
-            # First turn
-            result = Runner.run_sync(
-                starting_agent=triage_agent,
-                run_config=RunConfig(workflow_name="loft-whatsapp-chatbot"),
-                input=incoming_msg,
-            )
-        else:
-            # Subsequent turns - use previous result to maintain context
-            new_input = result.to_input_list() + [{"role": "user", "content": incoming_msg}]
-            result = Runner.run_sync(
-                starting_agent=triage_agent,
-                run_config=RunConfig(workflow_name="loft-whatsapp-chatbot"),
-                input=new_input,
-            )
-
-    resp.message(result.final_output)
+    if reply_workers is not None:
+        # Acknowledge at once and let a worker send the reply
+        if reply_workers.submit(processed_once, message, run_coalesced, reply_in_background, sender, incoming_msg):
+            return Response(str(resp), mimetype='text/xml')
+        # The queue is full: answer inline rather than dropping the message
+        print(f"Reply queue full, answering {sender} inline")
+    
+    if REPLY_DELIVERY == "progressive":
+        # The reply goes out as outbound messages while it is written
+        processed_once(message, run_coalesced, deliver_progressively, sender, incoming_msg)
+        return Response(str(resp), mimetype='text/xml')
+    
+    # Long replies are split into several messages to fit WhatsApp's length limit.
+    # A message merged into another request's turn is answered by that request.
+    reply = processed_once(message, run_coalesced, run_conversation_turn, sender, incoming_msg)
+    with stage_seconds.time("render"):
+        if reply is not None:
+            for chunk in split_message(reply):
+                resp.message(chunk)
+        body = str(resp)
     
-    return Response(str(resp), mimetype='text/xml')
+    return Response(body, mimetype='text/xml')
 
 # Run the app if this file is executed directly
 if __name__ == '__main__':
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+
+from utils.metrics import get_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and counters of this worker, in the Prometheus text format"""
+    return Response(get_metrics().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,106 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import io
+import os
+import json
+
+import numpy as np
+
+from ai_agents.simulator.amortization import DEFAULT_ANNUAL_RATE, SYSTEMS
+from ai_agents.simulator.batch import (
+    MAX_GRID_SCENARIOS, grid_axes, grid_size, simulate_grid, iter_grid_chunks, parse_axis,
+)
+
+simulations_bp = Blueprint('simulations', __name__)
+
+# Largest grid accepted, and largest one returned in a single (non-streamed) body
+MAX_SCENARIOS = int(os.environ.get("BATCH_MAX_SCENARIOS", MAX_GRID_SCENARIOS))
+MAX_INLINE_SCENARIOS = int(os.environ.get("BATCH_MAX_INLINE_SCENARIOS", 100000))
+
+# Property values per streamed chunk
+STREAM_CHUNK_SIZE = 200
+
+def parse_grid_request(body):
+    """
+    Grid arguments of simulate_grid from a request body
+
+    Rates are given either as "annual_rates" or as "rate_spreads" over
+    "base_rate" (the reference rate for individuals by default).
+    """
+    if "property_values" not in body:
+        raise ValueError("property_values is required")
+    if "annual_rates" in body:
+        annual_rates = parse_axis(body["annual_rates"], MAX_SCENARIOS)
+    else:
+        base_rate = float(body.get("base_rate", DEFAULT_ANNUAL_RATE["fisica"]))
+        annual_rates = base_rate + parse_axis(body.get("rate_spreads", [0.0]), MAX_SCENARIOS)
+    return {
+        "property_values": parse_axis(body["property_values"], MAX_SCENARIOS),
+        "down_payment_ratios": parse_axis(body.get("down_payment_ratios", [0.2]), MAX_SCENARIOS),
+        "months": parse_axis(body.get("months", [360]), MAX_SCENARIOS),
+        "annual_rates": annual_rates,
+        "systems": parse_systems(body.get("systems", list(SYSTEMS))),
+        "upfront_fees": float(body.get("upfront_fees", 0.0)),
+    }
+
+def parse_systems(systems):
+    """Amortization systems of a request: a non-empty list of "SAC" and/or "PRICE" """
+    if not isinstance(systems, list) or not systems:
+        raise ValueError(f"systems must be a non-empty list of {', '.join(SYSTEMS)}")
+    parsed = []
+    for system in systems:
+        if not isinstance(system, str) or system.upper() not in SYSTEMS:
+            raise ValueError(f"unknown system {system!r}, choose from {', '.join(SYSTEMS)}")
+        if system.upper() not in parsed:
+            parsed.append(system.upper())
+    return tuple(parsed)
+
+@simulations_bp.route('/simulations/batch', methods=['POST'])
+def batch_simulation():
+    """
+    Simulate every combination of property values, down payments, terms and rates
+
+    The body holds the axes (lists or {"start", "stop", "step"|"num"} ranges) and
+    a "format": "json" (columnar), "npz" (NumPy arrays) or "ndjson" (streamed
+    in chunks of property values, for grids too large for a single body).
+    """
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({'error': "the body must be a JSON object"}), 400
+    output_format = body.get("format", "json")
+    try:
+        grid_args = parse_grid_request(body)
+        axes = grid_axes(grid_args["property_values"], grid_args["down_payment_ratios"],
+                         grid_args["months"], grid_args["annual_rates"], grid_args["systems"])
+        size = grid_size(axes)
+        if size > MAX_SCENARIOS:
+            raise ValueError(f"grid has {size} scenarios, the limit is {MAX_SCENARIOS}")
+        if output_format not in ("json", "npz", "ndjson"):
+            raise ValueError("format must be json, npz or ndjson")
+        if output_format != "ndjson" and size > MAX_INLINE_SCENARIOS:
+            raise ValueError(f"grid has {size} scenarios, use format=ndjson above {MAX_INLINE_SCENARIOS}")
+        if output_format != "ndjson":
+            grid = simulate_grid(**grid_args, max_scenarios=MAX_SCENARIOS)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    if output_format == "json":
+        return jsonify(grid.to_columns())
+
+    if output_format == "npz":
+        # One structured array per system, plus the axes
+        buffer = io.BytesIO()
+        arrays = {f"axis_{name}": values for name, values in grid.axes.items()}
+        arrays.update(grid.results)
+        np.savez(buffer, **arrays)
+        return Response(buffer.getvalue(), mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename=simulations.npz'})
+
+    def generate():
+        # A header line with the whole grid, then one line per chunk of property values
+        header = {name: values.tolist() for name, values in axes.items()}
+        yield json.dumps({"axes": header, "scenarios": size, "chunk_axis": "property_value"}) + "\n"
+        property_values = grid_args.pop("property_values")
+        for chunk in iter_grid_chunks(property_values, chunk_size=STREAM_CHUNK_SIZE, **grid_args):
+            yield json.dumps(chunk.to_columns()) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
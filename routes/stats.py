@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify
+import datetime
+
+stats_bp = Blueprint('stats', __name__)
+
+# name -> callable returning a dict of counters
+_stats_sources = {}
+
+def register_stats_source(name, source):
+    """
+    Register a component whose counters should be exposed on /stats
+
+    Args:
+        name (str): Key under which the counters are reported
+        source (callable): Function returning a JSON-serializable dict
+    """
+    _stats_sources[name] = source
+
+def collect_stats():
+    """Return the current counters of every registered component"""
+    return {name: source() for name, source in _stats_sources.items()}
+
+@stats_bp.route('/stats', methods=['GET'])
+def stats():
+    """Runtime counters of the in-process components (caches, queues, ...)"""
+    return jsonify({
+        'timestamp': datetime.datetime.now().isoformat(),
+        'stats': collect_stats()
+    })
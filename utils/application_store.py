@@ -0,0 +1,457 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+from utils.text import fold_text
+
+logger = logging.getLogger("application_store")
+
+# Crockford base32: no I, L, O or U, so codes read back over the phone are unambiguous
+CODE_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CODE_PREFIX = "FIN-"
+# Sequence numbers are 40 bits (8 base32 characters), scrambled by an odd
+# multiplier so consecutive applications don't get consecutive codes
+CODE_BITS = 40
+CODE_MULTIPLIER = 0x9E3779B97F & ((1 << CODE_BITS) - 1) | 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    confirmation_code TEXT PRIMARY KEY,
+    cpf TEXT NOT NULL,
+    property_key TEXT NOT NULL,
+    full_name TEXT,
+    date_of_birth TEXT,
+    monthly_income REAL,
+    marital_status TEXT,
+    person_type TEXT,
+    property_value REAL,
+    state TEXT,
+    city TEXT,
+    submission_date TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (cpf, property_key)
+);
+CREATE TABLE IF NOT EXISTS application_aliases (
+    confirmation_code TEXT PRIMARY KEY,
+    original_code TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS code_sequence (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    next_value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO code_sequence (id, next_value) VALUES (1, 1);
+"""
+
+# Queued by submit() to wake the writer when every reserved code is used
+RESERVE_CODES = object()
+
+COLUMNS = [
+    "confirmation_code", "cpf", "property_key", "full_name", "date_of_birth", "monthly_income",
+    "marital_status", "person_type", "property_value", "state", "city", "submission_date", "created_at",
+]
+
+def check_character(body):
+    """Check character of a code body (weighted sum mod 32), to reject mistyped codes without a lookup"""
+    return CODE_ALPHABET[sum((i + 1) * CODE_ALPHABET.index(char) for i, char in enumerate(body)) % 32]
+
+def encode_code(sequence_number):
+    """
+    Confirmation code of a sequence number: FIN- + 8 base32 characters + 1 check character
+
+    The scrambling is a bijection on 40 bits, so distinct numbers give distinct codes.
+    """
+    value = (sequence_number * CODE_MULTIPLIER) & ((1 << CODE_BITS) - 1)
+    body = "".join(CODE_ALPHABET[(value >> shift) & 31] for shift in range(CODE_BITS - 5, -1, -5))
+    return CODE_PREFIX + body + check_character(body)
+
+def is_valid_code(code):
+    """Whether code has the confirmation code format and a correct check character"""
+    code = (code or "").strip().upper()
+    body = code[len(CODE_PREFIX):-1]
+    return (code.startswith(CODE_PREFIX) and len(body) == CODE_BITS // 5
+            and all(char in CODE_ALPHABET for char in body) and code[-1] == check_character(body))
+
+def cpf_digits(cpf):
+    return "".join(char for char in str(cpf) if char.isdigit())
+
+def property_key(state, city, property_value):
+    """Identity of the financed property: folded location and value in cents"""
+    return f"{fold_text(state or '').upper()}|{fold_text(city or '')}|{round(float(property_value or 0) * 100)}"
+
+class ApplicationStore:
+    def __init__(self, path="data/applications.db", batch_size=500, flush_interval=0.05,
+                 max_queue_size=100000, code_block_size=1000):
+        """
+        Durable store of financing applications in SQLite (WAL mode)
+
+        submit() never touches the disk: the application gets its confirmation
+        code right away and is queued for a background writer, which inserts
+        whatever accumulated in one transaction per batch. Lookups go through
+        per-thread read connections, which WAL mode never makes wait for the writer. Applications are
+        unique per CPF and property, so a retried submission returns the code
+        of the first one, found in an in-memory index of the stored and pending
+        applications (loaded at startup); when another process stored the same
+        application first, the writer makes the new code an alias of its code.
+        Codes come from a sequence kept in the database and reserved in blocks
+        by the writer ahead of time, so they are unique across processes
+        sharing the file.
+
+        Args:
+            path (str): SQLite database file
+            batch_size (int): Maximum applications per transaction
+            flush_interval (float): Seconds the writer waits for a batch to fill up
+            max_queue_size (int): Applications waiting for the writer before submit() blocks
+            code_block_size (int): Sequence numbers reserved per database round trip
+        """
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.code_block_size = code_block_size
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        # (cpf, property key) -> code of the stored application, for idempotent submits
+        self._index = {
+            (cpf, key): code
+            for cpf, key, code in connection.execute("SELECT cpf, property_key, confirmation_code FROM applications")
+        }
+        connection.close()
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        # Notified by the writer when it reserved a block of codes
+        self._codes_ready = threading.Condition(self._lock)
+        self._codes_requested = False
+        self._local = threading.local()
+        # Applications accepted but not written yet, by code and by (cpf, property key)
+        self._pending = {}
+        self._pending_keys = {}
+        # Reserved sequence numbers [next, end), and the block to use after them
+        self._next_sequence, self._sequence_end = self._reserve_block()
+        self._spare_block = None
+
+        # Counters
+        self.submitted = 0
+        self.duplicates = 0
+        self.written = 0
+        self.aliased = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.code_waits = 0
+        self._write_seconds = 0.0
+
+        self._writer = threading.Thread(target=self._write_loop, name="application-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls):
+        """Create a store configured through the APPLICATION_STORE_* environment variables"""
+        store = cls(
+            path=os.environ.get("APPLICATION_STORE_PATH", "data/applications.db"),
+            batch_size=int(os.environ.get("APPLICATION_STORE_BATCH_SIZE", 500)),
+            flush_interval=float(os.environ.get("APPLICATION_STORE_FLUSH_MS", 50)) / 1000,
+        )
+        # Applications still queued are written before the process exits
+        atexit.register(store.close)
+        return store
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode, NORMAL only syncs at checkpoints: commits survive a
+        # process crash, and the last ones may be lost on power failure
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _reader(self):
+        """This thread's read connection (WAL readers don't wait for the writer)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _reserve_block(self):
+        """Reserve code_block_size sequence numbers in the database; returns the range (start, end)"""
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            start = connection.execute("SELECT next_value FROM code_sequence WHERE id = 1").fetchone()[0]
+            connection.execute("UPDATE code_sequence SET next_value = ? WHERE id = 1", (start + self.code_block_size,))
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+        return start, start + self.code_block_size
+
+    def _has_codes(self):
+        """Whether a code can be issued without reserving a block; called with the lock held"""
+        return self._next_sequence < self._sequence_end or self._spare_block is not None
+
+    def _new_code(self):
+        """Next confirmation code; called with the lock held, when _has_codes()"""
+        if self._next_sequence >= self._sequence_end:
+            # The writer has the next block ready
+            (self._next_sequence, self._sequence_end), self._spare_block = self._spare_block, None
+        code = encode_code(self._next_sequence)
+        self._next_sequence += 1
+        return code
+
+    def submit(self, application):
+        """
+        Accept an application and return its confirmation code without waiting for the disk
+
+        Args:
+            application (dict): The apply_for_real_estate_financing fields (full_name,
+                cpf_number, date_of_birth, monthly_income, marital_status, person_type,
+                property_value, state, city) and optionally submission_date
+
+        Returns:
+            tuple: (confirmation code, True if new or False if this CPF already
+                applied for this property)
+        """
+        cpf = cpf_digits(application["cpf_number"])
+        key = property_key(application.get("state"), application.get("city"), application.get("property_value"))
+
+        with self._lock:
+            while True:
+                code = self._pending_keys.get((cpf, key)) or self._index.get((cpf, key))
+                if code is not None:
+                    self.duplicates += 1
+                    return code, False
+                if self._has_codes():
+                    break
+                # A burst used every reserved code before the writer refilled
+                # them: wake it up and wait (the lock is released meanwhile)
+                self.code_waits += 1
+                if not self._codes_requested:
+                    self._codes_requested = True
+                    try:
+                        self._queue.put_nowait(RESERVE_CODES)
+                    except queue.Full:
+                        pass  # The writer is busy, and refills the codes after its batch
+                self._codes_ready.wait()
+            code = self._new_code()
+            row = {
+                "confirmation_code": code,
+                "cpf": cpf,
+                "property_key": key,
+                "full_name": application.get("full_name"),
+                "date_of_birth": application.get("date_of_birth"),
+                "monthly_income": application.get("monthly_income"),
+                "marital_status": application.get("marital_status"),
+                "person_type": application.get("person_type"),
+                "property_value": application.get("property_value"),
+                "state": application.get("state"),
+                "city": application.get("city"),
+                "submission_date": application.get("submission_date"),
+                "created_at": time.time(),
+            }
+            self._pending[code] = row
+            self._pending_keys[(cpf, key)] = code
+            self.submitted += 1
+        self._queue.put(row)
+        return code, True
+
+    def get(self, code):
+        """
+        The application with a confirmation code (or an alias of it)
+
+        Returns:
+            dict: The stored fields, or None
+        """
+        code = (code or "").strip().upper()
+        if not is_valid_code(code):
+            return None
+        with self._lock:
+            if code in self._pending:
+                return dict(self._pending[code])
+        connection = self._reader()
+        row = connection.execute("SELECT * FROM applications WHERE confirmation_code = ?", (code,)).fetchone()
+        if row is None:
+            alias = connection.execute(
+                "SELECT original_code FROM application_aliases WHERE confirmation_code = ?", (code,)
+            ).fetchone()
+            if alias is not None:
+                row = connection.execute(
+                    "SELECT * FROM applications WHERE confirmation_code = ?", (alias[0],)
+                ).fetchone()
+        return dict(row) if row is not None else None
+
+    def find_by_cpf(self, cpf):
+        """
+        Every application of a CPF, oldest first
+
+        Returns:
+            list: The stored fields of each application
+        """
+        cpf = cpf_digits(cpf)
+        rows = [dict(row) for row in self._reader().execute(
+            "SELECT * FROM applications WHERE cpf = ? ORDER BY created_at", (cpf,)
+        )]
+        stored = {row["confirmation_code"] for row in rows}
+        with self._lock:
+            rows += [dict(row) for row in self._pending.values() if row["cpf"] == cpf and row["confirmation_code"] not in stored]
+        return sorted(rows, key=lambda row: row["created_at"])
+
+    def _write_loop(self):
+        connection = self._connect()
+        insert = (f"INSERT OR IGNORE INTO applications ({', '.join(COLUMNS)}) "
+                  f"VALUES ({', '.join('?' for _ in COLUMNS)})")
+        stop = False
+        while not stop:
+            row = self._queue.get()
+            if row is RESERVE_CODES:
+                self._queue.task_done()
+                self._prefetch_codes()
+                continue
+            if row is None:
+                break
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather what arrives until the batch is full or the interval is over
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is RESERVE_CODES:
+                    # Refilled once the batch is written
+                    self._queue.task_done()
+                    continue
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            # Failed batches (a locked or full disk) are retried; until then
+            # their applications stay pending and can still be looked up
+            backoff = self.flush_interval
+            while not self._write_batch(connection, insert, batch):
+                time.sleep(backoff)
+                backoff = min(2 * backoff, 5.0)
+            for _ in batch:
+                self._queue.task_done()
+            self._prefetch_codes()
+        # The stop marker
+        self._queue.task_done()
+        connection.close()
+
+    def _write_batch(self, connection, insert, batch):
+        """Insert a batch in one transaction; returns False if it failed"""
+        started = time.perf_counter()
+        aliased = 0
+        # Code each written application resolves to
+        stored = {}
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            for row in batch:
+                stored[(row["cpf"], row["property_key"])] = row["confirmation_code"]
+                cursor = connection.execute(insert, [row[column] for column in COLUMNS])
+                if cursor.rowcount == 0:
+                    # Another process stored this CPF and property first: keep
+                    # its application and make this code point to it
+                    original = connection.execute(
+                        "SELECT confirmation_code FROM applications WHERE cpf = ? AND property_key = ?",
+                        (row["cpf"], row["property_key"]),
+                    ).fetchone()
+                    if original is not None:
+                        connection.execute(
+                            "INSERT OR IGNORE INTO application_aliases (confirmation_code, original_code) VALUES (?, ?)",
+                            (row["confirmation_code"], original[0]),
+                        )
+                        stored[(row["cpf"], row["property_key"])] = original[0]
+                        aliased += 1
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(batch)} applications: {e}")
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            with self._lock:
+                self.failed_batches += 1
+            return False
+
+        with self._lock:
+            self._index.update(stored)
+            for row in batch:
+                self._pending.pop(row["confirmation_code"], None)
+                self._pending_keys.pop((row["cpf"], row["property_key"]), None)
+            self.written += len(batch)
+            self.aliased += aliased
+            self.batches += 1
+            self._write_seconds += time.perf_counter() - started
+        return True
+
+    def _prefetch_codes(self):
+        """Reserve the next block of codes ahead of time (writer thread only), so submit() never does"""
+        with self._lock:
+            low = self._spare_block is None and (
+                self._codes_requested or self._sequence_end - self._next_sequence < self.code_block_size // 2)
+        if not low:
+            return
+        try:
+            block = self._reserve_block()
+        except sqlite3.Error as e:
+            # Tried again after the next batch (or the next request for codes)
+            logger.error(f"Failed to reserve confirmation codes: {e}")
+            with self._lock:
+                self._codes_requested = False
+                # Waiting submitters ask again
+                self._codes_ready.notify_all()
+            return
+        with self._lock:
+            self._spare_block = block
+            self._codes_requested = False
+            self._codes_ready.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every submitted application is written"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout=10):
+        """Write what is queued and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=timeout)
+
+    def stats(self):
+        """Return submission, write and batching counters"""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "duplicates": self.duplicates,
+                "written": self.written,
+                "aliased": self.aliased,
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "code_waits": self.code_waits,
+                "avg_batch_size": self.written / self.batches if self.batches else 0.0,
+                "avg_batch_ms": 1000 * self._write_seconds / self.batches if self.batches else 0.0,
+            }
+
+# Process-wide store, opened on first use
+_store = None
+_store_lock = threading.Lock()
+
+def get_application_store():
+    """Return the process-wide application store, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ApplicationStore.from_env()
+        return _store
+
+def get_application_store_stats():
+    """Counters of the application store (empty until the first application)"""
+    return _store.stats() if _store is not None else {}
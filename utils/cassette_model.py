@@ -0,0 +1,286 @@
+# Record/replay of model responses, so evals and benchmarks can run offline
+# and deterministically. Responses are recorded once from the real model,
+# keyed by a hash of what the agent sent (model, instructions, input, tools,
+# handoffs), and replayed by a local model provider with no network.
+import os
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+
+from pydantic import TypeAdapter
+from agents import ModelProvider, ModelResponse, MultiProvider, Usage
+from agents.models.interface import Model
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputItem,
+    ResponseOutputMessage,
+    ResponseTextDeltaEvent,
+)
+
+logger = logging.getLogger("cassette_model")
+
+_output_items = TypeAdapter(list[ResponseOutputItem])
+
+class CassetteMiss(KeyError):
+    """A request that is not in the cassette, in replay mode"""
+
+def request_key(*parts):
+    """Stable hash of JSON-serializable request parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def normalize_input(input):
+    """
+    The model input as it goes into the key
+
+    Tool outputs are left out: they follow from the tool call (which is in the
+    key), and some of them hold dates or generated codes that differ between
+    recording and replay.
+    """
+    if isinstance(input, str):
+        return input
+    items = []
+    for item in input:
+        item = dict(item)
+        if item.get("type") == "function_call_output":
+            item.pop("output", None)
+        items.append(item)
+    return items
+
+class Cassette:
+    def __init__(self, path):
+        """
+        Recorded responses, stored as gzipped JSON lines ({"key", "kind", "value"})
+
+        Args:
+            path (str): Cassette file (created on the first save)
+        """
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+            logger.info(f"Cassette {path}: {len(self._entries)} recorded responses")
+
+    def get(self, key):
+        """Return the recorded value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["value"]
+
+    def put(self, key, kind, value):
+        """Record a value (written to disk by save())"""
+        with self._lock:
+            self._entries[key] = {"key": key, "kind": kind, "value": value}
+            self.recorded += 1
+            self._dirty = True
+
+    def save(self):
+        """Write the cassette if anything was recorded (sorted by key, so re-recordings diff well)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = [self._entries[key] for key in sorted(self._entries)]
+            self._dirty = False
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        # mtime=0 keeps the file identical when nothing changed
+        with open(temporary_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            for entry in entries:
+                f.write((json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+        os.replace(temporary_path, self.path)
+        logger.info(f"Cassette {self.path} saved: {len(entries)} responses")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return lookups, hits and recordings"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+class CassetteModel(Model):
+    def __init__(self, model_name, cassette, mode, live_model=None):
+        """
+        Model that answers from a cassette, and records the live model's answers
+
+        Args:
+            model_name (str): The model the agent asked for (part of the key)
+            cassette (Cassette): Where responses are looked up and recorded
+            mode (str): "replay" (cassette only, a missing response raises
+                CassetteMiss), "record" (always ask the live model and record) or
+                "auto" (replay what is recorded, record the rest)
+            live_model (Model): The real model, for "record" and "auto"
+        """
+        self.model_name = model_name
+        self.cassette = cassette
+        self.mode = mode
+        self.live_model = live_model
+
+    def _key(self, system_instructions, input, model_settings, tools, output_schema, handoffs):
+        return request_key(
+            self.model_name,
+            system_instructions,
+            normalize_input(input),
+            model_settings.to_json_dict() if model_settings is not None else None,
+            [(getattr(tool, "name", type(tool).__name__), getattr(tool, "params_json_schema", None)) for tool in tools],
+            [handoff.tool_name for handoff in handoffs],
+            output_schema.json_schema() if output_schema is not None and not output_schema.is_plain_text() else None,
+        )
+
+    def _lookup(self, key):
+        if self.mode == "record":
+            return None
+        recorded = self.cassette.get(key)
+        if recorded is None and self.mode == "replay":
+            raise CassetteMiss(f"No recorded response for request {key} (model {self.model_name}); "
+                               f"record it with the cassette in record or auto mode")
+        return recorded
+
+    def _record(self, key, output, usage):
+        self.cassette.put(key, "response", {
+            "output": [item.model_dump(mode="json", exclude_none=True) for item in output],
+            "usage": {
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+                "total_tokens": usage.total_tokens,
+            },
+        })
+
+    @staticmethod
+    def _replayed(recorded):
+        usage = recorded.get("usage", {})
+        return _output_items.validate_python(recorded["output"]), Usage(
+            requests=1,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                           prompt=None):
+        key = self._key(system_instructions, input, model_settings, tools, output_schema, handoffs)
+        recorded = self._lookup(key)
+        if recorded is not None:
+            output, usage = self._replayed(recorded)
+            return ModelResponse(output=output, usage=usage, response_id=None)
+
+        response = await self.live_model.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+            previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt,
+        )
+        self._record(key, response.output, response.usage)
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                              prompt=None):
+        key = self._key(system_instructions, input, model_settings, tools, output_schema, handoffs)
+        recorded = self._lookup(key)
+        if recorded is None:
+            # Pass the live stream through, recording the completed response
+            async for event in self.live_model.stream_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing,
+                previous_response_id=previous_response_id, conversation_id=conversation_id, prompt=prompt,
+            ):
+                if isinstance(event, ResponseCompletedEvent):
+                    response_usage = event.response.usage
+                    usage = Usage(
+                        requests=1,
+                        input_tokens=response_usage.input_tokens if response_usage else 0,
+                        output_tokens=response_usage.output_tokens if response_usage else 0,
+                        total_tokens=response_usage.total_tokens if response_usage else 0,
+                    )
+                    self._record(key, event.response.output, usage)
+                yield event
+            return
+
+        # Replay: each message's text as one delta, then the completed response
+        output, _ = self._replayed(recorded)
+        sequence_number = 0
+        for index, item in enumerate(output):
+            if isinstance(item, ResponseOutputMessage):
+                for content_index, content in enumerate(item.content):
+                    if getattr(content, "text", None):
+                        yield ResponseTextDeltaEvent(
+                            type="response.output_text.delta",
+                            item_id=item.id,
+                            output_index=index,
+                            content_index=content_index,
+                            delta=content.text,
+                            logprobs=[],
+                            sequence_number=sequence_number,
+                        )
+                        sequence_number += 1
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=sequence_number,
+            response=Response.model_construct(
+                id=f"resp_{key}",
+                created_at=time.time(),
+                model=self.model_name or "cassette",
+                object="response",
+                output=output,
+                status="completed",
+                tools=[],
+                tool_choice="auto",
+                parallel_tool_calls=False,
+            ),
+        )
+
+class CassetteModelProvider(ModelProvider):
+    def __init__(self, cassette, mode="replay", live_provider=None):
+        """
+        Model provider serving every agent from a cassette
+
+        Args:
+            cassette (Cassette or str): The cassette, or its path
+            mode (str): "replay", "record" or "auto" (see CassetteModel)
+            live_provider (ModelProvider): Provider of the real models (defaults to
+                the SDK's); unused in "replay" mode
+        """
+        if mode not in ("replay", "record", "auto"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.cassette = Cassette(cassette) if isinstance(cassette, str) else cassette
+        self.mode = mode
+        self.live_provider = live_provider if live_provider is not None or mode == "replay" else MultiProvider()
+        self._models = {}
+        if mode != "replay":
+            atexit.register(self.cassette.save)
+
+    def get_model(self, model_name):
+        if model_name not in self._models:
+            live_model = self.live_provider.get_model(model_name) if self.live_provider is not None else None
+            self._models[model_name] = CassetteModel(model_name, self.cassette, self.mode, live_model)
+        return self._models[model_name]
+
+    def stats(self):
+        return dict(mode=self.mode, **self.cassette.stats())
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import threading
+import logging
+
+logger = logging.getLogger('event_loop')
+
+class BackgroundEventLoop:
+    def __init__(self):
+        """
+        A single asyncio event loop running in a background thread.
+
+        Request threads submit coroutines to it and wait for the result, so every
+        conversation of the worker shares one loop and their model calls overlap
+        instead of each request creating (and leaking) its own loop.
+        """
+        self.loop = None
+        self.thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self):
+        # A loop inherited through fork() has no thread behind it in the child
+        return self.loop is not None and self._pid == os.getpid()
+
+    def start(self):
+        """Start the loop thread (restarting it in a forked child process)"""
+        with self._lock:
+            if self.is_running:
+                return
+
+            self.loop = asyncio.new_event_loop()
+            self._pid = os.getpid()
+            self.thread = threading.Thread(target=self._run_loop, name="agent-event-loop")
+            self.thread.daemon = True  # Thread will exit when main program exits
+            self.thread.start()
+            logger.info(f"Agent event loop started in process {self._pid}")
+
+    def stop(self):
+        """Stop the loop and close it"""
+        with self._lock:
+            if not self.is_running:
+                return
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+            self.loop.close()
+            self.loop = None
+            self.thread = None
+            logger.info("Agent event loop stopped")
+
+    def run(self, coro, timeout=None):
+        """
+        Run a coroutine on the background loop and wait for its result
+
+        Args:
+            coro (coroutine): The coroutine to run
+            timeout (float): Seconds to wait before giving up (None to wait forever)
+
+        Returns:
+            The coroutine's result
+        """
+        if not self.is_running:
+            self.start()
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    def submit(self, coro):
+        """Schedule a coroutine on the background loop without waiting for it"""
+        if not self.is_running:
+            self.start()
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+# Singleton instance
+_event_loop = None
+_event_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """Get the process-wide background event loop, starting it if needed"""
+    global _event_loop
+
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = BackgroundEventLoop()
+    _event_loop.start()
+    return _event_loop
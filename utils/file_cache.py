@@ -0,0 +1,133 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def content_key(*parts):
+    """SHA-256 hex digest of the given (already normalized) parts"""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+class ContentAddressedCache:
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024, suffix=""):
+        """
+        Size-bounded on-disk cache of generated files, named after the hash of their inputs
+
+        The directory is created and scanned once; afterwards the cache keeps
+        its own index, so a hit costs one stat call (a file deleted behind the
+        cache's back, by another worker or by hand, is rendered again). Least
+        recently used files are deleted once the total size goes over max_bytes.
+
+        Args:
+            directory (str): Directory the files are stored in
+            max_bytes (int): Disk budget for all files, in bytes
+            suffix (str): File extension (".pdf")
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.missing_files = 0
+        self.render_seconds = 0.0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Index the files left by previous runs, oldest first"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.suffix) and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:len(entry.name) - len(self.suffix)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._index[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits its budget (caller holds the lock)"""
+        # The most recent file is kept even if it alone goes over the budget
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                logger.warning(f"Could not delete cached file {key}: {e}")
+
+    def get_or_create(self, key, render):
+        """
+        Return the path of the file for key, rendering it on a miss
+
+        Args:
+            key (str): Content key (see content_key)
+            render (callable): Returns the file's bytes
+
+        Returns:
+            str: Path to the file
+        """
+        path = self.path_for(key)
+        with self._lock:
+            indexed = key in self._index
+        # Outside the lock: the index may list a file that is gone
+        exists = indexed and os.path.isfile(path)
+        with self._lock:
+            if exists and key in self._index:
+                self._index.move_to_end(key)
+                self.hits += 1
+                return path
+            if indexed and not exists and key in self._index:
+                # Deleted behind our back: forget it and render it again
+                self._total_bytes -= self._index.pop(key)
+                self.missing_files += 1
+            self.misses += 1
+
+        # Render outside the lock; two concurrent misses of the same key write identical bytes
+        started = time.perf_counter()
+        data = render()
+        elapsed = time.perf_counter() - started
+
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+        with self._lock:
+            self.render_seconds += elapsed
+            if key not in self._index:
+                self._index[key] = len(data)
+                self._total_bytes += len(data)
+            self._index.move_to_end(key)
+            self._evict()
+        return path
+
+    def stats(self):
+        """Return hit ratio, rendering time and disk usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "missing_files": self.missing_files,
+                "avg_render_ms": 1000 * self.render_seconds / self.misses if self.misses else 0.0,
+            }
@@ -0,0 +1,213 @@
+import os
+import ast
+import json
+import threading
+
+# Tool outputs longer than this (in characters) are condensed once they leave the recent turns
+MAX_OLD_OUTPUT_CHARS = 200
+# Assistant messages longer than this are shortened once they leave the recent turns
+MAX_OLD_MESSAGE_CHARS = 300
+
+def estimate_tokens(items):
+    """Approximate token count of input items (about 4 characters per token)"""
+    return len(json.dumps(items, ensure_ascii=False, default=str)) // 4
+
+def is_user_message(item):
+    return item.get("role") == "user" and item.get("type", "message") == "message"
+
+def is_handoff_call(item):
+    return item.get("type") == "function_call" and item.get("name", "").startswith("transfer_to_")
+
+def split_turns(history):
+    """Group input items into turns, each starting at a user message"""
+    turns = []
+    for item in history:
+        if is_user_message(item) or not turns:
+            turns.append([])
+        turns[-1].append(item)
+    return turns
+
+def condense_tool_output(output):
+    """
+    Shrink a tool output to its short scalar fields (codes, status, messages)
+
+    Args:
+        output (str): The tool output as replayed to the model
+
+    Returns:
+        str: The condensed output
+    """
+    if not isinstance(output, str) or len(output) <= MAX_OLD_OUTPUT_CHARS:
+        return output
+
+    parsed = None
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            parsed = parse(output)
+            break
+        except (ValueError, SyntaxError):
+            continue
+
+    if isinstance(parsed, dict):
+        kept = {
+            key: value for key, value in parsed.items()
+            if isinstance(value, (str, int, float, bool)) and len(str(value)) <= 120
+        }
+        kept["_condensed"] = True
+        return json.dumps(kept, ensure_ascii=False)
+
+    return output[:MAX_OLD_OUTPUT_CHARS] + " [...]"
+
+def shorten_assistant_message(item):
+    """Return a copy of an assistant message with its text truncated"""
+    content = item.get("content")
+    if isinstance(content, str):
+        if len(content) <= MAX_OLD_MESSAGE_CHARS:
+            return item
+        return dict(item, content=content[:MAX_OLD_MESSAGE_CHARS] + " [...]")
+
+    if isinstance(content, list):
+        parts = []
+        changed = False
+        for part in content:
+            text = part.get("text") if isinstance(part, dict) else None
+            if isinstance(text, str) and len(text) > MAX_OLD_MESSAGE_CHARS:
+                part = dict(part, text=text[:MAX_OLD_MESSAGE_CHARS] + " [...]")
+                changed = True
+            parts.append(part)
+        if changed:
+            return dict(item, content=parts)
+    return item
+
+class CompactionReport:
+    def __init__(self, tokens_before, tokens_after, condensed_items, dropped_items):
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.condensed_items = condensed_items
+        self.dropped_items = dropped_items
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def __str__(self):
+        return (f"{self.tokens_before} -> {self.tokens_after} tokens (saved {self.tokens_saved}, "
+                f"{self.condensed_items} items condensed, {self.dropped_items} dropped)")
+
+class HistoryCompactor:
+    def __init__(self, token_budget=6000, keep_recent_turns=4):
+        """
+        Keeps conversation history under a token budget before each agent run.
+
+        Older turns are compacted in stages until the budget holds:
+        1. Long tool outputs are condensed to their short fields
+        2. Long assistant messages are shortened
+        3. Assistant messages, tool calls and tool outputs of whole turns are dropped
+        4. User messages from before the handoff to the current agent are dropped
+
+        User messages since the last handoff (the fields the current agent has
+        collected so far) and the most recent turns are never touched.
+
+        Args:
+            token_budget (int): Target size of the history, in approximate tokens
+            keep_recent_turns (int): Number of latest turns kept verbatim
+        """
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self._lock = threading.Lock()
+
+        # Counters
+        self.runs = 0
+        self.compacted_runs = 0
+        self.tokens_saved_total = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a compactor configured through the HISTORY_* environment variables"""
+        return cls(
+            token_budget=int(os.environ.get("HISTORY_TOKEN_BUDGET", 6000)),
+            keep_recent_turns=int(os.environ.get("HISTORY_KEEP_TURNS", 4)),
+        )
+
+    def compact(self, history):
+        """
+        Compact history to fit the token budget
+
+        Args:
+            history (list): Input items (from result.to_input_list())
+
+        Returns:
+            tuple: (compacted input items, CompactionReport)
+        """
+        tokens_before = estimate_tokens(history)
+        condensed = 0
+        dropped = 0
+        items = history
+
+        if tokens_before > self.token_budget:
+            turns = split_turns(history)
+            old_turns = turns[:max(0, len(turns) - self.keep_recent_turns)]
+            recent_turns = turns[len(old_turns):]
+
+            # User messages after the last handoff hold the current agent's collected fields
+            protected_from = 0
+            for index, turn in enumerate(turns):
+                if any(is_handoff_call(item) for item in turn):
+                    protected_from = index
+
+            def total():
+                return estimate_tokens([item for turn in old_turns + recent_turns for item in turn])
+
+            # Stage 1: condense old tool outputs
+            for turn in old_turns:
+                for position, item in enumerate(turn):
+                    if item.get("type") == "function_call_output":
+                        output = condense_tool_output(item.get("output"))
+                        if output != item.get("output"):
+                            turn[position] = dict(item, output=output)
+                            condensed += 1
+
+            # Stage 2: shorten old assistant messages
+            if total() > self.token_budget:
+                for turn in old_turns:
+                    for position, item in enumerate(turn):
+                        if item.get("role") == "assistant":
+                            shortened = shorten_assistant_message(item)
+                            if shortened is not item:
+                                turn[position] = shortened
+                                condensed += 1
+
+            # Stage 3: keep only the user messages of the oldest turns
+            for index, turn in enumerate(old_turns):
+                if total() <= self.token_budget:
+                    break
+                kept = [item for item in turn if is_user_message(item)]
+                dropped += len(turn) - len(kept)
+                old_turns[index] = kept
+
+            # Stage 4: drop user messages from before the current agent took over
+            for index in range(min(protected_from, len(old_turns))):
+                if total() <= self.token_budget:
+                    break
+                dropped += len(old_turns[index])
+                old_turns[index] = []
+
+            items = [item for turn in old_turns + recent_turns for item in turn]
+
+        report = CompactionReport(tokens_before, estimate_tokens(items), condensed, dropped)
+        with self._lock:
+            self.runs += 1
+            if report.tokens_saved > 0:
+                self.compacted_runs += 1
+                self.tokens_saved_total += report.tokens_saved
+        return items, report
+
+    def stats(self):
+        """Return how often compaction kicked in and how many tokens it saved"""
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "runs": self.runs,
+                "compacted_runs": self.compacted_runs,
+                "tokens_saved_total": self.tokens_saved_total,
+            }
@@ -0,0 +1,372 @@
+import gzip
+import bisect
+import logging
+import threading
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from utils.text import fold_text
+
+logger = logging.getLogger("locations")
+
+# IBGE municipality table: "code;name;UF" per line, in code order
+DATA_PATH = Path(__file__).resolve().parent / "data" / "ibge_municipalities.csv.gz"
+
+UF_NAMES = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia",
+    "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás",
+    "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais",
+    "PA": "Pará", "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí",
+    "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul",
+    "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina", "SP": "São Paulo",
+    "SE": "Sergipe", "TO": "Tocantins",
+}
+UF_CODES = sorted(UF_NAMES)
+
+# Folded state name (or lowercase code) -> UF
+_UF_BY_KEY = {fold_text(name): uf for uf, name in UF_NAMES.items()}
+_UF_BY_KEY.update({uf.lower(): uf for uf in UF_NAMES})
+
+# Candidates checked with the edit distance in a typo-tolerant lookup
+FUZZY_CANDIDATES = 8
+# Typos corrected without asking; a farther match may be another city
+# ("Santo Amaro, SP" is 3 edits from Santo André) and is only suggested
+AUTO_CORRECT_DISTANCE = 1
+
+def edit_distance(a, b, max_distance):
+    """
+    Edit distance between a and b, or max_distance + 1 once it is known to be larger
+
+    Levenshtein distance where swapping two adjacent letters ("florainopolis")
+    is a single edit, like the other typos. Only a band of width
+    2 * max_distance + 1 around the diagonal is computed.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [max_distance + 1] * len(b)
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        row_min = current[0] if low == 1 else max_distance + 1
+        char = a[i - 1]
+        for j in range(low, high + 1):
+            cost = 0 if char == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if before_previous is not None and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[len(b)], max_distance + 1)
+
+def allowed_typos(key):
+    """Edit distance tolerated for a folded query: 1 up to 5 characters, 2 up to 10, then 3"""
+    return 1 if len(key) <= 5 else 2 if len(key) <= 10 else 3
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def normalize_state(text):
+    """
+    UF code of a state given by code or name, accents and typos tolerated
+
+    Args:
+        text (str): "SP", "sp", "São Paulo", "sao paulo", "Sao Paolo"...
+
+    Returns:
+        str: The UF code, or None if it matches no state
+    """
+    key = fold_text(text or "")
+    if not key:
+        return None
+    if key in _UF_BY_KEY:
+        return _UF_BY_KEY[key]
+    limit = allowed_typos(key)
+    best, best_distance = None, limit + 1
+    for name, uf in _UF_BY_KEY.items():
+        if len(name) > 2:
+            distance = edit_distance(key, name, limit)
+            if distance < best_distance:
+                best, best_distance = uf, distance
+    return best
+
+class Municipality:
+    def __init__(self, code, name, uf):
+        """
+        An IBGE municipality
+
+        Args:
+            code (int): 7-digit IBGE code
+            name (str): Official name, with accents
+            uf (str): State code
+        """
+        self.code = code
+        self.name = name
+        self.uf = uf
+
+    def __repr__(self):
+        return f"Municipality({self.code}, {self.name!r}, {self.uf!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Municipality) and other.code == self.code
+
+    def __hash__(self):
+        return self.code
+
+class LocationMatch:
+    def __init__(self, kind, matches, distance=0):
+        """
+        Result of resolving a free-text city
+
+        Args:
+            kind (str): "exact", "prefix", "fuzzy" or "not_found"
+            matches (list): Candidate municipalities, best first (suggestions when not found)
+            distance (int): Edit distance of fuzzy matches
+        """
+        self.kind = kind
+        self.matches = matches
+        self.distance = distance
+
+    @property
+    def needs_confirmation(self):
+        """True for fuzzy matches too far from the text to be taken as a typo"""
+        return self.kind == "fuzzy" and self.distance > AUTO_CORRECT_DISTANCE
+
+    @property
+    def municipality(self):
+        """The municipality, when the text identifies exactly one without needing confirmation"""
+        if self.kind == "not_found" or self.needs_confirmation or len(self.matches) != 1:
+            return None
+        return self.matches[0]
+
+    def __repr__(self):
+        return f"LocationMatch({self.kind!r}, {self.matches!r}, distance={self.distance})"
+
+class LocationIndex:
+    def __init__(self, rows):
+        """
+        Lookup index over the municipalities, keyed by accent-folded name
+
+        Names are kept sorted by key in parallel arrays, so exact and prefix
+        lookups are binary searches. Typo-tolerant lookups count shared
+        character trigrams (one NumPy bincount over the trigram postings) and
+        check the best candidates with a bounded edit distance.
+
+        Args:
+            rows (list): (code, name, uf) tuples
+        """
+        rows = sorted(rows, key=lambda row: (fold_text(row[1]), row[2]))
+        self._keys = [fold_text(name) for _, name, _ in rows]
+        self._names = [name for _, name, _ in rows]
+        self._codes = array("I", (int(code) for code, _, _ in rows))
+        # UF as an index into UF_CODES, one byte per municipality
+        self._ufs = bytes(UF_CODES.index(uf) for _, _, uf in rows)
+        self._uf_masks = {}
+        self._lock = threading.Lock()
+        # How resolve() found the cities it was asked for
+        self.resolved = {"exact": 0, "prefix": 0, "fuzzy": 0, "unconfirmed": 0, "ambiguous": 0, "not_found": 0}
+        self._lengths = np.array([len(key) for key in self._keys], dtype=np.int16)
+
+        postings = {}
+        for position, key in enumerate(self._keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(ids, dtype=np.uint16) for gram, ids in postings.items()}
+
+    @classmethod
+    def load(cls, path=DATA_PATH):
+        """Build the index from the bundled IBGE table"""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rows = [line.rstrip("\n").split(";") for line in f if line.strip()]
+        return cls(rows)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _municipality(self, position):
+        return Municipality(self._codes[position], self._names[position], UF_CODES[self._ufs[position]])
+
+    def _in_state(self, positions, uf):
+        if uf is None:
+            return list(positions)
+        uf_index = UF_CODES.index(uf)
+        return [position for position in positions if self._ufs[position] == uf_index]
+
+    def exact(self, city, uf=None):
+        """
+        Municipalities named city (accents, case and punctuation ignored)
+
+        Returns:
+            list: Matching municipalities (homonyms in several states without uf)
+        """
+        key = fold_text(city or "")
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key, lo=start)
+        return [self._municipality(position) for position in self._in_state(range(start, end), uf)]
+
+    def prefix(self, text, uf=None, limit=10):
+        """
+        Municipalities whose name starts with text, in alphabetical order
+
+        Returns:
+            list: Up to limit municipalities
+        """
+        key = fold_text(text or "")
+        if not key:
+            return []
+        position = bisect.bisect_left(self._keys, key)
+        found = []
+        uf_index = UF_CODES.index(uf) if uf is not None else None
+        while position < len(self._keys) and self._keys[position].startswith(key) and len(found) < limit:
+            if uf_index is None or self._ufs[position] == uf_index:
+                found.append(self._municipality(position))
+            position += 1
+        return found
+
+    def fuzzy(self, text, uf=None, max_distance=None):
+        """
+        Municipalities within a few typos of text, closest first
+
+        Args:
+            text (str): The city as written by the user
+            uf (str): Only consider this state
+            max_distance (int): Edit distance tolerated (defaults to allowed_typos)
+
+        Returns:
+            list: (municipality, distance) pairs at the smallest distance found
+        """
+        key = fold_text(text or "")
+        if not key:
+            return []
+        limit = allowed_typos(key) if max_distance is None else max_distance
+        lists = [self._postings[gram] for gram in trigrams(key) if gram in self._postings]
+        if not lists:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self._keys))
+        if uf is not None:
+            if uf not in self._uf_masks:
+                self._uf_masks[uf] = np.frombuffer(self._ufs, dtype=np.uint8) == UF_CODES.index(uf)
+            counts = np.where(self._uf_masks[uf], counts, 0)
+        # Names sharing the most trigrams, among those whose length is within reach
+        candidates = np.flatnonzero(counts)
+        candidates = candidates[np.abs(self._lengths[candidates] - len(key)) <= limit]
+        candidates = candidates[np.argsort(-counts[candidates], kind="stable")[:FUZZY_CANDIDATES]]
+
+        best, best_distance = [], limit + 1
+        for position in candidates.tolist():
+            distance = edit_distance(key, self._keys[position], min(limit, best_distance))
+            if distance < best_distance:
+                best, best_distance = [position], distance
+            elif distance == best_distance and distance <= limit:
+                best.append(position)
+        return [(self._municipality(position), best_distance) for position in sorted(best)]
+
+    def resolve(self, city, state=None):
+        """
+        Resolve a free-text city (and optional state) to IBGE municipalities
+
+        Tries an exact match, then a unique prefix ("Florianópo"), then typos
+        ("Florianopolys"); the state narrows homonyms down ("Bom Jesus"). Matches
+        more than AUTO_CORRECT_DISTANCE edits away need the user's confirmation.
+
+        Args:
+            city (str): The city as written by the user
+            state (str): State code or name, if known
+
+        Returns:
+            LocationMatch: How the city was found and the candidates
+        """
+        result = self._resolve(city, state)
+        if result.needs_confirmation:
+            kind = "unconfirmed"
+        elif result.kind != "not_found" and result.municipality is None:
+            kind = "ambiguous"
+        else:
+            kind = result.kind
+        with self._lock:
+            self.resolved[kind] += 1
+        return result
+
+    def _resolve(self, city, state):
+        uf = normalize_state(state) if state else None
+        matches = self.exact(city, uf)
+        if matches:
+            return LocationMatch("exact", matches)
+        matches = self.prefix(city, uf, limit=2) if len(fold_text(city or "")) >= 4 else []
+        if len(matches) == 1:
+            return LocationMatch("prefix", matches)
+        found = self.fuzzy(city, uf)
+        if found:
+            return LocationMatch("fuzzy", [municipality for municipality, _ in found], distance=found[0][1])
+        if uf is not None:
+            # The city may exist in another state: suggest it rather than change the state
+            matches = self.exact(city) or [municipality for municipality, _ in self.fuzzy(city)]
+            if matches:
+                return LocationMatch("not_found", matches)
+        return LocationMatch("not_found", self.prefix(city, uf, limit=5))
+
+    def stats(self):
+        """Return the table size and how cities were resolved"""
+        with self._lock:
+            return dict(municipalities=len(self._keys), **self.resolved)
+
+# Process-wide index, built on first use
+_index = None
+_index_lock = threading.Lock()
+
+def get_location_index():
+    """Return the municipality index, loading the bundled table on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LocationIndex.load()
+            logger.info(f"Location index loaded: {len(_index)} municipalities")
+        return _index
+
+def get_location_index_stats():
+    """Resolution counters of the municipality index (empty until it is first used)"""
+    return _index.stats() if _index is not None else {}
+
+def normalize_location(state, city):
+    """
+    Official state code and city name for a location typed by the user
+
+    Args:
+        state (str): State code or name ("SC", "santa catarina"), or empty
+        city (str): City name, accents and small typos tolerated
+
+    Returns:
+        dict: "found" (bool), "state" and "city" (official, or as given when
+            not found), "ibge_code", "match" (exact, prefix, fuzzy, ambiguous
+            or not_found), "distance" (edits between the text and a fuzzy
+            match, else 0) and, when not found, "suggestions" ("City - UF"
+            strings). A fuzzy match beyond a typo is not found, and suggested
+            for the user to confirm.
+    """
+    result = get_location_index().resolve(city, state)
+    municipality = result.municipality
+    if municipality is not None:
+        return {
+            "found": True,
+            "state": municipality.uf,
+            "city": municipality.name,
+            "ibge_code": municipality.code,
+            "match": result.kind,
+            "distance": result.distance,
+        }
+    return {
+        "found": False,
+        "state": normalize_state(state) or state,
+        "city": city,
+        "ibge_code": None,
+        "match": result.kind if result.kind in ("fuzzy", "not_found") else "ambiguous",
+        "distance": result.distance,
+        "suggestions": [f"{m.name} - {m.uf}" for m in result.matches[:5]],
+    }
@@ -0,0 +1,150 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class BoundedTTLCache:
+    def __init__(self, max_entries=1000, max_bytes=None, ttl_seconds=None, sizeof=None, clock=time.monotonic):
+        """
+        Thread-safe LRU cache bounded by entry count, total size and idle time
+
+        Args:
+            max_entries (int): Maximum number of entries kept in the cache
+            max_bytes (int): Maximum total size of the cached values, in bytes (None for no limit)
+            ttl_seconds (float): Entries not touched for this long are expired (None for no expiry)
+            sizeof (callable): Function returning the size in bytes of a value (defaults to 0)
+            clock (callable): Monotonic clock, overridable for benchmarks
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof or (lambda value: 0)
+        self.clock = clock
+
+        # key -> (value, size, last_access)
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, size, last_access = entry
+            now = self.clock()
+            if self._is_expired(last_access, now):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries[key] = (value, size, now)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Insert or replace the value for key, evicting entries if limits are exceeded"""
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, self.clock())
+            self._total_bytes += size
+            self._enforce_limits()
+
+    def pop(self, key, default=None):
+        """Remove key from the cache and return its value"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def purge_expired(self):
+        """Drop every expired entry. Returns the number of entries removed."""
+        if self.ttl_seconds is None:
+            return 0
+
+        with self._lock:
+            now = self.clock()
+            removed = 0
+            # Entries are kept in access order, so expired ones are at the front
+            for key, (_, _, last_access) in list(self._entries.items()):
+                if not self._is_expired(last_access, now):
+                    break
+                self._remove(key)
+                removed += 1
+            self.expirations += removed
+            return removed
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry[2], self.clock())
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def stats(self):
+        """Return the cache counters and current occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _is_expired(self, last_access, now):
+        return self.ttl_seconds is not None and now - last_access > self.ttl_seconds
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def _enforce_limits(self):
+        # Expired entries go first, so they don't count as LRU evictions
+        if self.ttl_seconds is not None:
+            now = self.clock()
+            while self._entries:
+                oldest_key, (_, _, last_access) = next(iter(self._entries.items()))
+                if not self._is_expired(last_access, now):
+                    break
+                self._remove(oldest_key)
+                self.expirations += 1
+
+        # Then evict least recently used entries until both limits hold.
+        # The newest entry is never evicted, even if it alone exceeds max_bytes.
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
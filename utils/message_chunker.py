@@ -0,0 +1,125 @@
+import re
+
+# Twilio's maximum WhatsApp message body
+WHATSAPP_MAX_CHARS = 1600
+
+# End of a sentence: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r"[.!?…:](?=\s)")
+
+def find_cut(text, limit):
+    """
+    Best place to split text no further than limit characters in
+
+    Paragraph breaks are preferred, then sentence ends, line breaks and
+    spaces; a word longer than the limit is cut where it stands.
+
+    Returns:
+        int: Length of the first chunk
+    """
+    if len(text) <= limit:
+        return len(text)
+    window = text[:limit + 1]
+    paragraph = window.rfind("\n\n")
+    if paragraph > 0:
+        return paragraph
+    sentences = [match.end() for match in SENTENCE_END.finditer(window)]
+    if sentences:
+        return sentences[-1]
+    for separator in ("\n", " "):
+        position = window.rfind(separator)
+        if position > 0:
+            return position
+    return limit
+
+def split_message(text, max_chars=WHATSAPP_MAX_CHARS):
+    """
+    Split a reply into messages of at most max_chars, at paragraph or sentence boundaries
+
+    Args:
+        text (str): The reply
+        max_chars (int): Maximum characters per message
+
+    Returns:
+        list: The non-empty messages, in order
+    """
+    chunks = []
+    text = text.strip()
+    while text:
+        cut = find_cut(text, max_chars)
+        chunk = text[:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        text = text[cut:].strip()
+    return chunks
+
+class MessageChunker:
+    def __init__(self, max_chars=WHATSAPP_MAX_CHARS, paragraph_min_chars=160, sentence_min_chars=600,
+                 first_chunk_min_chars=100):
+        """
+        Incrementally cut streamed text into messages that can be sent while the rest is generated
+
+        A chunk is emitted at a paragraph break once it has paragraph_min_chars,
+        at a sentence end once it has sentence_min_chars (long paragraphs), and
+        at the best boundary available when it would go over max_chars. The
+        first chunk only waits for first_chunk_min_chars, so the user sees the
+        start of the reply as early as possible.
+
+        Args:
+            max_chars (int): Maximum characters per message
+            paragraph_min_chars (int): Minimum size of a chunk ending at a paragraph break
+            sentence_min_chars (int): Minimum size of a chunk ending mid-paragraph, at a sentence end
+            first_chunk_min_chars (int): Minimum size of the first chunk, at either boundary
+        """
+        self.max_chars = max_chars
+        self.paragraph_min_chars = paragraph_min_chars
+        self.sentence_min_chars = sentence_min_chars
+        self.first_chunk_min_chars = first_chunk_min_chars
+        self.chunks_emitted = 0
+        self._buffer = ""
+
+    def _next_cut(self):
+        """Length of the next ready chunk in the buffer, or None to wait for more text"""
+        buffer = self._buffer
+        window = buffer[:self.max_chars + 1]
+        first = self.chunks_emitted == 0
+        paragraph_min = min(self.paragraph_min_chars, self.first_chunk_min_chars) if first else self.paragraph_min_chars
+        sentence_min = self.first_chunk_min_chars if first else self.sentence_min_chars
+
+        paragraph = window.rfind("\n\n")
+        if paragraph >= paragraph_min:
+            return paragraph
+
+        if len(buffer) >= sentence_min:
+            # Only sentence ends already followed by whitespace are known to be complete
+            sentences = [match.end() for match in SENTENCE_END.finditer(window)]
+            if sentences and sentences[-1] >= sentence_min:
+                return sentences[-1]
+
+        if len(buffer) > self.max_chars:
+            return find_cut(buffer, self.max_chars)
+        return None
+
+    def feed(self, delta):
+        """
+        Add streamed text
+
+        Returns:
+            list: Chunks that are ready to be sent, in order
+        """
+        self._buffer += delta
+        chunks = []
+        cut = self._next_cut()
+        while cut is not None:
+            chunk = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:].lstrip()
+            if chunk:
+                chunks.append(chunk)
+                self.chunks_emitted += 1
+            cut = self._next_cut()
+        return chunks
+
+    def flush(self):
+        """Return the remaining text as the last chunks, once the stream is over"""
+        chunks = split_message(self._buffer, self.max_chars)
+        self._buffer = ""
+        return chunks
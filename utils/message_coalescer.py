@@ -0,0 +1,168 @@
+import os
+import time
+import threading
+
+class CoalescedTurnFailed(RuntimeError):
+    """Raised to the callers whose messages were merged into a turn that failed"""
+
+class Batch:
+    def __init__(self, text):
+        """Messages of one turn, and its outcome for the callers whose message joined it"""
+        self.messages = [text]
+        self.error = None
+        self.done = threading.Event()
+
+class SenderQueue:
+    def __init__(self, lock):
+        """
+        Coalescing state of one sender
+
+        Args:
+            lock (threading.Lock): The coalescer's lock, shared by every sender's condition
+        """
+        # Batch waiting for the next turn (None when no batch is open)
+        self.pending = None
+        self.first_at = 0.0
+        self.last_at = 0.0
+        # Held while this sender's turn runs, so turns never overlap
+        self.run_lock = threading.Lock()
+        # Turns started or waiting to start
+        self.active = 0
+        self.changed = threading.Condition(lock)
+
+class MessageCoalescer:
+    def __init__(self, window_seconds=1.0, max_wait_seconds=4.0, max_messages=10, clock=time.monotonic):
+        """
+        Merge the messages a sender sends in a row into a single agent turn
+
+        The first message of a batch makes its caller the batch's leader: it
+        waits until the sender has been quiet for window_seconds (at most
+        max_wait_seconds after the first message), then runs one turn with
+        every message received meanwhile. Callers whose message joined a batch
+        wait for that turn and share its outcome: if the turn fails, they fail
+        too, so none of the merged messages is taken as handled (and their
+        webhook retries are processed again). A sender's turns run one at a
+        time; messages arriving while a turn runs are merged into the next one.
+        Different senders don't wait for each other.
+
+        Args:
+            window_seconds (float): Quiet time that closes a batch (0 runs at once)
+            max_wait_seconds (float): Longest time a batch stays open after its first message
+            max_messages (int): A batch with this many messages closes at once
+            clock (callable): Monotonic clock, overridable for benchmarks
+        """
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.max_messages = max_messages
+        self.clock = clock
+        self._senders = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.messages = 0
+        self.turns = 0
+        self.merged = 0
+        self.largest_batch = 0
+        self.failed_turns = 0
+        self.waited_for_previous_turn = 0
+        self._debounce_wait_total = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Create a coalescer configured through the MESSAGE_DEBOUNCE_* environment variables"""
+        return cls(
+            window_seconds=float(os.environ.get("MESSAGE_DEBOUNCE_SECONDS", 1.0)),
+            max_wait_seconds=float(os.environ.get("MESSAGE_DEBOUNCE_MAX_SECONDS", 4.0)),
+            max_messages=int(os.environ.get("MESSAGE_DEBOUNCE_MAX_MESSAGES", 10)),
+        )
+
+    def submit(self, sender, text, job):
+        """
+        Add a message to the sender's next turn, running the turn if this call leads the batch
+
+        Args:
+            sender (str): The sender's address
+            text (str): The message text
+            job (callable): Runs a turn; called with the batch's messages joined by newlines
+
+        Returns:
+            tuple: (True, the job's return value) if this call ran the turn, or
+                (False, None) once the turn this message was merged into is over
+
+        Raises:
+            CoalescedTurnFailed: If the message was merged into a turn whose job raised
+        """
+        with self._lock:
+            self.messages += 1
+            now = self.clock()
+            state = self._senders.get(sender)
+            if state is None:
+                state = self._senders[sender] = SenderQueue(self._lock)
+            batch = state.pending
+            if batch is not None:
+                # A batch is open: this message goes with it
+                batch.messages.append(text)
+                state.last_at = now
+                self.merged += 1
+                state.changed.notify_all()
+                follower = True
+            else:
+                batch = state.pending = Batch(text)
+                state.first_at = state.last_at = now
+                state.active += 1
+                follower = False
+
+            # Wait for the sender to go quiet, or for the batch to fill up
+            while not follower and len(batch.messages) < self.max_messages:
+                deadline = min(state.last_at + self.window_seconds, state.first_at + self.max_wait_seconds)
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                state.changed.wait(remaining)
+            if not follower:
+                self._debounce_wait_total += self.clock() - now
+
+        if follower:
+            # Handled only once the leader's turn is over
+            batch.done.wait()
+            if batch.error is not None:
+                raise CoalescedTurnFailed(f"The turn this message was merged into failed: {batch.error!r}") from batch.error
+            return False, None
+
+        # The previous turn must be over; messages keep joining the batch meanwhile
+        if not state.run_lock.acquire(blocking=False):
+            with self._lock:
+                self.waited_for_previous_turn += 1
+            state.run_lock.acquire()
+        try:
+            with self._lock:
+                state.pending = None
+                self.turns += 1
+                self.largest_batch = max(self.largest_batch, len(batch.messages))
+            return True, job("\n".join(batch.messages))
+        except BaseException as e:
+            batch.error = e
+            with self._lock:
+                self.failed_turns += 1
+            raise
+        finally:
+            batch.done.set()
+            state.run_lock.release()
+            with self._lock:
+                state.active -= 1
+                if state.active == 0 and state.pending is None:
+                    del self._senders[sender]
+
+    def stats(self):
+        """Return messages received, turns run and turns saved by merging"""
+        with self._lock:
+            return {
+                "messages": self.messages,
+                "turns": self.turns,
+                "runs_saved": self.merged,
+                "largest_batch": self.largest_batch,
+                "failed_turns": self.failed_turns,
+                "waited_for_previous_turn": self.waited_for_previous_turn,
+                "avg_debounce_wait_ms": 1000 * self._debounce_wait_total / self.turns if self.turns else 0.0,
+                "senders": len(self._senders),
+            }
@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+
+from utils.lru_cache import BoundedTTLCache
+
+class InboundMessage:
+    def __init__(self, message_sid):
+        """
+        One delivery of a Twilio message being processed, shared with its retries
+
+        Args:
+            message_sid (str): Twilio's MessageSid (empty when the request has none)
+        """
+        self.message_sid = message_sid
+        self.received_at = time.monotonic()
+        self.reply = None
+        self.failed = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+class MessageDeduplicator:
+    def __init__(self, max_entries=10000, ttl_seconds=3600, attach_timeout=14):
+        """
+        Seen-set of webhook deliveries keyed by MessageSid
+
+        Twilio retries /receive_whatsapp with the same MessageSid when the reply
+        is slow. The first delivery claims the SID and runs the agents; retries
+        find it here and either wait for that run's reply (attach) or are just
+        acknowledged, instead of starting a second run.
+
+        Args:
+            max_entries (int): Maximum number of message SIDs remembered
+            ttl_seconds (float): How long a SID is remembered
+            attach_timeout (float): Longest a retry waits for the original run's reply, in
+                seconds (kept under Twilio's 15 s webhook timeout)
+        """
+        self.attach_timeout = attach_timeout
+        self._seen = BoundedTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.received = 0
+        self.without_sid = 0
+        self.duplicates_in_flight = 0
+        self.duplicates_completed = 0
+        self.attached = 0
+        self.attach_timeouts = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        """Create a deduplicator configured through the MESSAGE_DEDUP_* environment variables"""
+        return cls(
+            max_entries=int(os.environ.get("MESSAGE_DEDUP_MAX_ENTRIES", 10000)),
+            ttl_seconds=float(os.environ.get("MESSAGE_DEDUP_TTL_SECONDS", 3600)),
+            attach_timeout=float(os.environ.get("MESSAGE_DEDUP_ATTACH_TIMEOUT", 14)),
+        )
+
+    def claim(self, message_sid):
+        """
+        Register a webhook delivery
+
+        Args:
+            message_sid (str): Twilio's MessageSid
+
+        Returns:
+            tuple: (InboundMessage, True if this delivery should be processed or
+                False if it is a retry of a message already seen)
+        """
+        with self._lock:
+            self.received += 1
+            if not message_sid:
+                # Nothing to deduplicate on
+                self.without_sid += 1
+                return InboundMessage(message_sid), True
+
+            message = self._seen.get(message_sid)
+            if message is None:
+                message = InboundMessage(message_sid)
+                self._seen.set(message_sid, message)
+                return message, True
+
+            if message.done:
+                self.duplicates_completed += 1
+            else:
+                self.duplicates_in_flight += 1
+            return message, False
+
+    def complete(self, message, reply=None):
+        """Record the reply of a processed message and release the retries waiting for it"""
+        message.reply = reply
+        message._done.set()
+
+    def fail(self, message):
+        """Forget a message whose run failed, so that a later retry processes it again"""
+        with self._lock:
+            self.failures += 1
+            if message.message_sid and self._seen.get(message.message_sid) is message:
+                self._seen.pop(message.message_sid)
+        message.failed = True
+        message._done.set()
+
+    def wait(self, message):
+        """
+        Attach a retry to the original run
+
+        Returns:
+            str: The original reply, or None if the run failed or did not finish within attach_timeout
+        """
+        finished = message._done.wait(self.attach_timeout)
+        with self._lock:
+            if finished:
+                self.attached += 1
+            else:
+                self.attach_timeouts += 1
+        return message.reply if finished and not message.failed else None
+
+    def stats(self):
+        """Return deliveries received and duplicates suppressed"""
+        with self._lock:
+            return {
+                "received": self.received,
+                "without_sid": self.without_sid,
+                "remembered": len(self._seen),
+                "duplicates_suppressed": self.duplicates_in_flight + self.duplicates_completed,
+                "duplicates_in_flight": self.duplicates_in_flight,
+                "duplicates_completed": self.duplicates_completed,
+                "attached": self.attached,
+                "attach_timeouts": self.attach_timeouts,
+                "failures": self.failures,
+            }
@@ -0,0 +1,258 @@
+import os
+import time
+import bisect
+import threading
+
+from agents import RunHooks
+
+# In-process latency histograms and counters, exposed in the Prometheus text
+# format on /metrics (see routes/metrics.py).
+#
+# A histogram keeps, per label combination, one count per bucket plus the sum
+# and count of what it observed: an observation is a bisect and three additions
+# under the metric's lock, and nothing is allocated after a series exists.
+# Each gunicorn worker has its own registry, like /stats.
+
+# Bucket upper bounds in seconds, from session lookups (sub-millisecond) to model runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(label_names, label_values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra is not None:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Span:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        """Times a with-block into a histogram"""
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+class _NoSpan:
+    """Span of a disabled registry"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+NO_SPAN = _NoSpan()
+
+class Histogram:
+    def __init__(self, registry, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Distribution of durations (or any value), per label combination
+
+        Args:
+            registry (MetricsRegistry): Registry the histogram belongs to
+            name (str): Metric name (e.g., whatsapp_stage_seconds)
+            help (str): Description shown in the exposition
+            label_names (tuple): Names of the labels, given as positional values to observe
+            buckets (tuple): Sorted bucket upper bounds (+Inf is implied)
+        """
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *label_values):
+        """Context manager observing the time spent in its block"""
+        if not self.registry.enabled:
+            return NO_SPAN
+        return Span(self, label_values)
+
+    def snapshot(self):
+        """{label values: (bucket counts, sum, count)}"""
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, registry, name, help, label_names=()):
+        """
+        Monotonic count, per label combination
+
+        Args:
+            registry (MetricsRegistry): Registry the counter belongs to
+            name (str): Metric name, ending in _total
+            help (str): Description shown in the exposition
+            label_names (tuple): Names of the labels, given as positional values to inc
+        """
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {_number(value)}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        """
+        The histograms and counters of one process
+
+        Args:
+            enabled (bool): When False, observations are dropped and spans cost a function call
+        """
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Create a registry configured through the METRICS_ENABLED environment variable"""
+        return cls(enabled=os.environ.get("METRICS_ENABLED", "true").lower() != "false")
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {type(metric).__name__}")
+            return metric
+
+    def histogram(self, name, help, label_names=(), buckets=DEFAULT_BUCKETS):
+        """Return the histogram called name, created on first use"""
+        return self._get_or_create(Histogram, name, help, label_names, buckets)
+
+    def counter(self, name, help, label_names=()):
+        """Return the counter called name, created on first use"""
+        return self._get_or_create(Counter, name, help, label_names)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+class AgentMetricsHooks(RunHooks):
+    def __init__(self, registry):
+        """
+        Run hooks recording where one agent run spends its time
+
+        Each agent's turn runs from its start until it hands off or produces the
+        final output; model calls and tool calls are timed separately, and
+        handoffs are counted by source and target agent. Create one per run.
+
+        Args:
+            registry (MetricsRegistry): Registry receiving the observations
+        """
+        self.agent_seconds = registry.histogram(
+            "whatsapp_agent_seconds", "Time each agent is active in a run, until its handoff or final output", ("agent",))
+        self.model_seconds = registry.histogram(
+            "whatsapp_model_seconds", "Duration of model calls, per agent", ("agent",))
+        self.tool_seconds = registry.histogram(
+            "whatsapp_tool_seconds", "Duration of tool calls", ("tool",))
+        self.handoffs = registry.counter(
+            "whatsapp_handoffs_total", "Handoffs between agents", ("from_agent", "to_agent"))
+        self._agent_started = {}
+        self._model_started = {}
+        self._tool_started = {}
+
+    async def on_agent_start(self, context, agent):
+        self._agent_started[agent.name] = time.perf_counter()
+
+    def _agent_done(self, agent):
+        started = self._agent_started.pop(agent.name, None)
+        if started is not None:
+            self.agent_seconds.observe(time.perf_counter() - started, agent.name)
+
+    async def on_handoff(self, context, from_agent, to_agent):
+        self.handoffs.inc(from_agent.name, to_agent.name)
+        self._agent_done(from_agent)
+
+    async def on_agent_end(self, context, agent, output):
+        self._agent_done(agent)
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items):
+        self._model_started[agent.name] = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response):
+        started = self._model_started.pop(agent.name, None)
+        if started is not None:
+            self.model_seconds.observe(time.perf_counter() - started, agent.name)
+
+    async def on_tool_start(self, context, agent, tool):
+        # Parallel calls of the same tool are told apart by their call id
+        key = (tool.name, getattr(context, "tool_call_id", None))
+        self._tool_started[key] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result):
+        started = self._tool_started.pop((tool.name, getattr(context, "tool_call_id", None)), None)
+        if started is not None:
+            self.tool_seconds.observe(time.perf_counter() - started, tool.name)
+
+# Registry shared by everything in the process
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_metrics():
+    """Return the process-wide metrics registry, configured from the environment on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry.from_env()
+        return _registry
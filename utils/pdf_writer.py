@@ -0,0 +1,95 @@
+import zlib
+
+# Built-in PDF fonts (no embedding needed); F3 is monospaced for tables
+FONTS = {
+    "F1": "Helvetica",
+    "F2": "Helvetica-Bold",
+    "F3": "Courier",
+}
+
+# A4 in points
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+def escape_text(text):
+    """Encode text as a PDF string literal (WinAnsi, so Portuguese accents render)"""
+    data = text.encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+class PdfDocument:
+    def __init__(self, width=PAGE_WIDTH, height=PAGE_HEIGHT, compress=True):
+        """
+        Minimal text-and-lines PDF writer in pure Python
+
+        Output is deterministic (no timestamps or random IDs), so the same
+        content always produces the same bytes.
+
+        Args:
+            width (int): Page width in points
+            height (int): Page height in points
+            compress (bool): Deflate page content streams
+        """
+        self.width = width
+        self.height = height
+        self.compress = compress
+        self.pages = []
+
+    def add_page(self):
+        """Start a new page; drawing calls go to the last page"""
+        self.pages.append([])
+
+    def text(self, x, y, text, size=10, font="F1"):
+        """Draw text with its baseline at (x, y), measured from the bottom-left corner"""
+        self.pages[-1].append(b"BT /%s %g Tf %g %g Td (%s) Tj ET" % (
+            font.encode("ascii"), size, x, y, escape_text(text)))
+
+    def line(self, x1, y1, x2, y2, width=0.5):
+        """Draw a straight line"""
+        self.pages[-1].append(b"%g w %g %g m %g %g l S" % (width, x1, y1, x2, y2))
+
+    def render(self):
+        """Return the document as PDF bytes"""
+        objects = []
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        pages = add(None)
+        fonts = {
+            name: add(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+                      % base.encode("ascii"))
+            for name, base in FONTS.items()
+        }
+        font_resources = b" ".join(b"/%s %d 0 R" % (name.encode("ascii"), ref) for name, ref in fonts.items())
+
+        page_refs = []
+        for commands in self.pages:
+            stream = b"\n".join(commands)
+            if self.compress:
+                stream = zlib.compress(stream)
+                content = add(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+            else:
+                content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+            page_refs.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents %d 0 R >>"
+                % (pages, self.width, self.height, font_resources, content)))
+
+        objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages
+        objects[pages - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            b" ".join(b"%d 0 R" % ref for ref in page_refs), len(page_refs))
+
+        # Body, then the cross-reference table with the byte offset of every object
+        output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        xref = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            output += b"%010d 00000 n \n" % offset
+        output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog, xref)
+        return bytes(output)
@@ -0,0 +1,124 @@
+import time
+import queue
+import threading
+import logging
+
+logger = logging.getLogger('reply_worker')
+
+class ReplyWorkerPool:
+    def __init__(self, num_workers=4, max_queue_size=100):
+        """
+        Bounded pool of background threads that run agent turns off the request thread
+
+        Args:
+            num_workers (int): Number of worker threads
+            max_queue_size (int): Maximum number of jobs waiting for a worker
+        """
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.is_running = False
+
+        # Counters
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queue_wait_total = 0.0
+        self._run_time_total = 0.0
+
+    def start(self):
+        """Start the worker threads"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"reply-worker-{i}")
+            thread.daemon = True  # Threads exit when the main program exits
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Reply worker pool started with {self.num_workers} workers and a queue of {self.max_queue_size}")
+
+    def stop(self, timeout=5):
+        """Stop the workers after the jobs already queued are done"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        logger.info("Reply worker pool stopped")
+
+    def submit(self, job, *args):
+        """
+        Queue a job for a background worker
+
+        Args:
+            job (callable): Function to run
+            *args: Arguments passed to the function
+
+        Returns:
+            bool: True if the job was queued, False if the queue is full
+        """
+        try:
+            self._queue.put_nowait((job, args, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self):
+        """Return queue depth, in-flight jobs and throughput counters"""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.num_workers,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_size": self.max_queue_size,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": 1000 * self._queue_wait_total / finished if finished else 0.0,
+                "avg_run_time_ms": 1000 * self._run_time_total / finished if finished else 0.0,
+            }
+
+    def _worker_loop(self):
+        """Main loop of each worker thread"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            job, args, queued_at = item
+            started_at = time.monotonic()
+            with self._lock:
+                self.in_flight += 1
+                self._queue_wait_total += started_at - queued_at
+
+            try:
+                job(*args)
+                succeeded = True
+            except Exception as e:
+                logger.exception(f"Reply job failed: {str(e)}")
+                succeeded = False
+
+            with self._lock:
+                self.in_flight -= 1
+                self._run_time_total += time.monotonic() - started_at
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
@@ -0,0 +1,72 @@
+import os
+import json
+import uuid
+
+from utils.lru_cache import BoundedTTLCache
+
+
+class Session:
+    def __init__(self, history=None, thread_id=None, last_agent=None, application_slots=None):
+        """
+        Conversation state for a single sender
+
+        Args:
+            history (list): Input items of the conversation so far (from result.to_input_list())
+            thread_id (str): Trace group ID shared by every turn of the conversation
+            last_agent (str): Name of the agent that produced the last reply
+            application_slots (ApplicationSlots): Application fields extracted from the messages so far
+        """
+        self.history = history or []
+        self.thread_id = thread_id or str(uuid.uuid4())
+        self.last_agent = last_agent
+        self.application_slots = application_slots
+
+    def size_in_bytes(self):
+        """Approximate memory used by the session, measured as its serialized size"""
+        return len(json.dumps(self.history, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class SessionStore:
+    def __init__(self, max_sessions=1000, max_bytes=50 * 1024 * 1024, ttl_seconds=3600):
+        """
+        Per-sender conversation store with LRU and TTL eviction
+
+        Args:
+            max_sessions (int): Maximum number of conversations kept in memory
+            max_bytes (int): Memory budget for all conversations, in bytes
+            ttl_seconds (float): Idle time after which a conversation is forgotten
+        """
+        self._cache = BoundedTTLCache(
+            max_entries=max_sessions,
+            max_bytes=max_bytes,
+            ttl_seconds=ttl_seconds,
+            sizeof=lambda session: session.size_in_bytes(),
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Create a store configured through the SESSION_* environment variables"""
+        return cls(
+            max_sessions=int(os.environ.get("SESSION_MAX_ENTRIES", 1000)),
+            max_bytes=int(os.environ.get("SESSION_MAX_BYTES", 50 * 1024 * 1024)),
+            ttl_seconds=float(os.environ.get("SESSION_TTL_SECONDS", 3600)),
+        )
+
+    def get(self, sender):
+        """Return the session for sender, or None if there is no live conversation"""
+        return self._cache.get(sender)
+
+    def save(self, sender, session):
+        """Store (or replace) the session for sender"""
+        self._cache.set(sender, session)
+
+    def reset(self, sender):
+        """Forget the conversation with sender"""
+        self._cache.pop(sender)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and memory usage"""
+        return self._cache.stats()
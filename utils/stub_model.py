@@ -0,0 +1,168 @@
+# Offline stand-in for the OpenAI model, used by benchmarks and load tests.
+# The stub answers every request with a canned text after a configurable delay,
+# so the agent pipeline (runner, tools, handoffs, web server) can be measured
+# without network access or API costs.
+import time
+import asyncio
+import itertools
+
+from agents import ModelProvider, ModelResponse, Usage
+from agents.models.interface import Model
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+DEFAULT_REPLY = "Claro! Posso te ajudar com o seu financiamento imobiliário. 🏠"
+
+_ids = itertools.count(1)
+
+def estimate_tokens(value):
+    """Rough token count (about 4 characters per token) of a string or input list"""
+    return max(1, len(str(value)) // 4)
+
+class StubModel(Model):
+    def __init__(self, latency_seconds=0.5, reply=DEFAULT_REPLY, stream_chunk_chars=8, choose_handoff=None):
+        """
+        Model that replies with a fixed text after a delay
+
+        Args:
+            latency_seconds (float): Simulated model latency per request
+            reply (str or callable): Reply text, or a function of the input returning it
+            stream_chunk_chars (int): Size of each text delta when streaming
+            choose_handoff (callable): Function of (input, handoffs) returning the Handoff to
+                take, or None to reply with text. Only called for agents that have handoffs
+                and when the last input item is not a handoff already.
+        """
+        self.latency_seconds = latency_seconds
+        self.reply = reply
+        self.stream_chunk_chars = stream_chunk_chars
+        self.choose_handoff = choose_handoff
+
+        # Counters
+        self.requests = 0
+        self.handoffs = 0
+
+    def _reply_text(self, input):
+        return self.reply(input) if callable(self.reply) else self.reply
+
+    def _pick_handoff(self, input, handoffs):
+        if not self.choose_handoff or not handoffs:
+            return None
+        if isinstance(input, list) and input and input[-1].get("type") == "function_call_output":
+            return None
+        handoff = self.choose_handoff(input, handoffs)
+        if handoff is not None:
+            self.handoffs += 1
+        return handoff
+
+    def _build_response(self, system_instructions, input, text, handoff=None):
+        if handoff is not None:
+            item = ResponseFunctionToolCall(
+                id=f"fc_stub_{next(_ids)}",
+                call_id=f"call_stub_{next(_ids)}",
+                type="function_call",
+                name=handoff.tool_name,
+                arguments="{}",
+                status="completed",
+            )
+            text = item.name
+        else:
+            item = ResponseOutputMessage(
+                id=f"msg_stub_{next(_ids)}",
+                type="message",
+                role="assistant",
+                status="completed",
+                content=[ResponseOutputText(type="output_text", text=text, annotations=[])],
+            )
+        input_tokens = estimate_tokens(system_instructions) + estimate_tokens(input)
+        output_tokens = estimate_tokens(text)
+        usage = ResponseUsage.model_construct(
+            input_tokens=input_tokens,
+            input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+            output_tokens=output_tokens,
+            output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+            total_tokens=input_tokens + output_tokens,
+        )
+        return [item], usage
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                           prompt=None):
+        self.requests += 1
+        await asyncio.sleep(self.latency_seconds)
+        handoff = self._pick_handoff(input, handoffs)
+        output, usage = self._build_response(system_instructions, input, self._reply_text(input), handoff)
+        return ModelResponse(
+            output=output,
+            usage=Usage(
+                requests=1,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                total_tokens=usage.total_tokens,
+            ),
+            response_id=None,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, *, previous_response_id=None, conversation_id=None,
+                              prompt=None):
+        self.requests += 1
+        text = self._reply_text(input)
+        handoff = self._pick_handoff(input, handoffs)
+        output, usage = self._build_response(system_instructions, input, text, handoff)
+        if handoff is not None:
+            text = ""
+        chunks = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)]
+
+        # Half of the latency goes to the first token, the rest is spread over the chunks
+        await asyncio.sleep(self.latency_seconds / 2)
+        sequence_number = 0
+        for chunk in chunks:
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta",
+                item_id=output[0].id,
+                output_index=0,
+                content_index=0,
+                delta=chunk,
+                logprobs=[],
+                sequence_number=sequence_number,
+            )
+            sequence_number += 1
+            await asyncio.sleep(self.latency_seconds / 2 / max(1, len(chunks)))
+
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=sequence_number,
+            response=Response.model_construct(
+                id=f"resp_stub_{next(_ids)}",
+                created_at=time.time(),
+                model="stub",
+                object="response",
+                output=output,
+                usage=usage,
+                status="completed",
+                tools=[],
+                tool_choice="auto",
+                parallel_tool_calls=False,
+            ),
+        )
+
+class StubModelProvider(ModelProvider):
+    def __init__(self, **model_kwargs):
+        """
+        Model provider returning a StubModel whatever model name the agent asks for
+
+        Args:
+            **model_kwargs: Arguments passed to StubModel
+        """
+        self.model = StubModel(**model_kwargs)
+
+    def get_model(self, model_name):
+        return self.model
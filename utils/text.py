@@ -0,0 +1,9 @@
+import re
+import unicodedata
+
+def fold_text(text):
+    """Lowercase text, strip accents and punctuation, and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return " ".join(text.split())
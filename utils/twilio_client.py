@@ -0,0 +1,219 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from requests.adapters import HTTPAdapter
+from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+
+logger = logging.getLogger('twilio_client')
+
+class RateLimiter:
+    def __init__(self, rate_per_second):
+        """
+        Thread-safe limiter spacing calls evenly at a maximum rate
+
+        Args:
+            rate_per_second (float): Maximum number of calls per second (None or 0 for no limit)
+        """
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller is allowed to proceed"""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+class WhatsAppSender:
+    def __init__(self, account_sid, auth_token, from_number, pool_size=10, timeout=10,
+                 max_retries=2, rate_per_second=80, base_url=None):
+        """
+        Reusable Twilio client for outbound WhatsApp messages.
+
+        The underlying HTTP session keeps up to pool_size keep-alive connections,
+        so sends after the first one skip client construction and the TLS handshake.
+
+        Args:
+            account_sid (str): Twilio account SID
+            auth_token (str): Twilio auth token
+            from_number (str): Twilio WhatsApp number in E.164 format
+            pool_size (int): Maximum number of pooled connections (and concurrent batch sends)
+            timeout (float): Socket/read timeout of each request, in seconds
+            max_retries (int): Retries on connection errors
+            rate_per_second (float): Maximum messages per second sent from from_number
+            base_url (str): Override of the Twilio API URL (for local stand-ins)
+        """
+        self.from_number = from_number
+        self.pool_size = pool_size
+
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries)
+        http_client.session.mount("https://", adapter)
+        http_client.session.mount("http://", adapter)
+
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+        if base_url:
+            self.client.api.base_url = base_url.rstrip('/')
+
+        self._rate_limiter = RateLimiter(rate_per_second)
+        self._executor = None
+        self._lock = threading.Lock()
+        # to_number -> deque of (body, future) waiting for send_in_order
+        self._ordered = {}
+
+        # Counters
+        self.sent = 0
+        self.failed = 0
+        self._send_time_total = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Create a sender configured through the TWILIO_* environment variables"""
+        return cls(
+            account_sid=os.environ.get('TWILIO_ACCOUNT_SID'),
+            auth_token=os.environ.get('TWILIO_AUTH_TOKEN'),
+            from_number=os.environ.get('TWILIO_WHATSAPP_NUMBER'),
+            pool_size=int(os.environ.get('TWILIO_POOL_SIZE', 10)),
+            timeout=float(os.environ.get('TWILIO_TIMEOUT', 10)),
+            max_retries=int(os.environ.get('TWILIO_MAX_RETRIES', 2)),
+            rate_per_second=float(os.environ.get('TWILIO_SEND_RATE', 80)),
+            base_url=os.environ.get('TWILIO_API_BASE_URL'),
+        )
+
+    def send(self, to_number, message_body):
+        """
+        Send a WhatsApp message
+
+        Args:
+            to_number (str): The recipient's phone number in E.164 format
+            message_body (str): The content of the message
+
+        Returns:
+            str: The SID of the sent message
+        """
+        self._rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            message = self.client.messages.create(
+                body=message_body,
+                from_=f'whatsapp:{self.from_number}',
+                to=f'whatsapp:{to_number}'
+            )
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+        with self._lock:
+            self.sent += 1
+            self._send_time_total += time.perf_counter() - started
+        return message.sid
+
+    def send_many(self, messages):
+        """
+        Send a batch of messages concurrently, within the sender's rate limit
+
+        Args:
+            messages (list): (to_number, message_body) pairs
+
+        Returns:
+            list: For each message, in order, its SID or the exception raised while sending it
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(self.send, to_number, body) for to_number, body in messages]
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Failed to send WhatsApp message: {str(e)}")
+                results.append(e)
+        return results
+
+    def send_in_order(self, to_number, message_body):
+        """
+        Send a message in the background, after every earlier send_in_order to the same number
+
+        Messages to one number go out one at a time, in call order; different
+        numbers are served concurrently by the sender's thread pool.
+
+        Args:
+            to_number (str): The recipient's phone number in E.164 format
+            message_body (str): The content of the message
+
+        Returns:
+            Future: Resolves to the message SID (or the exception raised while sending)
+        """
+        future = Future()
+        with self._lock:
+            queue = self._ordered.get(to_number)
+            start_draining = queue is None
+            if start_draining:
+                queue = self._ordered[to_number] = deque()
+            queue.append((message_body, future))
+        if start_draining:
+            self._get_executor().submit(self._drain, to_number)
+        return future
+
+    def _drain(self, to_number):
+        """Send the queued messages of one number until its queue is empty"""
+        while True:
+            with self._lock:
+                queue = self._ordered[to_number]
+                if not queue:
+                    del self._ordered[to_number]
+                    return
+                message_body, future = queue.popleft()
+            try:
+                future.set_result(self.send(to_number, message_body))
+            except Exception as e:
+                logger.error(f"Failed to send WhatsApp message: {str(e)}")
+                future.set_exception(e)
+
+    def stats(self):
+        """Return send counters and average latency"""
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "avg_send_ms": 1000 * self._send_time_total / self.sent if self.sent else 0.0,
+                "pool_size": self.pool_size,
+                "ordered_pending": sum(len(queue) for queue in self._ordered.values()),
+            }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="twilio-send")
+            return self._executor
+
+# Singleton instance
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_whatsapp_sender():
+    """Get the process-wide WhatsApp sender, creating it from the environment on first use"""
+    global _sender
+
+    with _sender_lock:
+        if _sender is None:
+            _sender = WhatsAppSender.from_env()
+            logger.info(f"Twilio client created with a pool of {_sender.pool_size} connections")
+        return _sender
+
+def get_sender_stats():
+    """Send counters of the process-wide sender (empty until the first send)"""
+    return _sender.stats() if _sender is not None else {}